@@ -1,19 +1,40 @@
+import asyncio
 import uvicorn
 import os
+import json
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from uuid import uuid4, UUID
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from core.agents.vars import embed_models_by_prov,chat_models_by_prov
-from multi_agent import simulate_consciousness
+from core.agents.agent_registry import create_agent_registry
+from core.agents.llm_client import aclose_chat_clients
+from core.utils.concurrency import ConcurrencyLimiter, CapacityExceeded
+from core.utils.prompt_cache import prompt_cache_tracker
+from multi_agent import Multimodal_Agent_Parameter, asimulate_consciousness, astream_consciousness
+from batch_simulation import BatchScheduler, BatchStore
 from dotenv import load_dotenv
 app = FastAPI()
-agents = {}
 load_dotenv()
+agents = create_agent_registry()
 
 PORT_NUMBER = int(os.getenv("PORT_NUMBER"))
 FRONTEND_URL=str(os.getenv("FRONTEND_URL"))
 
+# bounds how many simulations run at once and how many may wait, so a burst of
+# /multiAgent calls is rejected quickly instead of starving the other endpoints
+simulation_limiter = ConcurrencyLimiter(
+    max_in_flight=int(os.getenv("MULTI_AGENT_MAX_IN_FLIGHT", "8")),
+    max_queue=int(os.getenv("MULTI_AGENT_MAX_QUEUE", "32")),
+    queue_timeout=float(os.getenv("MULTI_AGENT_QUEUE_TIMEOUT", "30")),
+)
+
+# runs /multiAgent/batch sweeps; all their agent turns share one concurrency cap.
+# Batch status lives next to the agent registry, so any worker answers polls
+batch_scheduler = BatchScheduler(BatchStore(os.getenv("AGENT_REGISTRY_PATH", "agents.db")))
+
 # it is a middleware to ensure that backend and frontend can communicate properly , if we not use this browser will not allow to share information b/w frontend and backend 
 app.add_middleware(
     CORSMiddleware,
@@ -26,12 +47,6 @@ app.add_middleware(
 class Agent(BaseModel):
     name: str
 
-class Multimodal_Agent_Parameter(BaseModel):
-    system_prompt_analytica: str = "you are intelligent and be concise in 100 words"
-    system_prompt_creativa: str ="you are creative  and be concise in 100 words"
-    system_prompt_pragmatica: str="you are practical and and be concise in 100 words"
-    user_prompt: str=""
-    
 @app.get("/get_models_by_provider")
 async def get_models():
     return {"message":chat_models_by_prov}
@@ -43,29 +58,115 @@ async def get_models():
 @app.post("/create_agent/", response_model=UUID)
 async def create_agent(agent: Agent):
     agent_id = uuid4()
-    agents[agent_id] = agent
+    # the registry may block on SQLite, so it is called off the event loop
+    await asyncio.to_thread(agents.put, str(agent_id), agent.model_dump())
     return   {"message": agent_id}
 
 @app.get("/get_agent/{agent_id}", response_model=Agent)
 async def get_agent(agent_id: UUID):
-    if agent_id in agents:
-        return  {"message": agents[agent_id]}
+    record = await asyncio.to_thread(agents.get, str(agent_id))
+    if record is not None:
+        return  {"message": Agent(**record)}
     else:
         raise HTTPException(status_code=404, detail="Agent not found")
 
 @app.post("/interact_agent/{agent_id}")
 async def interact_agent(agent_id: UUID, message: str):
-    if agent_id in agents:
-        agent = agents[agent_id]
+    record = await asyncio.to_thread(agents.get, str(agent_id))
+    if record is not None:
+        agent = Agent(**record)
         response = f"Agent {agent.name} received your message: {message}"
         return {"response": response}
     else:
         raise HTTPException(status_code=404, detail="Agent not found")
 
+@app.delete("/delete_agent/{agent_id}")
+async def delete_agent(agent_id: UUID):
+    if await asyncio.to_thread(agents.delete, str(agent_id)):
+        return {"message": agent_id}
+    else:
+        raise HTTPException(status_code=404, detail="Agent not found")
+
 @app.post("/multiAgent")
 async def interact_withMultiModalAgent(response:Multimodal_Agent_Parameter):
-    data =  simulate_consciousness(response)
+    try:
+        async with simulation_limiter.slot():
+            data = await asimulate_consciousness(response)
+    except CapacityExceeded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(int(e.retry_after))},
+        )
     return {"message":data} 
+
+@app.post("/multiAgent/stream")
+async def stream_withMultiModalAgent(response:Multimodal_Agent_Parameter):
+    # the slot is taken before streaming starts so overload is still a plain 503
+    try:
+        await simulation_limiter.acquire()
+    except CapacityExceeded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(int(e.retry_after))},
+        )
+    # released when the stream ends, or by the background task if it never starts
+    release = simulation_limiter.releaser()
+
+    async def event_stream():
+        try:
+            async for event in astream_consciousness(response):
+                yield f"event: {event.pop('event')}\ndata: {json.dumps(event)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+        finally:
+            release()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(release),
+    )
+
+@app.post("/multiAgent/batch")
+async def submit_multiAgent_batch(responses: list[Multimodal_Agent_Parameter]):
+    try:
+        batch = await batch_scheduler.submit(responses)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except CapacityExceeded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(int(e.retry_after))},
+        )
+    return {"message": {"job_id": batch.id, "total": batch.total}}
+
+@app.get("/multiAgent/batch/{job_id}")
+async def poll_multiAgent_batch(job_id: UUID, since: int = 0):
+    # results come in completion order; pass the returned "next" as since to get only new ones
+    snapshot = await batch_scheduler.snapshot(str(job_id), since)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return {"message": snapshot}
+
+@app.delete("/multiAgent/batch/{job_id}")
+async def cancel_multiAgent_batch(job_id: UUID):
+    if await batch_scheduler.cancel(str(job_id)):
+        return {"message": job_id}
+    raise HTTPException(status_code=404, detail="Batch not found")
+
+@app.get("/prompt_cache_stats")
+async def get_prompt_cache_stats(top: int = 20):
+    # cached vs uncached prompt tokens, overall and for the busiest prompt prefixes
+    return {"message": prompt_cache_tracker.stats(top)}
+
+@app.on_event("shutdown")
+async def close_llm_clients():
+    await aclose_chat_clients()
     
 
 if __name__ == "__main__":
@@ -0,0 +1,337 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from core.utils.concurrency import CapacityExceeded
+from multi_agent import asimulate_consciousness
+
+# most agent calls running at once across every simulation of every batch
+BATCH_MAX_CONCURRENT_TURNS = int(os.getenv("BATCH_MAX_CONCURRENT_TURNS", "16"))
+# most parameter sets accepted in one batch
+BATCH_MAX_SIMULATIONS = int(os.getenv("BATCH_MAX_SIMULATIONS", "1000"))
+# most simulations of all running batches not finished yet; submissions beyond it are rejected
+BATCH_MAX_PENDING_SIMULATIONS = int(os.getenv("BATCH_MAX_PENDING_SIMULATIONS", "2000"))
+
+
+class BatchStore:
+    """
+    Batch status and results in SQLite, so every uvicorn worker on the host
+    can answer polls and cancellations for batches run by another worker.
+
+    The worker running a batch writes each result as it completes and
+    refreshes a heartbeat; a running batch whose heartbeat is older than
+    stale_after seconds belongs to a worker that died and is reported as
+    interrupted. Cancelling a batch of another worker sets a flag that its
+    worker picks up with the next heartbeat.
+    """
+
+    def __init__(self, path: str, stale_after: float = 30.0):
+        """
+        Parameters:
+            path (str): Path to the SQLite database file.
+            stale_after (float): Seconds without a heartbeat after which a running batch is interrupted.
+        """
+        self.path = path
+        self.stale_after = stale_after
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS batches ("
+                " job_id TEXT PRIMARY KEY,"
+                " total INTEGER NOT NULL,"
+                " completed INTEGER NOT NULL DEFAULT 0,"
+                " failed INTEGER NOT NULL DEFAULT 0,"
+                " status TEXT NOT NULL,"
+                " created REAL NOT NULL,"
+                " finished REAL,"
+                " heartbeat REAL NOT NULL,"
+                " cancel_requested INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS batch_results ("
+                " job_id TEXT NOT NULL,"
+                " seq INTEGER NOT NULL,"
+                " data TEXT NOT NULL,"
+                " PRIMARY KEY (job_id, seq))"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front, so a read-then-write
+        # transaction cannot interleave with another worker's
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _pending(self, conn: sqlite3.Connection, now: float) -> int:
+        row = conn.execute(
+            "SELECT SUM(total - completed) FROM batches WHERE finished IS NULL AND heartbeat > ?",
+            (now - self.stale_after,),
+        ).fetchone()
+        return row[0] or 0
+
+    def pending(self) -> int:
+        """
+        Returns the number of simulations of live running batches not finished yet.
+        """
+        return self._pending(self._connection(), time.time())
+
+    def admit(self, job_id: str, total: int, max_pending: int) -> bool:
+        """
+        Records a new running batch unless it would take the pending
+        simulations past max_pending. Check and insert are one transaction, so
+        workers admitting batches at once cannot overshoot together.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            if self._pending(conn, now) + total > max_pending:
+                return False
+            conn.execute(
+                "INSERT INTO batches (job_id, total, status, created, heartbeat) VALUES (?, ?, 'running', ?, ?)",
+                (job_id, total, now, now),
+            )
+            return True
+
+    def add_result(self, job_id: str, result: dict, failed: bool) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO batch_results (job_id, seq, data)"
+                " SELECT job_id, completed, ? FROM batches WHERE job_id = ?",
+                (json.dumps(result, default=str), job_id),
+            )
+            conn.execute(
+                "UPDATE batches SET completed = completed + 1, failed = failed + ?, heartbeat = ? WHERE job_id = ?",
+                (int(failed), time.time(), job_id),
+            )
+
+    def heartbeat(self, job_id: str) -> bool:
+        """
+        Marks a running batch as alive and returns whether cancelling it was requested.
+        """
+        conn = self._connection()
+        conn.execute("UPDATE batches SET heartbeat = ? WHERE job_id = ?", (time.time(), job_id))
+        row = conn.execute("SELECT cancel_requested FROM batches WHERE job_id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def finish(self, job_id: str, status: str) -> None:
+        self._connection().execute(
+            "UPDATE batches SET status = ?, finished = ? WHERE job_id = ?", (status, time.time(), job_id)
+        )
+
+    def request_cancel(self, job_id: str) -> bool:
+        """
+        Flags a batch for cancellation. Returns False if the batch is unknown.
+        """
+        cursor = self._connection().execute(
+            "UPDATE batches SET cancel_requested = 1 WHERE job_id = ?", (job_id,)
+        )
+        return cursor.rowcount > 0
+
+    def snapshot(self, job_id: str, since: int = 0) -> dict:
+        """
+        Returns the batch status and the results completed after the first
+        since, or None if the batch is unknown.
+        """
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT total, completed, failed, status, finished, heartbeat FROM batches WHERE job_id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        total, completed, failed, status, finished, heartbeat = row
+        if finished is None and heartbeat <= time.time() - self.stale_after:
+            status = "interrupted"
+        results = conn.execute(
+            "SELECT data FROM batch_results WHERE job_id = ? AND seq >= ? ORDER BY seq", (job_id, since)
+        ).fetchall()
+        return {
+            "job_id": job_id,
+            "status": status,
+            "total": total,
+            "completed": completed,
+            "failed": failed,
+            "results": [json.loads(data) for data, in results],
+            "next": completed,
+        }
+
+    def evict(self, max_jobs: int, job_ttl: float) -> None:
+        """
+        Drops batches finished or interrupted more than job_ttl seconds ago
+        and all but the max_jobs most recent finished batches.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM batches WHERE COALESCE(finished, heartbeat) < ?", (now - job_ttl,)
+            )
+            conn.execute(
+                "DELETE FROM batches WHERE job_id IN ("
+                " SELECT job_id FROM batches WHERE finished IS NOT NULL"
+                " ORDER BY finished DESC LIMIT -1 OFFSET ?)",
+                (max_jobs,),
+            )
+            conn.execute("DELETE FROM batch_results WHERE job_id NOT IN (SELECT job_id FROM batches)")
+
+
+class SimulationBatch:
+    """
+    A batch of simulations running in this worker.
+    """
+
+    def __init__(self, total: int):
+        self.id = str(uuid.uuid4())
+        self.total = total
+        self.task = None
+
+
+class BatchScheduler:
+    """
+    Runs batches of simulations on one shared scheduler.
+
+    Every agent turn of every running batch takes a slot from a single
+    semaphore of max_concurrent_turns, so a sweep of hundreds of parameter
+    sets keeps the provider busy at a fixed concurrency instead of making one
+    round trip per simulation. A batch is only admitted while the simulations
+    still pending across all batches of all workers stay within max_pending.
+    Status and results live in a BatchStore, where finished batches are kept
+    for job_ttl seconds, and at most max_jobs of them, for polling.
+    """
+
+    def __init__(self, store: BatchStore = None, max_concurrent_turns: int = BATCH_MAX_CONCURRENT_TURNS, max_pending: int = BATCH_MAX_PENDING_SIMULATIONS, max_jobs: int = 100, job_ttl: float = 3600, heartbeat_interval: float = 2.0):
+        """
+        Parameters:
+            store (BatchStore): Status and results shared by all workers; needed by
+                                submit(), while run() works without one.
+            max_concurrent_turns (int): Most agent calls in flight across all batches.
+            max_pending (int): Most unfinished simulations across all running batches.
+            max_jobs (int): Most finished batches kept for polling.
+            job_ttl (float): Seconds a finished batch is kept for polling.
+            heartbeat_interval (float): Seconds between heartbeats and cancellation checks.
+        """
+        self.store = store
+        self.max_concurrent_turns = max_concurrent_turns
+        self.max_pending = max_pending
+        self.max_jobs = max_jobs
+        self.job_ttl = job_ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.jobs = {}
+        # created on first use so it belongs to the running event loop
+        self._semaphore = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_turns)
+        return self._semaphore
+
+    async def run(self, params: list):
+        """
+        Runs every simulation and yields (index, responses, error) as each one
+        completes; error is None on success.
+        """
+        # bounds the simulations holding agents at once; their turns share self.semaphore
+        started = asyncio.Semaphore(self.max_concurrent_turns)
+
+        async def simulate(index: int, response):
+            async with started:
+                try:
+                    return index, await asimulate_consciousness(response, semaphore=self.semaphore), None
+                except Exception as e:
+                    return index, None, str(e)
+
+        tasks = [asyncio.create_task(simulate(i, response)) for i, response in enumerate(params)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _heartbeat(self, batch: SimulationBatch) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if await asyncio.to_thread(self.store.heartbeat, batch.id):
+                batch.task.cancel()
+                return
+
+    async def _run_batch(self, batch: SimulationBatch, params: list) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(batch))
+        try:
+            async for index, responses, error in self.run(params):
+                if error is None:
+                    result = {"index": index, "message": responses}
+                else:
+                    result = {"index": index, "error": error}
+                await asyncio.to_thread(self.store.add_result, batch.id, result, error is not None)
+        finally:
+            heartbeat.cancel()
+
+    def _finished(self, batch: SimulationBatch) -> None:
+        # also marks batches cancelled before they started
+        self.jobs.pop(batch.id, None)
+        self.store.finish(batch.id, "cancelled" if batch.task.cancelled() else "done")
+
+    async def submit(self, params: list) -> SimulationBatch:
+        """
+        Starts a batch in the running event loop and returns it immediately.
+
+        Raises:
+            ValueError: If params is empty or longer than BATCH_MAX_SIMULATIONS.
+            CapacityExceeded: If the batch would take the pending simulations past max_pending.
+        """
+        if not params:
+            raise ValueError("A batch needs at least one parameter set")
+        if len(params) > BATCH_MAX_SIMULATIONS:
+            raise ValueError(f"A batch may hold at most {BATCH_MAX_SIMULATIONS} parameter sets")
+        await asyncio.to_thread(self.store.evict, self.max_jobs, self.job_ttl)
+        batch = SimulationBatch(len(params))
+        if not await asyncio.to_thread(self.store.admit, batch.id, batch.total, self.max_pending):
+            raise CapacityExceeded("Too many batch simulations in progress, try again later.", retry_after=30)
+        batch.task = asyncio.create_task(self._run_batch(batch, list(params)))
+        batch.task.add_done_callback(lambda _: self._finished(batch))
+        self.jobs[batch.id] = batch
+        return batch
+
+    async def pending(self) -> int:
+        """
+        Returns the number of simulations of running batches not finished yet.
+        """
+        return await asyncio.to_thread(self.store.pending)
+
+    async def snapshot(self, job_id: str, since: int = 0) -> dict:
+        """
+        Returns the status and new results of a batch of any worker, or None if it is unknown.
+        """
+        return await asyncio.to_thread(self.store.snapshot, job_id, since)
+
+    async def cancel(self, job_id: str) -> bool:
+        """
+        Cancels a batch; one of another worker stops at its next heartbeat.
+        Returns False if the batch is unknown.
+        """
+        batch = self.jobs.get(job_id)
+        if batch is not None:
+            batch.task.cancel()
+            return True
+        return await asyncio.to_thread(self.store.request_cancel, job_id)
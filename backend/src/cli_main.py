@@ -1,6 +1,28 @@
+import asyncio
+import json
+import uuid
+
 import questionary as qy
-from backend.src.core.agents.chat.chat_agent import Agent
-from backend.src.core.agents.vars import *
+from core.agents.chat.chat_agent import ChatAgent
+from core.agents.vars import *
+from batch_simulation import BatchScheduler
+from multi_agent import TOPOLOGIES, Multimodal_Agent_Parameter
+
+
+async def run_simulations(params: list) -> None:
+    """
+    Runs the simulations on one shared scheduler, printing each as it completes.
+    """
+    async for index, responses, error in BatchScheduler().run(params):
+        print(f"--- simulation {index} ---")
+        if error is not None:
+            print(f"failed: {error}")
+            continue
+        for key, content in responses.items():
+            print(f"{key}: {content}")
+            print("")
+
+
 def main():
     print("Welcome to Automated Bureaucracy via Command Line")
     print("")
@@ -18,19 +40,28 @@ def main():
         model = qy.select("Which Model", 
         chat_models_by_prov[provider]
         ).ask() 
-        agent = Agent()
+        agent = ChatAgent()
         agent.create_agent(name, provider,model)
 
         print("")
         message = qy.text("what is your prompt or Exit to leave").ask()
-        config = {"configurable": {"thread_id": "abc123"}}
+        # a fresh conversation per session instead of one shared thread
+        config = {"configurable": {"thread_id": str(uuid.uuid4())}}
         while message.lower() != "exit":
             response = agent.invoke_agent(message,config)
             print(response)
             message =qy.text("what is your prompt or Exit to leave").ask()
         print("")
     elif choice == "Simulate":
-        print("simulaate temp")
+        path = qy.text("JSON file with a list of parameter sets (empty for a single prompt)").ask()
+        if path:
+            with open(path, "r", encoding="utf-8") as f:
+                params = [Multimodal_Agent_Parameter(**item) for item in json.load(f)]
+        else:
+            prompt = qy.text("what is your prompt").ask()
+            topology = qy.select("Which topology", list(TOPOLOGIES)).ask()
+            params = [Multimodal_Agent_Parameter(user_prompt=prompt, topology=topology)]
+        asyncio.run(run_simulations(params))
     
     else:
         exit()
@@ -1,9 +1,11 @@
 import os
 from dotenv import load_dotenv
-import openai
 from langchain.agents import Tool
 from tavily import TavilyClient
 from .agent_state_manager import AgentStateManager
+from .llm_client import get_chat_client
+from core.utils.resilience import ResilientCaller, get_circuit_breaker, is_retryable
+from core.utils.response_cache import get_shared_response_cache, make_cache_key
 
 
 class Agent:
@@ -17,15 +19,22 @@ class Agent:
         system_prompt: str,
         openai_api_key: str = None,
         tavily_api_key: str = None,
-        message_bus=None
+        message_bus=None,
+        response_cache=None,
+        provider: str = None
     ):
         """
         Initialize the agent with required configurations and optional MessageBus integration.
 
         If openai_api_key is not provided, the code will load it from a .env file using python-dotenv.
+        If response_cache is not provided, the shared cache is used when LLM_RESPONSE_CACHE is enabled.
+        If provider is not provided, AGENT_LLM_PROVIDER is used ("openai" by default, "local" for offline runs).
         """
         self.name = name
         self.system_prompt = system_prompt
+        self.model = "o1-mini"
+        self.llm_params = {"n": 1, "stop": ["\nObservation:"]}
+        self.response_cache = response_cache if response_cache is not None else get_shared_response_cache()
         self.state_manager = AgentStateManager()
 
         # If no TAVILY_API_KEY is provided, fallback to environment
@@ -40,8 +49,15 @@ class Agent:
         # If no openai_api_key is passed, fallback to environment variable
         if not openai_api_key:
             openai_api_key = os.environ.get("OPENAI_API_KEY", "")
-        # Configure the API key (module-level usage)
-        openai.api_key = openai_api_key
+        if not provider:
+            provider = os.environ.get("AGENT_LLM_PROVIDER", "openai")
+        # Each agent uses the shared pooled client for its own key instead of
+        # overwriting the module-level openai.api_key.
+        self.llm_client = get_chat_client(provider, openai_api_key)
+        # retries, deadlines, hedging and fallback models for LLM calls
+        self.provider = provider
+        self.resilience = ResilientCaller(provider)
+        self.search_resilience = ResilientCaller("tavily", deadline=float(os.environ.get("SEARCH_CALL_DEADLINE", "30")), fallbacks=False)
 
         if self.message_bus:
             self.message_bus.register(self.name, self._process_message)
@@ -49,24 +65,98 @@ class Agent:
         self.tools = self._initialize_tools()
         self.state_manager.set_state(self.name, "idle")
 
-    def _o1_mini_llm(self, prompt: str) -> str:
+    def _build_messages(self, prompt: str) -> list:
         """
-        Uses the OpenAI library call for chat completions with the o1-mini model.
         o1-mini does not support the "system" role, so we rename it to "assistant".
+        The system prompt always comes first and unchanged, so it is the
+        static, cacheable prefix of every request of this agent.
+        """
+        return [
+            {"role": "assistant", "content": self.system_prompt},
+            {"role": "user", "content": prompt},
+        ]
+
+    def _cache_key(self, messages: list, model: str = None) -> str:
+        # keyed by the model that answers, which is a fallback when self.model
+        # failed, so a fallback's answer is never served as self.model's
+        return make_cache_key(model or self.model, messages, provider=self.provider, **self.llm_params)
+
+    def _o1_mini_llm(self, prompt: str) -> str:
         """
+        Uses the OpenAI library call for chat completions with the o1-mini model.
+        Responses are served from the response cache when one is configured.
+        """
+        messages = self._build_messages(prompt)
+        if self.response_cache is not None:
+            key = self._cache_key(messages)
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached
+        result, model = self.resilience.call(
+            lambda model, timeout: self.llm_client.complete(
+                model=model, messages=messages, prefix_messages=1, timeout=timeout, **self.llm_params
+            ),
+            self.model,
+            return_model=True,
+        )
+        if self.response_cache is not None:
+            self.response_cache.put(self._cache_key(messages, model), result)
+        return result
+
+    async def _ao1_mini_llm(self, prompt: str) -> str:
+        """
+        Async variant of _o1_mini_llm that keeps the event loop free while waiting.
+        """
+        messages = self._build_messages(prompt)
+        if self.response_cache is not None:
+            key = self._cache_key(messages)
+            cached = await self.response_cache.aget(key)
+            if cached is not None:
+                return cached
+        result, model = await self.resilience.acall(
+            lambda model, timeout: self.llm_client.acomplete(
+                model=model, messages=messages, prefix_messages=1, timeout=timeout, **self.llm_params
+            ),
+            self.model,
+            return_model=True,
+        )
+        if self.response_cache is not None:
+            await self.response_cache.aput(self._cache_key(messages, model), result)
+        return result
+
+    async def _astream_o1_mini_llm(self, prompt: str):
+        """
+        Streaming variant of _ao1_mini_llm that yields content deltas.
+        A cached response is yielded as a single delta.
+        """
+        messages = self._build_messages(prompt)
+        if self.response_cache is not None:
+            key = self._cache_key(messages)
+            cached = await self.response_cache.aget(key)
+            if cached is not None:
+                yield cached
+                return
+        # a started stream cannot be retried, so only the model is chosen
+        # through the circuit breakers
+        model = self.resilience.pick_model(self.model)
+        breaker = get_circuit_breaker(self.provider, model)
+        parts = []
         try:
-            response = openai.chat.completions.create(
-                model="o1-mini",
-                messages=[
-                    {"role": "assistant", "content": self.system_prompt},
-                    {"role": "user", "content": prompt},
-                ],
-                n=1,
-                stop=["\nObservation:"],
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            raise e
+            async for delta in self.llm_client.astream(
+                model=model, messages=messages, prefix_messages=1, timeout=self.resilience.deadline, **self.llm_params
+            ):
+                parts.append(delta)
+                yield delta
+        except BaseException as e:
+            # an interrupted stream says nothing about the provider's health
+            if isinstance(e, Exception) and is_retryable(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        breaker.record_success()
+        if self.response_cache is not None:
+            await self.response_cache.aput(self._cache_key(messages, model), "".join(parts))
 
     def _initialize_tools(self):
         """
@@ -97,7 +187,9 @@ class Agent:
         """
         self.state_manager.set_state(self.name, "searching")
         try:
-            response = self.tavily_client.search(query)
+            response = self.search_resilience.call(
+                lambda _, timeout: self.tavily_client.search(query, timeout=timeout), "search"
+            )
             results = response.get("results", [])
             if results:
                 formatted_results = "\n".join(
@@ -120,6 +212,19 @@ class Agent:
         except Exception as e:
             raise e
 
+    async def aexecute_task(self, prompt: str) -> str:
+        """
+        Executes a task asynchronously based on the provided prompt.
+        """
+        return await self._ao1_mini_llm(prompt)
+
+    async def astream_task(self, prompt: str):
+        """
+        Executes a task and yields the response incrementally as it is generated.
+        """
+        async for delta in self._astream_o1_mini_llm(prompt):
+            yield delta
+
     def send_message(self, message: str) -> None:
         """
         Publishes a message to the MessageBus.
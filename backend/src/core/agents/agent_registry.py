@@ -0,0 +1,230 @@
+import abc
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class AgentRegistry(abc.ABC):
+    """
+    Storage for agent records keyed by agent id.
+
+    Records are plain JSON-serializable dicts. Agents that have not been read or
+    written for ttl seconds expire, and once the registry holds more than
+    max_agents records the least recently used ones are evicted.
+    """
+
+    def __init__(self, ttl: float = None, max_agents: int = None):
+        self.ttl = ttl
+        self.max_agents = max_agents
+
+    @abc.abstractmethod
+    def put(self, agent_id: str, record: dict) -> None:
+        ...
+
+    @abc.abstractmethod
+    def get(self, agent_id: str):
+        """
+        Returns the record for agent_id, or None if it is unknown or expired.
+        """
+
+    @abc.abstractmethod
+    def delete(self, agent_id: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def evict(self) -> int:
+        """
+        Removes expired records and trims the registry to max_agents.
+
+        Returns:
+            int: Number of records removed.
+        """
+
+    @abc.abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def _expired(self, last_access: float, now: float) -> bool:
+        return self.ttl is not None and now - last_access > self.ttl
+
+
+class InMemoryAgentRegistry(AgentRegistry):
+    """
+    Process-local registry; an OrderedDict kept in least-recently-used order.
+    """
+
+    def __init__(self, ttl: float = None, max_agents: int = None):
+        super().__init__(ttl, max_agents)
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, agent_id: str, record: dict) -> None:
+        with self._lock:
+            self._records[agent_id] = (record, time.time())
+            self._records.move_to_end(agent_id)
+        self.evict()
+
+    def get(self, agent_id: str):
+        now = time.time()
+        with self._lock:
+            entry = self._records.get(agent_id)
+            if entry is None:
+                return None
+            record, last_access = entry
+            if self._expired(last_access, now):
+                del self._records[agent_id]
+                return None
+            self._records[agent_id] = (record, now)
+            self._records.move_to_end(agent_id)
+            return record
+
+    def delete(self, agent_id: str) -> bool:
+        with self._lock:
+            return self._records.pop(agent_id, None) is not None
+
+    def evict(self) -> int:
+        now = time.time()
+        removed = 0
+        with self._lock:
+            # the oldest entries are at the front, so stop at the first live one
+            while self._records:
+                agent_id, (_, last_access) = next(iter(self._records.items()))
+                over_capacity = self.max_agents is not None and len(self._records) > self.max_agents
+                if not over_capacity and not self._expired(last_access, now):
+                    break
+                del self._records[agent_id]
+                removed += 1
+        return removed
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+class SQLiteAgentRegistry(AgentRegistry):
+    """
+    Registry persisted in a SQLite database so agents survive restarts and are
+    shared by every uvicorn worker on the host.
+
+    The database runs in WAL mode so readers in one worker do not block writers
+    in another. Lookups go through the primary-key index and eviction through an
+    index on last_access.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = None,
+        max_agents: int = None,
+        touch_interval: float = 60.0,
+        evict_every: int = 100,
+    ):
+        """
+        Parameters:
+            path (str): Path to the SQLite database file.
+            ttl (float): Seconds of inactivity after which an agent expires.
+            max_agents (int): Maximum number of agents kept.
+            touch_interval (float): Minimum seconds between last_access updates for
+                                    one agent, so reads rarely need a write.
+            evict_every (int): Run eviction after this many puts.
+        """
+        super().__init__(ttl, max_agents)
+        self.path = path
+        self.touch_interval = touch_interval
+        self.evict_every = evict_every
+        self._local = threading.local()
+        self._puts = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS agents ("
+                " agent_id TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS agents_last_access ON agents (last_access)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put(self, agent_id: str, record: dict) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO agents (agent_id, data, last_access) VALUES (?, ?, ?)",
+                (agent_id, json.dumps(record), time.time()),
+            )
+        self._puts += 1
+        if self._puts % self.evict_every == 0:
+            self.evict()
+
+    def get(self, agent_id: str):
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT data, last_access FROM agents WHERE agent_id = ?", (agent_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        data, last_access = row
+        now = time.time()
+        if self._expired(last_access, now):
+            self.delete(agent_id)
+            return None
+        if now - last_access >= self.touch_interval:
+            with conn:
+                conn.execute(
+                    "UPDATE agents SET last_access = ? WHERE agent_id = ?", (now, agent_id)
+                )
+        return json.loads(data)
+
+    def delete(self, agent_id: str) -> bool:
+        with self._connection() as conn:
+            cursor = conn.execute("DELETE FROM agents WHERE agent_id = ?", (agent_id,))
+        return cursor.rowcount > 0
+
+    def evict(self) -> int:
+        removed = 0
+        with self._connection() as conn:
+            if self.ttl is not None:
+                cursor = conn.execute(
+                    "DELETE FROM agents WHERE last_access < ?", (time.time() - self.ttl,)
+                )
+                removed += cursor.rowcount
+            if self.max_agents is not None:
+                cursor = conn.execute(
+                    "DELETE FROM agents WHERE agent_id IN ("
+                    " SELECT agent_id FROM agents ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_agents,),
+                )
+                removed += cursor.rowcount
+        return removed
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM agents").fetchone()[0]
+
+
+def create_agent_registry() -> AgentRegistry:
+    """
+    Builds the registry configured through the environment.
+
+    AGENT_REGISTRY_BACKEND selects "sqlite" (default) or "memory",
+    AGENT_REGISTRY_PATH the database file, AGENT_TTL_SECONDS the idle expiry
+    and AGENT_REGISTRY_MAX the maximum number of agents kept.
+    """
+    backend = os.getenv("AGENT_REGISTRY_BACKEND", "sqlite")
+    ttl = float(os.getenv("AGENT_TTL_SECONDS", "86400"))
+    max_agents = int(os.getenv("AGENT_REGISTRY_MAX", "10000"))
+
+    if backend == "memory":
+        return InMemoryAgentRegistry(ttl=ttl, max_agents=max_agents)
+    elif backend == "sqlite":
+        path = os.getenv("AGENT_REGISTRY_PATH", "agents.db")
+        return SQLiteAgentRegistry(path, ttl=ttl, max_agents=max_agents)
+    raise ValueError(f"Unknown agent registry backend: {backend}")
@@ -4,6 +4,8 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 import google.generativeai as genai
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import START, MessagesState, StateGraph
+from ..model_catalog import model_catalog
+from core.utils.rate_limiter import LangChainRateLimiter, get_rate_limiter
 
 
 class api_Agent():
@@ -34,17 +36,20 @@ class api_Agent():
         
     
     def init_model(self, model):
-        if model in self.get_provider_model_names():
+        if model in model_catalog.get("chat", self.provider, self.get_provider_model_names):
             self.model_name = model
         else:
             print(f"invalid model name for {self.provider}")
             
         if self.model_name:
-            
+            # shares the request and token budget of the key with every other client
+            limiter = get_rate_limiter(self.provider, self.model_name, self.apikey)
+            rate_limiter = LangChainRateLimiter(limiter) if limiter is not None else None
+
             if self.provider == "openai":
-                self.llm = ChatOpenAI(model=self.model_name, api_key=self.apikey)
+                self.llm = ChatOpenAI(model=self.model_name, api_key=self.apikey, rate_limiter=rate_limiter)
             elif self.provider == "google":
-                self.llm = ChatGoogleGenerativeAI(model=self.model_name, api_key=self.apikey)
+                self.llm = ChatGoogleGenerativeAI(model=self.model_name, api_key=self.apikey, rate_limiter=rate_limiter)
                 
 
         
@@ -1,12 +1,16 @@
 import questionary as qy
-from ..api_agent import api_Agent
+from .api_chat import api_Agent
+from .local_chat import local_Agent
 
 from langchain_core.vectorstores import InMemoryVectorStore
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import HumanMessage, SystemMessage, messages_from_dict, messages_to_dict
 from ..vars import *
 from core.tools.search import search
 from core.tools.pdf_loader import load_pdf, load_dir_of_pdfs
+from core.coordinators.context_window import ContextWindow
+from core.coordinators.state import AgentContextState
+from core.utils.checkpointer import get_shared_checkpointer
+from core.utils.response_cache import get_shared_response_cache, make_cache_key
 from langgraph.prebuilt import create_react_agent
 
 
@@ -15,23 +19,37 @@ class ChatAgent():
     prompts for which AI provider you want to use, from a list then
     then prompts which model from the provider
     """
-    def create_agent(self, name, provider, model):
-        agent = api_Agent(name=name, provider=provider)
+    def create_agent(self, name, provider, model, response_cache=None, checkpointer=None, context_budget=None):
+        if provider == "local":
+            agent = local_Agent(name=name, provider=provider)
+        else:
+            agent = api_Agent(name=name, provider=provider)
         print("")
+        self.provider = provider
         self.model = model
         agent.init_model(model=self.model)
         print("")
-        self.memory = MemorySaver()
+        # conversations persist across restarts; see core.utils.checkpointer for retention
+        self.memory = checkpointer if checkpointer is not None else get_shared_checkpointer()
+        self.system_message = None
+        self.response_cache = response_cache if response_cache is not None else get_shared_response_cache()
         tools = [search, load_pdf, load_dir_of_pdfs]
-        agent = create_react_agent(agent.llm, tools ,checkpointer=self.memory)
+        # the model sees a token-bounded window of the history plus a rolling summary
+        if context_budget is None:
+            context_budget = context_token_budgets.get(model, default_context_token_budget)
+        self.context_window = ContextWindow(max_tokens=context_budget, summarizer=agent.llm)
+        agent = create_react_agent(
+            agent.llm, tools, checkpointer=self.memory,
+            pre_model_hook=self.context_window, state_schema=AgentContextState,
+        )
         self.agent = agent
         return
     
     def set_system_message(self, message):
-        self.set_system_message = message
+        self.system_message = message
     
     def invoke_agent(self, prompt, config):
-        if self.system_prompt:
+        if self.system_message:
             
             content = [
                 SystemMessage(
@@ -47,7 +65,28 @@ class ChatAgent():
                     content=prompt
                 )
             ]
-        output = self.agent.invoke(content, config)
-        
+
+        if self.response_cache is None:
+            return self.agent.invoke({"messages": content}, config)
+
+        # the key covers the thread's history so a cached answer is only reused
+        # for an identical conversation, not just an identical prompt
+        history = self.agent.get_state(config).values.get("messages", [])
+        key = make_cache_key(
+            self.model,
+            [{"role": m.type, "content": m.content} for m in history + content],
+            provider=self.provider,
+        )
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            self.agent.update_state(
+                config, {"messages": content + messages_from_dict(cached)}, as_node="agent"
+            )
+            return self.agent.get_state(config).values
+
+        output = self.agent.invoke({"messages": content}, config)
+        # everything after the history and the new input was produced by this turn
+        produced = output["messages"][len(history) + len(content):]
+        self.response_cache.put(key, messages_to_dict(produced))
         return output
-    
\ No newline at end of file
+
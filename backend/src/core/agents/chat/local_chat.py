@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import os
+import random
+import time
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from ..vars import chat_models_by_prov
+
+_VOCABULARY = (
+    "the form request approval policy review section office record filing deadline "
+    "department compliance notice applicant document process committee budget report "
+    "requirement permit schedule signature clause audit register submission agency "
+    "should must may will be is are for with under within before after each every"
+).split()
+
+
+class LocalResponder:
+    """
+    Deterministic offline text generator with a configurable latency profile.
+
+    The reply depends only on the model name and the messages, so repeated
+    requests return identical text. Timing follows a log-normal time to first
+    token and a jittered per-token rate, so load tests see realistic pacing
+    without a network call.
+    """
+
+    def __init__(self, first_token_latency: float = None, tokens_per_second: float = None, response_tokens: int = None, latency_sigma: float = 0.5):
+        """
+        Parameters:
+            first_token_latency (float): Median seconds before the first token
+                                         (LOCAL_CHAT_LATENCY_MS, default 300 ms).
+            tokens_per_second (float): Mean generation rate (LOCAL_CHAT_TOKENS_PER_SECOND, default 50).
+            response_tokens (int): Tokens per reply (LOCAL_CHAT_RESPONSE_TOKENS, default 80).
+            latency_sigma (float): Log-normal shape of the first-token latency.
+        """
+        if first_token_latency is None:
+            first_token_latency = float(os.getenv("LOCAL_CHAT_LATENCY_MS", "300")) / 1000
+        if tokens_per_second is None:
+            tokens_per_second = float(os.getenv("LOCAL_CHAT_TOKENS_PER_SECOND", "50"))
+        if response_tokens is None:
+            response_tokens = int(os.getenv("LOCAL_CHAT_RESPONSE_TOKENS", "80"))
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.latency_sigma = latency_sigma
+
+    def _tokens(self, model: str, messages: list) -> list:
+        digest = hashlib.sha256(repr((model, messages)).encode("utf-8")).digest()
+        rng = random.Random(digest)
+        prompt = messages[-1]["content"] if messages else ""
+        if model == "local-echo":
+            head = f"[{model}] You said: {prompt[:200]}"
+            return [word + " " for word in head.split()]
+        return [rng.choice(_VOCABULARY) + " " for _ in range(self.response_tokens)]
+
+    def _delays(self, n_tokens: int):
+        rng = random.Random()
+        first = self.first_token_latency * rng.lognormvariate(0.0, self.latency_sigma) if self.first_token_latency > 0 else 0.0
+        yield first
+        mean_gap = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for _ in range(n_tokens - 1):
+            yield rng.expovariate(1.0 / mean_gap) if mean_gap else 0.0
+
+    def stream(self, model: str, messages: list) -> Iterator[str]:
+        tokens = self._tokens(model, messages)
+        for token, delay in zip(tokens, self._delays(len(tokens))):
+            if delay:
+                time.sleep(delay)
+            yield token
+
+    async def astream(self, model: str, messages: list) -> AsyncIterator[str]:
+        tokens = self._tokens(model, messages)
+        for token, delay in zip(tokens, self._delays(len(tokens))):
+            if delay:
+                await asyncio.sleep(delay)
+            yield token
+
+
+def _as_dicts(messages: list) -> list:
+    return [{"role": m.type, "content": m.content} for m in messages]
+
+
+class LocalChatClient:
+    """
+    Chat client with the same interface as llm_client.OpenAIChatClient that
+    answers from a LocalResponder instead of a provider.
+    """
+
+    provider = "local"
+
+    def __init__(self, api_key: str = None, responder: LocalResponder = None):
+        self.api_key = api_key
+        self.responder = responder or LocalResponder()
+
+    def complete(self, model: str, messages: list, **params) -> str:
+        return "".join(self.responder.stream(model, messages))
+
+    async def acomplete(self, model: str, messages: list, **params) -> str:
+        return "".join([token async for token in self.responder.astream(model, messages)])
+
+    async def astream(self, model: str, messages: list, **params):
+        async for token in self.responder.astream(model, messages):
+            yield token
+
+    async def aclose(self) -> None:
+        pass
+
+
+class LocalChatModel(BaseChatModel):
+    """
+    LangChain chat model backed by LocalResponder, usable anywhere ChatOpenAI is.
+    Tools can be bound but are never called.
+    """
+
+    model_name: str = "local-lorem"
+    responder: Any = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.responder is None:
+            self.responder = LocalResponder()
+
+    @property
+    def _llm_type(self) -> str:
+        return "local"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list] = None, run_manager=None, **kwargs) -> ChatResult:
+        text = "".join(self.responder.stream(self.model_name, _as_dicts(messages)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list] = None, run_manager=None, **kwargs) -> ChatResult:
+        text = "".join([token async for token in self.responder.astream(self.model_name, _as_dicts(messages))])
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages: list[BaseMessage], stop: Optional[list] = None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        for token in self.responder.stream(self.model_name, _as_dicts(messages)):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: list[BaseMessage], stop: Optional[list] = None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        async for token in self.responder.astream(self.model_name, _as_dicts(messages)):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+class local_Agent():
+    """
+    Local chat backend with the same interface as api_Agent.
+    """
+    def __init__(self, name, provider="local"):
+        self.provider = provider
+        self.name = name
+
+    def get_provider_model_names(self):
+        return list(chat_models_by_prov["local"])
+
+    def init_model(self, model):
+        if model in self.get_provider_model_names():
+            self.model_name = model
+            self.llm = LocalChatModel(model_name=self.model_name)
+        else:
+            print(f"invalid model name for {self.provider}")
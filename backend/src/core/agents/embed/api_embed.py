@@ -2,6 +2,7 @@ from langchain_openai import OpenAIEmbeddings
 from openai import OpenAI
 import google.generativeai as genai
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from ..model_catalog import model_catalog
 
 
 class api_Embed():
@@ -32,7 +33,7 @@ class api_Embed():
         
     
     def init_model(self, model):
-        if model in self.get_provider_model_names():
+        if model in model_catalog.get("embed", self.provider, self.get_provider_model_names):
             self.model_name = model
         else:
             print(f"invalid model name for {self.provider}")
@@ -0,0 +1,183 @@
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+
+
+def text_key(model: str, text: str, kind: str = "document") -> str:
+    """
+    Content hash identifying the embedding of text by model.
+    """
+    return hashlib.sha256(f"{model}\x00{kind}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Embeddings keyed by content hash, stored as float32 blobs in SQLite.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys: list) -> dict:
+        """
+        Returns {key: vector} for the keys that are cached.
+        """
+        found = {}
+        conn = self._connection()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            )
+            for key, blob in rows:
+                found[key] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, items: dict) -> None:
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                ((key, array("f", vector).tobytes()) for key, vector in items.items()),
+            )
+
+
+class BatchingEmbedder(Embeddings):
+    """
+    Wraps an Embeddings model so that document embeddings from concurrent
+    callers are coalesced into provider-sized batches.
+
+    Requests wait at most max_wait seconds for other requests to join their
+    batch. Identical texts are embedded once per batch, and every result is
+    stored in an optional content-hash cache so unchanged texts never reach the
+    provider again.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, max_batch_size: int = 100, max_wait: float = 0.01, max_concurrent_batches: int = 4, cache: EmbeddingCache = None):
+        """
+        Parameters:
+            embeddings (Embeddings): Underlying provider model.
+            model_name (str): Name used in cache keys, e.g. "openai/text-embedding-3-small".
+                              The cache_id of embeddings that have one is appended.
+            max_batch_size (int): Most texts sent in one provider request.
+            max_wait (float): Seconds a batch waits for more texts before it is sent.
+            max_concurrent_batches (int): Provider requests in flight at once.
+            cache (EmbeddingCache): Optional persistent cache.
+        """
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.cache = cache
+        self._pending = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_batches, thread_name_prefix="embed-batch")
+        self._worker = threading.Thread(target=self._collect_batches, daemon=True)
+        self._worker.start()
+
+    @property
+    def cache_model(self) -> str:
+        # models whose vectors depend on their version or state, such as a
+        # fitted IDF table, expose a cache_id that is read on every call
+        cache_id = getattr(self.embeddings, "cache_id", None)
+        return self.model_name if cache_id is None else f"{self.model_name}@{cache_id}"
+
+    def embed_documents(self, texts: list) -> list:
+        texts = list(texts)
+        unique = list(dict.fromkeys(texts))
+        cache_model = self.cache_model
+        keys = {text: text_key(cache_model, text) for text in unique}
+        vectors = self.cache.get_many(list(keys.values())) if self.cache else {}
+
+        futures = {}
+        for text in unique:
+            if keys[text] not in vectors:
+                future = Future()
+                self._pending.put((text, future))
+                futures[text] = future
+        for text, future in futures.items():
+            vectors[keys[text]] = future.result()
+        return [vectors[keys[text]] for text in texts]
+
+    def embed_query(self, text: str) -> list:
+        # queries may be embedded differently from documents, so they are not batched
+        key = text_key(self.cache_model, text, kind="query")
+        if self.cache:
+            cached = self.cache.get_many([key])
+            if key in cached:
+                return cached[key]
+        vector = self.embeddings.embed_query(text)
+        if self.cache:
+            self.cache.put_many({key: vector})
+        return vector
+
+    def _collect_batches(self) -> None:
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._embed_batch, batch)
+
+    def _embed_batch(self, batch: list) -> None:
+        waiters = {}
+        for text, future in batch:
+            waiters.setdefault(text, []).append(future)
+        texts = list(waiters)
+        cache_model = self.cache_model
+        try:
+            vectors = self.embeddings.embed_documents(texts)
+        except Exception as e:
+            for futures in waiters.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+        if self.cache:
+            self.cache.put_many({text_key(cache_model, t): v for t, v in zip(texts, vectors)})
+        for text, vector in zip(texts, vectors):
+            for future in waiters[text]:
+                future.set_result(vector)
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_embedding_cache():
+    """
+    Returns the process-wide embedding cache stored at EMBEDDING_CACHE_PATH
+    (default embedding_cache.db). Set EMBEDDING_CACHE_PATH to an empty string to
+    disable it.
+    """
+    global _shared_cache
+    path = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db")
+    if not path:
+        return None
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = EmbeddingCache(path)
+    return _shared_cache
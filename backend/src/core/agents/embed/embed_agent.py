@@ -1,6 +1,8 @@
 
 import questionary as qy
-from api_embed import api_Embed
+from .api_embed import api_Embed
+from .local_embed import local_Embed
+from .batch_embedder import BatchingEmbedder, get_shared_embedding_cache
 
 from langchain_core.vectorstores import InMemoryVectorStore
 from langgraph.checkpoint.memory import MemorySaver
@@ -20,19 +22,32 @@ class EmbedAgent():
         provider = qy.select("Which provider",
                 embed_models_by_prov.keys()).ask()
         name = qy.text("Name for agent?").ask()
-        agent = api_Embed(name=name, provider=provider)
+        if provider == "local":
+            agent = local_Embed(name=name, provider=provider)
+        else:
+            agent = api_Embed(name=name, provider=provider)
         print("")
         self.model = qy.select("Which Model", 
                         embed_models_by_prov[provider]
                         ).ask() 
         agent.init_model(model=self.model)
         print("")
-        self.agent = agent.agent
+        # concurrent calls are coalesced into provider-sized batches and cached by content
+        self.agent = BatchingEmbedder(
+            agent.agent,
+            model_name=f"{provider}/{self.model}",
+            max_batch_size=embed_batch_limits[provider],
+            cache=get_shared_embedding_cache(),
+        )
         return
     
     def invoke_agent(self, prompt, config=None):
         # For embeddings, you typically don't need to include system or human messages.
         # Simply compute and return the embedding for the prompt.
-        output = self.agent.embed(prompt)
+        output = self.agent.embed_query(prompt)
         return output
+
+    def invoke_agent_batch(self, prompts, config=None):
+        # Embeds many texts at once; duplicates and cached texts cost no API calls.
+        return self.agent.embed_documents(prompts)
     
\ No newline at end of file
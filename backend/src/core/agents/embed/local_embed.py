@@ -0,0 +1,267 @@
+import hashlib
+import multiprocessing
+import os
+import re
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# odd multipliers deriving independent hashes from one crc32
+_HASH_MULTIPLIERS = np.array([0x9E3779B1, 0x85EBCA77, 0xC2B2AE3D, 0x27D4EB2F, 0x165667B1, 0xD3A2646D, 0xFD7046C5, 0xB55A4F09], dtype=np.uint64)
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+# bumped whenever a change to the hashing changes the vectors, so cached
+# vectors of the old scheme are not mixed with new ones
+HASHING_VERSION = 2
+_IDF_BITS = 20
+_IDF_FEATURES = 2 ** _IDF_BITS
+_MASK32 = np.uint64(0xFFFFFFFF)
+
+
+def _fmix32(h: np.ndarray) -> np.ndarray:
+    """
+    MurmurHash3 finalizer on uint64 arrays of 32-bit values: every output bit
+    depends on every input bit, so low and high bits are equally usable.
+    """
+    h = h ^ (h >> np.uint64(16))
+    h = (h * np.uint64(0x85EBCA6B)) & _MASK32
+    h = h ^ (h >> np.uint64(13))
+    h = (h * np.uint64(0xC2B2AE35)) & _MASK32
+    return h ^ (h >> np.uint64(16))
+
+_worker_encoder = None
+
+
+def _init_worker(encoder) -> None:
+    global _worker_encoder
+    _worker_encoder = encoder
+
+
+def _encode_in_worker(texts: list) -> np.ndarray:
+    return _worker_encoder._encode(texts)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    CPU-only embeddings from hashed word and character n-grams.
+
+    Every n-gram is hashed with crc32 and spread over n_hashes signed output
+    dimensions, which is a sparse random projection of the n-gram count vector.
+    Counts are weighted by 1 + log(tf) and, after fit(), by a hashed IDF table.
+    Vectors are L2-normalized. Large inputs are encoded in batches on a process
+    pool, so throughput scales with cores.
+    """
+
+    def __init__(self, dim: int = 384, ngram_range: tuple = (3, 5), word_ngrams: bool = True, n_hashes: int = 4, batch_size: int = 256, n_workers: int = None, executor: str = "process"):
+        """
+        Parameters:
+            dim (int): Output dimension.
+            ngram_range (tuple): Inclusive range of character n-gram lengths.
+            word_ngrams (bool): Also hash whole words and word bigrams.
+            n_hashes (int): Output dimensions each n-gram contributes to (at most 8).
+            batch_size (int): Texts per worker task.
+            n_workers (int): Worker count; defaults to os.cpu_count().
+            executor (str): "process", "thread" or "none" for inline encoding.
+        """
+        if not 1 <= n_hashes <= len(_HASH_MULTIPLIERS):
+            raise ValueError(f"n_hashes must be between 1 and {len(_HASH_MULTIPLIERS)}")
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.word_ngrams = word_ngrams
+        self.n_hashes = n_hashes
+        self.batch_size = batch_size
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.executor = executor
+        self.idf = None
+        self._idf_fingerprint = None
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        del state["_pool_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._pool_lock = threading.Lock()
+
+    def _features(self, text: str) -> np.ndarray:
+        tokens = _TOKEN_PATTERN.findall(text.lower())
+        grams = []
+        if self.word_ngrams:
+            grams.extend(tokens)
+            grams.extend(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        low, high = self.ngram_range
+        for token in tokens:
+            padded = f"<{token}>"
+            for n in range(low, high + 1):
+                grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+    def _buckets(self, features: np.ndarray) -> tuple:
+        """
+        Returns the (len(features), n_hashes) output dimensions and signs of features.
+        """
+        hashed = _fmix32((features[:, None] * _HASH_MULTIPLIERS[None, :self.n_hashes]) & _MASK32)
+        # bucket from the high bits (multiply-shift range reduction, any dim),
+        # sign from the lowest bit
+        buckets = ((hashed * np.uint64(self.dim)) >> np.uint64(32)).astype(np.int64)
+        return buckets, np.where(hashed & np.uint64(1), -1.0, 1.0)
+
+    def _encode(self, texts: list) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features, counts = np.unique(self._features(text), return_counts=True)
+            if not len(features):
+                continue
+            weights = 1.0 + np.log(counts)
+            if self.idf is not None:
+                weights *= self.idf[self._idf_index(features)]
+            buckets, signs = self._buckets(features)
+            out[row] = np.bincount(buckets.ravel(), weights=(signs * weights[:, None]).ravel(), minlength=self.dim)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+    @staticmethod
+    def _idf_index(features: np.ndarray) -> np.ndarray:
+        return (_fmix32(features) >> np.uint64(32 - _IDF_BITS)).astype(np.int64)
+
+    def fit(self, texts: list) -> "HashingEmbeddings":
+        """
+        Learns smoothed IDF weights for hashed n-grams from a corpus sample.
+        """
+        df = np.zeros(_IDF_FEATURES, dtype=np.int64)
+        for text in texts:
+            df[np.unique(self._idf_index(self._features(text)))] += 1
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1.0).astype(np.float32)
+        self._idf_fingerprint = hashlib.sha256(self.idf.tobytes()).hexdigest()[:16]
+        # a new IDF table has to reach the workers
+        self.close()
+        return self
+
+    @property
+    def cache_id(self) -> str:
+        """
+        Identifies the vectors this encoder produces: the hashing version, its
+        parameters and a fingerprint of the fitted IDF table.
+        """
+        low, high = self.ngram_range
+        cache_id = f"v{HASHING_VERSION}-d{self.dim}-n{low}_{high}-w{int(self.word_ngrams)}-h{self.n_hashes}"
+        if self._idf_fingerprint is not None:
+            cache_id += f"-idf{self._idf_fingerprint}"
+        return cache_id
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                if self.executor == "process":
+                    # spawn, as encoders are called from embedding worker threads
+                    # and forking a process that runs threads can copy held locks
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.n_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                        initargs=(self,),
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=self.n_workers)
+            return self._pool
+
+    def encode(self, texts: list) -> np.ndarray:
+        """
+        Encodes texts into a (len(texts), dim) float32 matrix.
+        """
+        texts = list(texts)
+        if self.executor == "none" or self.n_workers == 1 or len(texts) <= self.batch_size:
+            return self._encode(texts)
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if self.executor == "process":
+            parts = self._executor().map(_encode_in_worker, batches)
+        else:
+            parts = self._executor().map(self._encode, batches)
+        return np.concatenate(list(parts))
+
+    def embed_documents(self, texts: list) -> list:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> list:
+        return self._encode([text])[0].tolist()
+
+    def close(self) -> None:
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """
+    Local transformer embeddings through the optional sentence-transformers
+    package; backend="onnx" runs the exported ONNX model instead of torch.
+    """
+
+    def __init__(self, model_name: str, backend: str = "torch", batch_size: int = 64):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device="cpu", backend=backend)
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts: list) -> list:
+        return self.model.encode(list(texts), batch_size=self.batch_size, normalize_embeddings=True).tolist()
+
+    def embed_query(self, text: str) -> list:
+        return self.model.encode([text], normalize_embeddings=True)[0].tolist()
+
+
+# hashing models need nothing beyond numpy
+hashing_models = {
+    "hashing-ngram-384": 384,
+    "hashing-ngram-768": 768,
+}
+
+sentence_transformer_models = [
+    "all-MiniLM-L6-v2",
+    "all-mpnet-base-v2",
+]
+
+
+def sentence_transformers_available() -> bool:
+    try:
+        import sentence_transformers  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class local_Embed():
+    """
+    Local embedding backend with the same interface as api_Embed.
+    """
+    def __init__(self, name, provider="local"):
+        self.provider = provider
+        self.name = name
+
+    def get_provider_model_names(self):
+        models = list(hashing_models)
+        if sentence_transformers_available():
+            models.extend(sentence_transformer_models)
+        return models
+
+    def init_model(self, model):
+        if model in self.get_provider_model_names():
+            self.model_name = model
+        else:
+            print(f"invalid model name for {self.provider}")
+            return
+
+        if self.model_name in hashing_models:
+            self.agent = HashingEmbeddings(dim=hashing_models[self.model_name])
+        else:
+            self.agent = SentenceTransformerEmbeddings(
+                self.model_name, backend=os.getenv("LOCAL_EMBED_BACKEND", "torch")
+            )
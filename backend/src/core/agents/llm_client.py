@@ -0,0 +1,281 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+
+import httpx
+import openai
+
+from .chat.local_chat import LocalChatClient
+from core.utils.prompt_cache import cached_tokens, prefix_hash, prompt_cache_tracker
+from core.utils.rate_limiter import estimate_tokens, get_rate_limiter
+
+# Connection pool sizing shared by every client of a provider/key pair.
+MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "200"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "50"))
+REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "600"))
+# rate-limit responses a call waits out in the limiter queue before failing
+RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "6"))
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+    )
+
+
+def _retry_after(error: openai.RateLimitError) -> float:
+    headers = error.response.headers if error.response is not None else {}
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        return float(headers.get("retry-after", 1))
+    except ValueError:
+        return 1.0
+
+
+def _tokens_used(response) -> int:
+    usage = getattr(response, "usage", None)
+    return usage.total_tokens if usage is not None else None
+
+
+class OpenAIChatClient:
+    """
+    Pooled OpenAI chat-completions client bound to a single API key.
+
+    The sync SDK client is created once and shared by every thread. Async SDK
+    clients are created once per event loop, because an httpx connection pool
+    cannot be shared between loops.
+    """
+
+    provider = "openai"
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+        self._lock = threading.Lock()
+        self._sync_client = None
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    @property
+    def sync_client(self) -> openai.OpenAI:
+        if self._sync_client is None:
+            with self._lock:
+                if self._sync_client is None:
+                    self._sync_client = openai.OpenAI(
+                        api_key=self.api_key,
+                        timeout=REQUEST_TIMEOUT,
+                        http_client=openai.DefaultHttpxClient(limits=_pool_limits()),
+                    )
+        return self._sync_client
+
+    @property
+    def async_client(self) -> openai.AsyncOpenAI:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            with self._lock:
+                client = self._async_clients.get(loop)
+                if client is None:
+                    client = openai.AsyncOpenAI(
+                        api_key=self.api_key,
+                        timeout=REQUEST_TIMEOUT,
+                        http_client=openai.DefaultAsyncHttpxClient(limits=_pool_limits()),
+                    )
+                    self._async_clients[loop] = client
+        return client
+
+    def _reservation(self, model: str, messages: list, params: dict) -> tuple:
+        limiter = get_rate_limiter(self.provider, model, self.api_key)
+        max_tokens = params.get("max_tokens") or params.get("max_completion_tokens")
+        return limiter, estimate_tokens(messages, max_tokens)
+
+    def _cache_prefix(self, messages: list, prefix_messages: int, params: dict) -> str:
+        # requests with the same prompt_cache_key are routed to the same
+        # cache, so the key is the hash of the static leading messages
+        if not prefix_messages:
+            return None
+        key = prefix_hash(messages[:prefix_messages])
+        params.setdefault("prompt_cache_key", key)
+        return key
+
+    def _record_usage(self, model: str, key: str, usage) -> None:
+        if key is not None and usage is not None:
+            prompt_cache_tracker.record(self.provider, model, key, usage.prompt_tokens, cached_tokens(usage))
+
+    def _content(self, response, model: str, key: str) -> str:
+        self._record_usage(model, key, getattr(response, "usage", None))
+        return response.choices[0].message.content
+
+    def complete(self, model: str, messages: list, prefix_messages: int = 0, **params) -> str:
+        """
+        Runs a chat completion and returns the content of the first choice.
+        Calls queue in the shared rate limiter of the model, and rate-limit
+        responses are waited out up to RATE_LIMIT_RETRIES times.
+
+        The first prefix_messages messages are the static part of the prompt;
+        they key the provider's prompt cache, and cached prompt tokens are
+        reported to core.utils.prompt_cache.prompt_cache_tracker.
+        """
+        key = self._cache_prefix(messages, prefix_messages, params)
+        limiter, tokens = self._reservation(model, messages, params)
+        if limiter is None:
+            response = self.sync_client.chat.completions.create(
+                model=model, messages=messages, **params
+            )
+            return self._content(response, model, key)
+        attempt = 0
+        while True:
+            limiter.acquire(tokens)
+            start = time.monotonic()
+            try:
+                response = self.sync_client.chat.completions.create(
+                    model=model, messages=messages, **params
+                )
+            except openai.RateLimitError as e:
+                limiter.release(rate_limited=True, retry_after=_retry_after(e), tokens_reserved=tokens)
+                attempt += 1
+                if attempt > RATE_LIMIT_RETRIES:
+                    raise
+                continue
+            except BaseException:
+                limiter.release(tokens_reserved=tokens)
+                raise
+            limiter.release(time.monotonic() - start, tokens_used=_tokens_used(response), tokens_reserved=tokens)
+            return self._content(response, model, key)
+
+    async def acomplete(self, model: str, messages: list, prefix_messages: int = 0, **params) -> str:
+        """
+        Async counterpart of complete(); does not block the event loop.
+        """
+        key = self._cache_prefix(messages, prefix_messages, params)
+        limiter, tokens = self._reservation(model, messages, params)
+        if limiter is None:
+            response = await self.async_client.chat.completions.create(
+                model=model, messages=messages, **params
+            )
+            return self._content(response, model, key)
+        attempt = 0
+        while True:
+            await limiter.aacquire(tokens)
+            start = time.monotonic()
+            try:
+                response = await self.async_client.chat.completions.create(
+                    model=model, messages=messages, **params
+                )
+            except openai.RateLimitError as e:
+                limiter.release(rate_limited=True, retry_after=_retry_after(e), tokens_reserved=tokens)
+                attempt += 1
+                if attempt > RATE_LIMIT_RETRIES:
+                    raise
+                continue
+            except BaseException:
+                limiter.release(tokens_reserved=tokens)
+                raise
+            limiter.release(time.monotonic() - start, tokens_used=_tokens_used(response), tokens_reserved=tokens)
+            return self._content(response, model, key)
+
+    async def astream(self, model: str, messages: list, prefix_messages: int = 0, **params):
+        """
+        Streams a chat completion, yielding content deltas as they arrive.
+        A rate-limit response is only waited out before the first delta.
+        """
+        key = self._cache_prefix(messages, prefix_messages, params)
+        if key is not None:
+            # the usage, with its cached tokens, arrives in a final chunk
+            params.setdefault("stream_options", {"include_usage": True})
+        limiter, tokens = self._reservation(model, messages, params)
+        attempt = 0
+        while True:
+            if limiter is not None:
+                await limiter.aacquire(tokens)
+            start = time.monotonic()
+            try:
+                stream = await self.async_client.chat.completions.create(
+                    model=model, messages=messages, stream=True, **params
+                )
+            except openai.RateLimitError as e:
+                if limiter is None:
+                    raise
+                limiter.release(rate_limited=True, retry_after=_retry_after(e), tokens_reserved=tokens)
+                attempt += 1
+                if attempt > RATE_LIMIT_RETRIES:
+                    raise
+                continue
+            except BaseException:
+                if limiter is not None:
+                    limiter.release(tokens_reserved=tokens)
+                raise
+            break
+        completed = False
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                self._record_usage(model, key, getattr(chunk, "usage", None))
+            completed = True
+        finally:
+            if limiter is not None:
+                limiter.release(time.monotonic() - start if completed else None, tokens_reserved=tokens)
+
+    async def aclose(self) -> None:
+        """
+        Closes the async client of the running loop and the sync client.
+        """
+        try:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        except RuntimeError:
+            client = None
+        if client is not None:
+            await client.close()
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+
+chat_client_types = {
+    "openai": OpenAIChatClient,
+    "local": LocalChatClient,
+}
+
+_chat_clients = {}
+_chat_clients_lock = threading.Lock()
+
+
+def get_chat_client(provider: str, api_key: str):
+    """
+    Returns the process-wide chat client for a provider and API key.
+
+    Parameters:
+        provider (str): Provider name, one of chat_client_types.
+        api_key (str): API key the client authenticates with.
+
+    Returns:
+        A shared client exposing complete(), acomplete() and astream().
+
+    Raises:
+        ValueError: If the provider is not supported.
+    """
+    key = (provider, api_key)
+    client = _chat_clients.get(key)
+    if client is None:
+        if provider not in chat_client_types:
+            raise ValueError(f"Unsupported LLM provider: {provider}")
+        with _chat_clients_lock:
+            client = _chat_clients.get(key)
+            if client is None:
+                client = chat_client_types[provider](api_key)
+                _chat_clients[key] = client
+    return client
+
+
+async def aclose_chat_clients() -> None:
+    """
+    Closes every shared chat client, e.g. on application shutdown.
+    """
+    with _chat_clients_lock:
+        clients = list(_chat_clients.values())
+        _chat_clients.clear()
+    for client in clients:
+        await client.aclose()
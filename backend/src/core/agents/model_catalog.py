@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from .vars import chat_models_by_prov, embed_models_by_prov
+
+
+class ModelCatalog:
+    """
+    Process-wide cache of the model names each provider offers.
+
+    Lookups never wait on the network: a fresh entry is returned as is, a stale
+    entry is returned while a background thread refreshes it, and a missing
+    entry falls back to the on-disk snapshot or the static tables in vars.py
+    until the first refresh completes.
+    """
+
+    def __init__(self, ttl: float = 3600.0, snapshot_path: str = None, fallbacks: dict = None, retry_after: float = 60.0):
+        """
+        Parameters:
+            ttl (float): Seconds after which a cached model list is refreshed.
+            snapshot_path (str): Optional JSON file the catalog is persisted to and
+                                 loaded from on cold start.
+            fallbacks (dict): {kind: {provider: [model names]}} used before the
+                              first successful fetch.
+            retry_after (float): Seconds to wait before retrying a failed fetch.
+        """
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self.fallbacks = fallbacks or {}
+        self.retry_after = retry_after
+        self._entries = {}
+        self._refreshing = set()
+        self._failed_at = {}
+        self._lock = threading.Lock()
+        self._load_snapshot()
+
+    def get(self, kind: str, provider: str, fetch) -> list:
+        """
+        Returns the cached model names for a provider.
+
+        Parameters:
+            kind (str): Catalog kind, e.g. "chat" or "embed".
+            provider (str): Provider name.
+            fetch (callable): Zero-argument callable returning the live model list,
+                              invoked in the background when a refresh is due.
+
+        Returns:
+            list: Model names, possibly stale or taken from the fallback table.
+        """
+        key = (kind, provider)
+        entry = self._entries.get(key)
+        if entry is None or time.time() - entry["fetched_at"] > self.ttl:
+            self._schedule_refresh(key, fetch)
+        if entry is None:
+            return self.fallbacks.get(kind, {}).get(provider, [])
+        return entry["models"]
+
+    def refresh(self, kind: str, provider: str, fetch) -> list:
+        """
+        Fetches a provider's model list synchronously and stores it.
+        """
+        models = list(fetch())
+        with self._lock:
+            self._entries[(kind, provider)] = {"models": models, "fetched_at": time.time()}
+            self._failed_at.pop((kind, provider), None)
+        self._save_snapshot()
+        return models
+
+    def _schedule_refresh(self, key, fetch) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            if time.time() - self._failed_at.get(key, 0.0) < self.retry_after:
+                return
+            self._refreshing.add(key)
+        threading.Thread(target=self._background_refresh, args=(key, fetch), daemon=True).start()
+
+    def _background_refresh(self, key, fetch) -> None:
+        try:
+            self.refresh(key[0], key[1], fetch)
+        except Exception as e:
+            logging.warning("Failed to refresh %s models for %s: %s", key[0], key[1], e)
+            with self._lock:
+                self._failed_at[key] = time.time()
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _load_snapshot(self) -> None:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            for name, entry in snapshot.items():
+                kind, provider = name.split("/", 1)
+                self._entries[(kind, provider)] = entry
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring unreadable model catalog snapshot %s: %s", self.snapshot_path, e)
+
+    def _save_snapshot(self) -> None:
+        if not self.snapshot_path:
+            return
+        with self._lock:
+            snapshot = {f"{kind}/{provider}": entry for (kind, provider), entry in self._entries.items()}
+        tmp_path = f"{self.snapshot_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logging.warning("Could not write model catalog snapshot %s: %s", self.snapshot_path, e)
+
+
+model_catalog = ModelCatalog(
+    ttl=float(os.getenv("MODEL_CATALOG_TTL", "3600")),
+    snapshot_path=os.getenv("MODEL_CATALOG_SNAPSHOT"),
+    fallbacks={"chat": chat_models_by_prov, "embed": embed_models_by_prov},
+)
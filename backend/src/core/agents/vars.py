@@ -5,6 +5,9 @@ chat_models_by_prov = {
         ],
     "openai": [
         "gpt-4","gpt-3.5-turbo","gpt-4o"
+        ],
+    "local": [
+        "local-lorem","local-echo"
         ]
 }
 
@@ -14,5 +17,55 @@ embed_models_by_prov = {
         ],
     "openai": [
         'text-embedding-3-large', 'text-embedding-3-small','text-embedding-ada-002'
+        ],
+    "local": [
+        'hashing-ngram-384', 'hashing-ngram-768', 'all-MiniLM-L6-v2', 'all-mpnet-base-v2'
         ]
-}
\ No newline at end of file
+}
+
+# most texts a provider accepts in one embedding request
+embed_batch_limits = {
+    "google": 100,
+    "openai": 2048,
+    "local": 1024,
+}
+
+# prompt tokens of conversation history sent per turn before older turns are
+# folded into a rolling summary (see coordinators/context_window.py)
+context_token_budgets = {
+    "gemini-pro": 16000,
+    "gemini-1.5-flash-latest": 32000,
+    "gpt-4": 4000,
+    "gpt-3.5-turbo": 8000,
+    "gpt-4o": 32000,
+    "local-lorem": 2000,
+    "local-echo": 2000,
+}
+default_context_token_budget = 8000
+
+# provider limits per model ("default" for the rest) for core.utils.rate_limiter;
+# rpm/tpm should match the account tier, max_concurrency bounds the adaptive limit
+rate_limits = {
+    "openai": {
+        "default": {"rpm": 500, "tpm": 200000, "max_concurrency": 64},
+        "o1-mini": {"rpm": 500, "tpm": 200000, "max_concurrency": 64, "target_latency": 60},
+        "gpt-4": {"rpm": 500, "tpm": 10000, "max_concurrency": 32},
+        "gpt-4o": {"rpm": 500, "tpm": 30000, "max_concurrency": 64},
+        "gpt-3.5-turbo": {"rpm": 3500, "tpm": 200000, "max_concurrency": 128},
+    },
+    "google": {
+        "default": {"rpm": 60, "tpm": 32000, "max_concurrency": 16},
+        "gemini-1.5-flash-latest": {"rpm": 1000, "tpm": 1000000, "max_concurrency": 64},
+    },
+}
+
+# models tried, in order, when a model keeps failing or its circuit breaker is
+# open (see core/utils/resilience.py); models not listed fall back to the
+# other models of their provider in chat_models_by_prov
+fallback_chat_models = {
+    "o1-mini": ["gpt-4o", "gpt-3.5-turbo"],
+    "gpt-4": ["gpt-4o", "gpt-3.5-turbo"],
+    "gpt-4o": ["gpt-4", "gpt-3.5-turbo"],
+    "gemini-pro": ["gemini-1.5-flash-latest"],
+    "gemini-1.5-flash-latest": ["gemini-pro"],
+}
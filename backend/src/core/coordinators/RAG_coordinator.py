@@ -1,24 +1,220 @@
+import hashlib
+import os
+import uuid
+from itertools import islice
+
 from ..agents.chat.chat_agent import ChatAgent
 from ..agents.embed.embed_agent import EmbedAgent
 from langgraph.graph import START, StateGraph, END
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from core.utils.bm25_index import BM25Index, reciprocal_rank_fusion
+from core.utils.text_chunker import TextChunker
+from core.utils.vector_store import NumpyVectorStore
+from core.utils.index_manifest import IndexManifest, hash_documents, hash_file
 from .state import State
 
 class coordinator():
     
     def __init__(self):
         self.graph_builder = StateGraph(State)
-        self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        self.vector_store = 
+        self.text_splitter = TextChunker(chunk_size=1000, chunk_overlap=200)
+        # created once an embed agent is attached, see add_embed_agent
+        self.vector_store = None
+        # keyword index over the same chunk ids, see hybrid_search
+        self.keyword_index = BM25Index()
+        # source -> content hash and chunk ids, see refresh
+        self.manifest = IndexManifest()
+        # refresh compacts the store once this share of its rows is deleted
+        self.compact_threshold = 0.2
         
     def add_chat_agent(self, agent: ChatAgent):
         self.chat_agent = agent
     
     def add_embed_agent(self, agent: EmbedAgent):
         self.embed_agent = agent
+        self.vector_store = NumpyVectorStore(agent.agent)
+
+    def add_documents(self, documents):
+        """
+        Splits documents into chunks and indexes them in the vector store.
+        """
+        chunks = self.text_splitter.split_documents(documents)
+        return self._add_chunks(chunks, [str(uuid.uuid4()) for _ in chunks])
+
+    def _add_chunks(self, chunks, ids: list) -> list:
+        texts = [chunk.page_content for chunk in chunks]
+        self.vector_store.add_texts(texts, [chunk.metadata for chunk in chunks], ids=ids)
+        self.keyword_index.add(ids, texts)
+        return ids
+
+    def _delete_chunks(self, ids: list) -> None:
+        self.vector_store.delete(ids)
+        self.keyword_index.delete(ids)
+
+    def add_documents_stream(self, documents, batch_size: int = 64) -> int:
+        """
+        Indexes an iterable of documents batch_size documents at a time, so only
+        one batch and its chunks are held in memory while loading, splitting and
+        embedding. Pairs with the lazy loaders, e.g.
+        add_documents_stream(iter_dir_of_pdfs("archive/")).
+
+        Returns:
+            int: Number of chunks indexed.
+        """
+        documents = iter(documents)
+        indexed = 0
+        while batch := list(islice(documents, batch_size)):
+            indexed += len(self.add_documents(batch))
+        return indexed
+
+    def save_index(self, path: str, dtype: str = "float32"):
+        """
+        Persists the vector store so other processes can memory-map it, along
+        with the keyword index and the refresh manifest.
+        """
+        self.vector_store.save(path, dtype=dtype)
+        self.keyword_index.save(os.path.join(path, "bm25"))
+        self.manifest.save(os.path.join(path, "manifest.json"))
+
+    def load_index(self, path: str):
+        """
+        Memory-maps a vector store saved with save_index(); requires an embed agent.
+        """
+        self.vector_store = NumpyVectorStore.load(path, self.embed_agent.agent)
+        bm25_path = os.path.join(path, "bm25")
+        self.keyword_index = BM25Index.load(bm25_path) if os.path.exists(bm25_path) else BM25Index()
+        self.manifest = IndexManifest.load(os.path.join(path, "manifest.json"))
+
+    def _index_source(self, source: str, content_hash: str, documents, batch_size: int = 64) -> None:
+        # new chunks are added before the old ones are deleted, and the chunks
+        # of a failed attempt are removed again, so a failed refresh leaves
+        # only the previous version searchable and can simply be retried
+        prefix = hashlib.sha256(f"{source}\x00{content_hash}".encode("utf-8")).hexdigest()[:24]
+        documents = iter(documents)
+        chunk_ids = []
+        try:
+            while batch := list(islice(documents, batch_size)):
+                chunks = self.text_splitter.split_documents(batch)
+                ids = [f"{prefix}-{len(chunk_ids) + i}" for i in range(len(chunks))]
+                chunk_ids.extend(ids)
+                self._add_chunks(chunks, ids)
+        except BaseException:
+            self._delete_chunks(chunk_ids)
+            raise
+        stale = self.manifest.chunk_ids(source)
+        if stale:
+            self._delete_chunks(stale)
+        self.manifest.set(source, content_hash, chunk_ids)
+
+    def _finish_refresh(self, seen: set, counts: dict, remove_missing: bool) -> dict:
+        if remove_missing:
+            for source in self.manifest.sources():
+                if source not in seen:
+                    self._delete_chunks(self.manifest.remove(source))
+                    counts["removed"] += 1
+        if self.vector_store.deleted_ratio > self.compact_threshold:
+            self.vector_store.compact()
+        if self.keyword_index.deleted_ratio > self.compact_threshold:
+            self.keyword_index.compact()
+        return counts
+
+    def refresh(self, documents, remove_missing: bool = True) -> dict:
+        """
+        Incrementally brings the index in line with a document set.
+
+        Documents are grouped by metadata["source"], in any order. Sources
+        whose content hash is unchanged are skipped, changed and new sources are
+        re-split and re-embedded and their old chunks tombstoned. The store is
+        compacted once more than compact_threshold of its rows are deleted.
+
+        Parameters:
+            documents (Iterable[Document]): The full current document set.
+            remove_missing (bool): Delete indexed sources absent from documents.
+
+        Returns:
+            dict: Number of added, updated, unchanged and removed sources.
+        """
+        counts = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0}
+        groups = {}
+        for doc in documents:
+            groups.setdefault(doc.metadata.get("source"), []).append(doc)
+        seen = set(groups)
+        for source, group in groups.items():
+            content_hash = hash_documents(group)
+            if self.manifest.is_current(source, content_hash):
+                counts["unchanged"] += 1
+                continue
+            counts["updated" if source in self.manifest else "added"] += 1
+            self._index_source(source, content_hash, group)
+        return self._finish_refresh(seen, counts, remove_missing)
+
+    def refresh_files(self, paths: list, load, remove_missing: bool = True) -> dict:
+        """
+        Like refresh, but detects changes from the file bytes, so unchanged files
+        are not even parsed. Changed files are streamed through load in batches.
+
+        Parameters:
+            paths (list): The full current set of files.
+            load (Callable[[str], Iterable[Document]]): Loader, e.g. pdf_loader.iter_pdf_pages.
+            remove_missing (bool): Delete indexed files absent from paths.
+
+        Returns:
+            dict: Number of added, updated, unchanged and removed files.
+        """
+        counts = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0}
+        seen = set()
+        for path in paths:
+            content_hash = hash_file(path)
+            seen.add(path)
+            if self.manifest.is_current(path, content_hash):
+                counts["unchanged"] += 1
+                continue
+            counts["updated" if path in self.manifest else "added"] += 1
+            self._index_source(path, content_hash, load(path))
+        return self._finish_refresh(seen, counts, remove_missing)
+
+    def retrieve(self, query: str, k: int = 4, filter=None):
+        """
+        Returns the k chunks most similar to the query, optionally filtered on metadata.
+        """
+        return self.vector_store.similarity_search(query, k=k, filter=filter)
+
+    def keyword_search(self, query: str, k: int = 4) -> list:
+        """
+        Returns the k chunks with the best BM25 match for the query.
+        """
+        hits = self.keyword_index.search(query, k=k)
+        return self.vector_store.get_by_ids([id_ for id_, _ in hits])
+
+    def hybrid_search(self, query: str, k: int = 4, filter=None, candidates: int = 50, rrf_k: int = 60, weights: list = None) -> list:
+        """
+        Combines vector and BM25 retrieval with reciprocal rank fusion, so exact
+        identifiers such as form numbers are found even when their embeddings
+        are not close to the query's.
+
+        Parameters:
+            query (str): Search text.
+            k (int): Chunks returned.
+            filter (dict | Callable): Metadata filter applied to both retrievers.
+            candidates (int): Results taken from each retriever before fusion.
+            rrf_k (int): Rank offset of the fusion; larger values flatten it.
+            weights (list): Optional [vector, keyword] weights.
+
+        Returns:
+            list: The k best fused Documents.
+        """
+        vector_ids = [doc.id for doc in self.vector_store.similarity_search(query, k=candidates, filter=filter)]
+        keyword_hits = self.keyword_index.search(query, k=candidates)
+        keyword_docs = self.vector_store.get_by_ids([id_ for id_, _ in keyword_hits])
+        if filter is not None:
+            matches = filter if callable(filter) else (
+                lambda metadata: all(metadata.get(key) == value for key, value in filter.items())
+            )
+            keyword_docs = [doc for doc in keyword_docs if matches(doc.metadata)]
+        fused = reciprocal_rank_fusion([vector_ids, [doc.id for doc in keyword_docs]], k=rrf_k, weights=weights)
+        return self.vector_store.get_by_ids([id_ for id_, _ in fused[:k]])
 
     def init_graph(self):        
-            
+        pass
         
         
     
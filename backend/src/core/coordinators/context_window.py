@@ -0,0 +1,221 @@
+import json
+import threading
+from collections import OrderedDict
+
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+
+from core.utils.text_chunker import get_encoding
+
+SUMMARY_PROMPT = (
+    "You maintain the running summary of a conversation between a user and an "
+    "assistant. Merge the previous summary with the new turns into one concise "
+    "summary of at most {max_words} words. Keep facts, names, numbers, decisions "
+    "and open questions; drop pleasantries. Reply with the summary only."
+)
+
+
+def _message_text(message) -> str:
+    content = message.content
+    text = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False, default=str)
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        text += json.dumps([[call["name"], call["args"]] for call in tool_calls], ensure_ascii=False, default=str)
+    return text
+
+
+class TokenCounter:
+    """
+    Counts message tokens with tiktoken, caching the count of every message.
+
+    A conversation is re-counted on every model call but only its newest
+    messages are new, so counts are cached by message id. The encoding is
+    loaded on first use, since tiktoken may download it. Without a usable
+    tiktoken encoding (not installed, or offline) tokens are estimated at four
+    characters each.
+    """
+
+    # role and framing tokens added per message by chat formats
+    per_message = 4
+
+    def __init__(self, encoding_name: str = "cl100k_base", max_entries: int = 100_000):
+        self.encoding_name = encoding_name
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._counts = OrderedDict()
+        self._encoding_lock = threading.Lock()
+        self._encoding_loaded = False
+        self._encoding_value = None
+
+    @property
+    def _encoding(self):
+        if not self._encoding_loaded:
+            with self._encoding_lock:
+                if not self._encoding_loaded:
+                    try:
+                        self._encoding_value = get_encoding(self.encoding_name)
+                    except Exception:
+                        self._encoding_value = None
+                    self._encoding_loaded = True
+        return self._encoding_value
+
+    def count_text(self, text: str) -> int:
+        if self._encoding is None:
+            return (len(text) + 3) // 4
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Returns the longest prefix of text within max_tokens.
+        """
+        if self._encoding is None:
+            return text[:max_tokens * 4]
+        tokens = self._encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else self._encoding.decode(tokens[:max_tokens])
+
+    def count(self, message) -> int:
+        text = _message_text(message)
+        # the length guards against a message replaced under the same id
+        key = (message.id, len(text)) if message.id else text
+        with self._lock:
+            count = self._counts.get(key)
+            if count is not None:
+                self._counts.move_to_end(key)
+                return count
+        count = self.count_text(text) + self.per_message
+        with self._lock:
+            self._counts[key] = count
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return count
+
+    def count_messages(self, messages) -> int:
+        return sum(self.count(message) for message in messages)
+
+
+token_counter = TokenCounter()
+
+
+class ContextWindow:
+    """
+    Bounds the prompt sent to the model on every turn.
+
+    The graph state keeps the full history, but the model sees only the latest
+    system message, a rolling summary of older turns and the newest turns
+    verbatim. Once the turns not yet summarized exceed max_tokens, the oldest
+    of them are folded into the summary until keep_tokens remain, so the
+    summarizer runs once every few turns rather than on every call and the
+    prompt stays under max_tokens plus summary_tokens however long the
+    conversation grows. Without a summarizer the folded turns are dropped.
+
+    Used as the pre_model_hook of create_react_agent; the summary is kept in
+    the state's summary and summarized_through keys (see state.AgentContextState).
+    """
+
+    def __init__(self, max_tokens: int, keep_tokens: int = None, summary_tokens: int = 512, summarizer=None, counter: TokenCounter = None):
+        """
+        Parameters:
+            max_tokens (int): Most tokens of unsummarized turns sent to the model.
+            keep_tokens (int): Tokens kept verbatim after folding; defaults to half of max_tokens.
+            summary_tokens (int): Most tokens of the rolling summary.
+            summarizer (BaseChatModel): Model that writes the summary.
+            counter (TokenCounter): Token counter; defaults to the shared one.
+        """
+        keep_tokens = max_tokens // 2 if keep_tokens is None else keep_tokens
+        if not 0 < keep_tokens <= max_tokens:
+            raise ValueError("keep_tokens must be positive and at most max_tokens")
+        self.max_tokens = max_tokens
+        self.keep_tokens = keep_tokens
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer
+        self.counter = counter or token_counter
+
+    def _keep_start(self, turns: list) -> int:
+        # index of the oldest turn kept verbatim: as many of the newest turns
+        # as fit in keep_tokens, but always the newest one. An AIMessage and
+        # the ToolMessages answering its tool calls are kept or folded
+        # together, as providers reject a tool result without its tool call.
+        used = 0
+        start = len(turns)
+        while start > 0:
+            group_start = start - 1
+            while group_start > 0 and isinstance(turns[group_start], ToolMessage):
+                group_start -= 1
+            used += self.counter.count_messages(turns[group_start:start])
+            if used > self.keep_tokens and start < len(turns):
+                break
+            start = group_start
+        return start
+
+    def _fit(self, turns: list) -> list:
+        """
+        Truncates the tool results among turns so they fit max_tokens, for
+        when the newest tool call group alone is over budget.
+        """
+        excess = self.counter.count_messages(turns) - self.max_tokens
+        tool_results = [i for i, message in enumerate(turns) if isinstance(message, ToolMessage)]
+        if excess <= 0 or not tool_results:
+            return turns
+        turns = list(turns)
+        # largest results first, each cut by at most what is still over budget
+        for i in sorted(tool_results, key=lambda i: self.counter.count(turns[i]), reverse=True):
+            if excess <= 0:
+                break
+            text = _message_text(turns[i])
+            tokens = self.counter.count_text(text)
+            keep = max(0, tokens - excess - 16)
+            content = self.counter.truncate(text, keep) + "\n[truncated to fit the context window]"
+            excess -= tokens - self.counter.count_text(content)
+            turns[i] = turns[i].model_copy(update={"content": content})
+        return turns
+
+    def summarize(self, summary: str, turns: list) -> str:
+        """
+        Merges turns into the previous summary.
+        """
+        if self.summarizer is None:
+            return ""
+        transcript = "\n".join(f"{message.type}: {_message_text(message)}" for message in turns)
+        if summary:
+            transcript = f"Previous summary:\n{summary}\n\nNew turns:\n{transcript}"
+        response = self.summarizer.invoke([
+            SystemMessage(content=SUMMARY_PROMPT.format(max_words=int(self.summary_tokens * 0.75))),
+            HumanMessage(content=transcript),
+        ])
+        return self.counter.truncate(str(response.content).strip(), self.summary_tokens)
+
+    def __call__(self, state) -> dict:
+        messages = state["messages"]
+        summary = state.get("summary", "")
+        summarized_through = state.get("summarized_through")
+
+        start = 0
+        if summarized_through:
+            for i in range(len(messages) - 1, -1, -1):
+                if messages[i].id == summarized_through:
+                    start = i + 1
+                    break
+        system = None
+        turns = []
+        for message in messages[start:]:
+            if isinstance(message, SystemMessage):
+                system = message
+            else:
+                turns.append(message)
+        if system is None:
+            system = next((m for m in reversed(messages[:start]) if isinstance(m, SystemMessage)), None)
+
+        update = {}
+        if self.counter.count_messages(turns) > self.max_tokens:
+            keep_start = self._keep_start(turns)
+            if keep_start > 0:
+                summary = self.summarize(summary, turns[:keep_start])
+                update = {"summary": summary, "summarized_through": turns[keep_start - 1].id}
+                turns = turns[keep_start:]
+            turns = self._fit(turns)
+
+        # one system message, as some providers reject several
+        if summary:
+            summary = f"Summary of the earlier conversation:\n{summary}"
+            system = SystemMessage(content=f"{system.content}\n\n{summary}" if system is not None else summary)
+        update["llm_input_messages"] = ([system] if system is not None else []) + turns
+        return update
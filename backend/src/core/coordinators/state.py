@@ -1,9 +1,19 @@
 from typing import Annotated
-from typing_extensions import TypedDict
+from typing_extensions import NotRequired, TypedDict
 from langgraph.graph.message import add_messages
+from langgraph.prebuilt.chat_agent_executor import AgentState
 
 class State(TypedDict):
     # Messages have the type "list". The `add_messages` function
     # in the annotation defines how this state key should be updated
     # (in this case, it appends messages to the list, rather than overwriting them)
-    messages: Annotated[list, add_messages]
\ No newline at end of file
+    messages: Annotated[list, add_messages]
+    # rolling summary of the turns folded out of the model's context,
+    # and the id of the last folded message (see context_window.py)
+    summary: NotRequired[str]
+    summarized_through: NotRequired[str]
+
+class AgentContextState(AgentState):
+    # State of create_react_agent graphs using ContextWindow as pre_model_hook
+    summary: NotRequired[str]
+    summarized_through: NotRequired[str]
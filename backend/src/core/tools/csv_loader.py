@@ -1,7 +1,10 @@
 import logging
-from langchain_community.document_loaders.csv_loader import CSVLoader, UnstructuredCSVLoader
+from langchain_community.document_loaders.csv_loader import UnstructuredCSVLoader
 from langchain_core.tools import tool
 
+from core.tools.ingest import ingestion_engine
+from core.tools.tabular import iter_table_documents
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -18,11 +21,7 @@ def load_structured_csv(file_path: str, csv_args: dict):
         list: List of loaded documents from the CSV file.
     """
     try:
-        loader = CSVLoader(
-            file_path=file_path,
-            csv_args=csv_args
-        )
-        data = loader.load()
+        data = ingestion_engine.load("csv", file_path, csv_args=csv_args)
         logging.info("Successfully loaded structured CSV file: %s", file_path)
         return data
     except Exception as e:
@@ -53,7 +52,36 @@ def load_unstructured_csv(file_path: str, mode: str):
         logging.error("Error loading unstructured CSV file: %s - %s", file_path, str(e))
         return []
 
+@tool
+def load_csv_chunked(file_path: str, rows_per_document: int = 100, summarize: bool = False, max_rows: int = None, csv_args: dict = None):
+    """
+    Loads a large CSV file in streamed, columnar chunks, grouping rows_per_document
+    rows into each Document instead of creating one Document per row.
+    
+    Parameters:
+        file_path (str): Path to the CSV file.
+        rows_per_document (int): Rows grouped into one Document (default is 100).
+        summarize (bool): Return one column summary per 10,000-row chunk instead of the rows.
+        max_rows (int): Stop after roughly this many rows (default is the whole file).
+        csv_args (dict): Dictionary of CSV arguments (e.g., delimiter, quotechar, fieldnames).
+    
+    Returns:
+        list: List of grouped or summary documents from the CSV file.
+    """
+    try:
+        data = []
+        for doc in iter_table_documents(file_path, rows_per_document=rows_per_document, summarize=summarize, csv_args=csv_args):
+            data.append(doc)
+            if max_rows is not None and doc.metadata["row_end"] >= max_rows:
+                break
+        logging.info("Successfully loaded CSV file in chunks: %s", file_path)
+        return data
+    except Exception as e:
+        logging.error("Error loading CSV file in chunks: %s - %s", file_path, str(e))
+        return []
+
 # Example usage:
 # structured_data = load_structured_csv("example_data/mlb_teams_2012.csv", {"delimiter": ",", "quotechar": '"', "fieldnames": ["MLB Team", "Payroll in millions", "Wins"]})
 # unstructured_data = load_unstructured_csv("example_data/mlb_teams_2012.csv", "elements")
 # print(unstructured_data[0].metadata["text_as_html"])
+# erp_summary = load_csv_chunked("example_data/erp_export.csv", summarize=True)
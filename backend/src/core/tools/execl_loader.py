@@ -1,7 +1,9 @@
 import logging
-from langchain_community.document_loaders import UnstructuredExcelLoader
 from langchain_core.tools import tool
 
+from core.tools.ingest import ingestion_engine
+from core.tools.tabular import iter_table_documents
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -18,17 +20,42 @@ def load_excel(file_path: str, mode: str = "elements"):
         list: List of loaded documents from the Excel file.
     """
     try:
-        loader = UnstructuredExcelLoader(
-            file_path=file_path,
-            mode=mode
-        )
-        data = loader.load()
+        data = ingestion_engine.load("excel", file_path, mode=mode)
         logging.info("Successfully loaded Excel file: %s", file_path)
         return data
     except Exception as e:
         logging.error("Error loading Excel file: %s - %s", file_path, str(e))
         return []
 
+@tool
+def load_excel_chunked(file_path: str, rows_per_document: int = 100, summarize: bool = False, sheet_name: str = None, max_rows: int = None):
+    """
+    Loads a large .xlsx file in streamed, columnar chunks, grouping
+    rows_per_document rows of a sheet into each Document.
+    
+    Parameters:
+        file_path (str): Path to the Excel file.
+        rows_per_document (int): Rows grouped into one Document (default is 100).
+        summarize (bool): Return one column summary per 10,000-row chunk instead of the rows.
+        sheet_name (str): Only load this sheet (default is all sheets).
+        max_rows (int): Stop after roughly this many rows of a sheet (default is all rows).
+    
+    Returns:
+        list: List of grouped or summary documents from the Excel file.
+    """
+    try:
+        data = []
+        for doc in iter_table_documents(file_path, rows_per_document=rows_per_document, summarize=summarize, sheet_name=sheet_name, max_rows=max_rows):
+            # the last chunk read of a sheet may run past max_rows
+            if max_rows is not None and doc.metadata["row_start"] >= max_rows:
+                continue
+            data.append(doc)
+        logging.info("Successfully loaded Excel file in chunks: %s", file_path)
+        return data
+    except Exception as e:
+        logging.error("Error loading Excel file in chunks: %s - %s", file_path, str(e))
+        return []
+
 # Example usage:
 # excel_data = load_excel("example_data/stanley-cups.xlsx", mode="elements")
 # print(excel_data[0].metadata["text_as_html"])
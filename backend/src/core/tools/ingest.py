@@ -0,0 +1,260 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+
+def _parse_pdf(path: str) -> list:
+    from langchain_community.document_loaders import PyPDFLoader
+    return PyPDFLoader(path).load()
+
+
+def _parse_excel(path: str, mode: str = "elements") -> list:
+    from langchain_community.document_loaders import UnstructuredExcelLoader
+    return UnstructuredExcelLoader(file_path=path, mode=mode).load()
+
+
+def _parse_csv(path: str, csv_args: dict = None) -> list:
+    from langchain_community.document_loaders.csv_loader import CSVLoader
+    return CSVLoader(file_path=path, csv_args=csv_args).load()
+
+
+def _parse_json(path: str, jq_schema: str = ".messages[].content", text_content: bool = False) -> list:
+    from langchain_community.document_loaders import JSONLoader
+    return JSONLoader(file_path=path, jq_schema=jq_schema, text_content=text_content).load()
+
+
+# loader name -> top-level parse function, picklable for the process pool
+parsers = {
+    "pdf": _parse_pdf,
+    "excel": _parse_excel,
+    "csv": _parse_csv,
+    "json": _parse_json,
+}
+
+
+def _run_parser(loader: str, path: str, loader_args: dict) -> list:
+    return parsers[loader](path, **loader_args)
+
+
+def _size(docs: list) -> int:
+    # approximate, one byte per character of text and metadata
+    return sum(len(doc.page_content) + len(str(doc.metadata)) for doc in docs)
+
+
+def _copy(docs: list) -> list:
+    # callers add to doc.metadata, which must not reach the cached Documents
+    return [doc.model_copy(update={"metadata": dict(doc.metadata)}) for doc in docs]
+
+
+class IngestionEngine:
+    """
+    Parses files into langchain Documents on a process pool and caches the
+    results.
+
+    Cache entries are keyed by (absolute path, size, mtime, loader, loader
+    arguments), so an unchanged file is never parsed twice while a modified one
+    is picked up automatically. The memory tier is an LRU bounded by the
+    approximate size of the Documents it holds; an optional directory tier
+    keeps parsed files across restarts. Callers get copies of the cached
+    Documents.
+    """
+
+    def __init__(self, max_workers: int = None, cache_bytes: int = 256 * 2 ** 20, cache_dir: str = None, cache_dir_entries: int = 100000):
+        """
+        Parameters:
+            max_workers (int): Parser processes; defaults to os.cpu_count().
+            cache_bytes (int): Approximate size of the parsed files kept in memory.
+            cache_dir (str): Optional directory for the on-disk cache tier.
+            cache_dir_entries (int): Parsed files kept in cache_dir.
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache_bytes = cache_bytes
+        self._memory_bytes = 0
+        self.cache_dir = cache_dir
+        self.cache_dir_entries = cache_dir_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def cache_key(loader: str, path: str, loader_args: dict) -> str:
+        stat = os.stat(path)
+        payload = json.dumps(
+            [loader, os.path.abspath(path), stat.st_size, stat.st_mtime_ns, loader_args],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _cached(self, key: str):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry[0]
+        if self.cache_dir:
+            cache_path = os.path.join(self.cache_dir, f"{key}.pkl")
+            try:
+                with open(cache_path, "rb") as f:
+                    docs = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                return None
+            os.utime(cache_path)
+            self._remember(key, docs)
+            return docs
+        return None
+
+    def _remember(self, key: str, docs: list) -> None:
+        size = _size(docs)
+        if size > self.cache_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= previous[1]
+            self._memory[key] = (docs, size)
+            self._memory_bytes += size
+            while self._memory_bytes > self.cache_bytes:
+                _, (_, evicted) = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted
+
+    def _store(self, key: str, docs: list) -> None:
+        self._remember(key, docs)
+        if not self.cache_dir:
+            return
+        tmp_path = os.path.join(self.cache_dir, f"{key}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(docs, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, os.path.join(self.cache_dir, f"{key}.pkl"))
+
+    def evict_disk_cache(self) -> int:
+        """
+        Trims the directory tier to cache_dir_entries, least recently used first.
+
+        Returns:
+            int: Number of cache files removed.
+        """
+        if not self.cache_dir:
+            return 0
+        entries = [e for e in os.scandir(self.cache_dir) if e.name.endswith(".pkl")]
+        excess = len(entries) - self.cache_dir_entries
+        if excess <= 0:
+            return 0
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:excess]:
+            os.remove(entry.path)
+        return excess
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn, as forking a process that runs threads can copy held locks
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def load(self, loader: str, path: str, **loader_args) -> list:
+        """
+        Parses one file, or returns its cached Documents.
+
+        Raises:
+            Exception: The parser's error if the file cannot be parsed.
+        """
+        errors = {}
+        documents = self.load_many(loader, [path], errors=errors, **loader_args)
+        if errors:
+            raise errors[path]
+        return documents
+
+    def load_many(self, loader: str, paths: list, errors: dict = None, **loader_args) -> list:
+        """
+        Parses many files with the same loader, fanning uncached files out over
+        the process pool.
+
+        Every file is cached as soon as it is parsed. A file that fails to
+        parse is logged and left out, so one corrupt file does not discard the
+        others and a rerun only parses what failed.
+
+        Parameters:
+            loader (str): One of parsers, e.g. "pdf".
+            paths (list): Files to parse.
+            errors (dict): If given, receives {path: exception} for the files that failed.
+            **loader_args: Arguments passed to the loader.
+
+        Returns:
+            list: Documents of the parsed files, in the order of paths.
+        """
+        if loader not in parsers:
+            raise ValueError(f"Unknown loader: {loader}")
+        keys = [self.cache_key(loader, path, loader_args) for path in paths]
+        results = {}
+        missing = []
+        for path, key in zip(paths, keys):
+            docs = self._cached(key)
+            if docs is None:
+                missing.append((path, key))
+            else:
+                results[key] = docs
+
+        failed = {}
+
+        def finished(path: str, key: str, parse) -> None:
+            try:
+                docs = parse()
+            except Exception as e:
+                logging.error("Error parsing %s file: %s - %s", loader, path, str(e))
+                failed[path] = e
+                return
+            self._store(key, docs)
+            results[key] = docs
+
+        if len(missing) == 1 or self.max_workers == 1:
+            for path, key in missing:
+                finished(path, key, lambda: _run_parser(loader, path, loader_args))
+        elif missing:
+            pool = self._executor()
+            futures = {pool.submit(_run_parser, loader, path, loader_args): (path, key) for path, key in missing}
+            for future in as_completed(futures):
+                path, key = futures[future]
+                finished(path, key, future.result)
+            if any(isinstance(e, BrokenProcessPool) for e in failed.values()):
+                # a crashed worker breaks the pool for good; the next call starts a new one
+                self.close()
+        if missing:
+            logging.info(
+                "Parsed %d of %d %s files, %d from cache, %d failed",
+                len(missing) - len(failed), len(paths), loader, len(paths) - len(missing), len(failed),
+            )
+            if self.cache_dir:
+                self.evict_disk_cache()
+        if errors is not None:
+            errors.update(failed)
+
+        documents = []
+        for key in keys:
+            if key in results:
+                documents.extend(_copy(results[key]))
+        return documents
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+
+ingestion_engine = IngestionEngine(
+    max_workers=int(os.getenv("INGEST_WORKERS", "0")) or None,
+    cache_bytes=int(os.getenv("INGEST_CACHE_BYTES", str(256 * 2 ** 20))),
+    cache_dir=os.getenv("INGEST_CACHE_DIR"),
+)
@@ -1,8 +1,8 @@
 
-from langchain_community.document_loaders import JSONLoader
-
 from langchain_core.tools import tool
 
+from core.tools.ingest import ingestion_engine
+
 @tool
 def load_json(path: str, jq_schema: str = ".messages[].content", text_content: bool = False):
     """
@@ -22,11 +22,5 @@ def load_json(path: str, jq_schema: str = ".messages[].content", text_content: b
         FileNotFoundError: If the file does not exist.
         RuntimeError: If loading the JSON fails.
     """
-    loader = JSONLoader(
-        file_path=path,
-        jq_schema=jq_schema,
-        text_content=text_content,
-    )
-    
-    docs = loader.load()
+    docs = ingestion_engine.load("json", path, jq_schema=jq_schema, text_content=text_content)
     return docs
\ No newline at end of file
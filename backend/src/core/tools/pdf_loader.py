@@ -1,11 +1,85 @@
-from langchain_community.document_loaders import PyPDFLoader, PyPDFDirectoryLoader
+import os
+from pathlib import Path
+from typing import Iterator
+
 from langchain_core.tools import tool
 from langchain.docstore.document import Document
 
+from core.tools.ingest import ingestion_engine
+
+
+def iter_pdf_pages(path: str, start_page: int = 0, end_page: int = None, max_pages: int = None) -> Iterator[Document]:
+    """
+    Lazily yield the pages of a PDF as Documents, one page in memory at a time.
+
+    Only the requested pages are extracted; the file is read through pypdf's
+    incremental reader, so the cost does not depend on the size of the rest of
+    the document.
+
+    Args:
+        path (str): The file path to the PDF.
+        start_page (int): First page to yield, 0-based.
+        end_page (int): Page to stop before; defaults to the end of the document.
+        max_pages (int): Yield at most this many pages.
+
+    Yields:
+        Document: One Document per page with source, page, page_label and
+                  total_pages metadata, as PyPDFLoader produces.
+    """
+    from pypdf import PdfReader
+
+    with open(path, "rb") as f:
+        reader = PdfReader(f)
+        total_pages = len(reader.pages)
+        stop = total_pages if end_page is None else min(end_page, total_pages)
+        if max_pages is not None:
+            stop = min(stop, start_page + max_pages)
+        for page_number in range(start_page, stop):
+            page = reader.pages[page_number]
+            try:
+                page_label = reader.page_labels[page_number]
+            except (IndexError, KeyError):
+                page_label = str(page_number + 1)
+            yield Document(
+                page_content=page.extract_text() or "",
+                metadata={
+                    "source": path,
+                    "page": page_number,
+                    "page_label": page_label,
+                    "total_pages": total_pages,
+                },
+            )
+
+
+def iter_dir_of_pdfs(path: str, max_pages: int = None) -> Iterator[Document]:
+    """
+    Lazily yield the pages of every PDF in a directory, file by file.
+
+    Args:
+        path (str): The directory path containing PDF files.
+        max_pages (int): Yield at most this many pages of each file.
+
+    Yields:
+        Document: One Document per page.
+
+    Raises:
+        ValueError: If the provided path is not a directory.
+    """
+    for file in _pdf_files(path):
+        yield from iter_pdf_pages(file, max_pages=max_pages)
+
+
+def _pdf_files(path: str) -> list:
+    if not os.path.isdir(path):
+        raise ValueError(f"Not a directory: {path}.")
+    return sorted(str(p) for p in Path(path).glob("**/[!.]*.pdf"))
+
+
 @tool
 def load_pdf(path: str) -> Document:
     """
     Load a single PDF file and return its first Document.
+    Only the first page is parsed.
 
     Args:
         path (str): The file path to the PDF.
@@ -16,19 +90,43 @@ def load_pdf(path: str) -> Document:
     Raises:
         ValueError: If no document is loaded from the PDF.
     """
-    loader = PyPDFLoader(path)
-    docs = loader.load()
-    if not docs:
+    doc = next(iter_pdf_pages(path, max_pages=1), None)
+    if doc is None:
         raise ValueError(f"No documents were loaded from {path}.")
-    return docs[0]
+    return doc
+
+@tool
+def load_pdf_pages(path: str, start_page: int = 0, end_page: int = None) -> list[Document]:
+    """
+    Load a range of pages from a PDF file without parsing the other pages.
+
+    Args:
+        path (str): The file path to the PDF.
+        start_page (int): First page to load, 0-based. Defaults to 0.
+        end_page (int): Page to stop before. Defaults to the last page.
+
+    Returns:
+        List[Document]: One Document per loaded page.
+
+    Raises:
+        ValueError: If no pages are loaded from the PDF.
+    """
+    docs = list(iter_pdf_pages(path, start_page=start_page, end_page=end_page))
+    if not docs:
+        raise ValueError(f"No pages were loaded from {path}.")
+    return docs
 
 @tool
-def load_dir_of_pdfs(path: str) -> list[Document]:
+def load_dir_of_pdfs(path: str, max_pages: int = None) -> list[Document]:
     """
     Load all PDF files in a given directory and return a list of Document objects.
+    Files are parsed in parallel and unchanged files are served from the
+    ingestion cache.
 
     Args:
         path (str): The directory path containing PDF files.
+        max_pages (int): Only load the first max_pages pages of each file.
+                         Defaults to all pages.
 
     Returns:
         List[Document]: A list of Document objects loaded from all PDF files in the directory.
@@ -36,10 +134,10 @@ def load_dir_of_pdfs(path: str) -> list[Document]:
     Raises:
         ValueError: If the provided path is not a directory or no PDFs are loaded.
     """
-    
-    loader = PyPDFDirectoryLoader(path)
-    docs = loader.load()
+    if max_pages is not None:
+        docs = list(iter_dir_of_pdfs(path, max_pages=max_pages))
+    else:
+        docs = ingestion_engine.load_many("pdf", _pdf_files(path))
     if not docs:
         raise ValueError(f"No PDF documents were loaded from directory: {path}.")
     return docs
-    
\ No newline at end of file
@@ -0,0 +1,258 @@
+import csv
+import io
+import os
+from itertools import islice
+from typing import Iterator
+
+import numpy as np
+from langchain_core.documents import Document
+
+# csv_args understood by the pyarrow reader, mapped to their pyarrow names
+_ARROW_CSV_ARGS = {"delimiter": "delimiter", "quotechar": "quote_char"}
+
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _as_column(values) -> np.ndarray:
+    """
+    Turns a sequence of cell values into a float64 array when every non-empty
+    cell is numeric, and an object array otherwise.
+    """
+    try:
+        return np.array([np.nan if v in ("", None) else v for v in values], dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array(values, dtype=object)
+
+
+def _iter_arrow_csv(path: str, chunk_rows: int, csv_args: dict) -> Iterator[dict]:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    # quoted cells may span lines, as the csv module allows
+    parse_options = pacsv.ParseOptions(
+        newlines_in_values=True, **{_ARROW_CSV_ARGS[k]: v for k, v in csv_args.items() if k in _ARROW_CSV_ARGS}
+    )
+    read_options = pacsv.ReadOptions(column_names=csv_args.get("fieldnames"))
+    names = csv_args.get("fieldnames") or _csv_header(path, csv_args)
+    if not names:
+        return
+    # pyarrow infers types from the first block only, so a column that turns
+    # non-numeric later (e.g. "AB-12" after 200k ids) would fail mid-stream;
+    # columns are read as strings and typed per chunk instead
+    convert_options = pacsv.ConvertOptions(
+        column_types={name: pa.string() for name in names}, strings_can_be_null=True
+    )
+    reader = pacsv.open_csv(path, read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+
+    def columns(table):
+        return {name: _arrow_to_numpy(col) for name, col in zip(table.column_names, table.columns)}
+
+    pending = []
+    pending_rows = 0
+    for batch in reader:
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        while pending_rows >= chunk_rows:
+            table = pa.Table.from_batches(pending)
+            yield columns(table.slice(0, chunk_rows))
+            rest = table.slice(chunk_rows)
+            pending = rest.to_batches()
+            pending_rows = rest.num_rows
+    if pending_rows:
+        yield columns(pa.Table.from_batches(pending))
+
+
+def _csv_header(path: str, csv_args: dict) -> list:
+    with open(path, newline="", encoding="utf-8") as f:
+        return next(csv.reader(f, **{k: v for k, v in csv_args.items() if k in _ARROW_CSV_ARGS}), None)
+
+
+def _arrow_to_numpy(column) -> np.ndarray:
+    """
+    Like _as_column for a string column: float64 with NaN for empty cells when
+    every non-empty cell of the chunk is numeric, else an object array.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    try:
+        return pc.cast(column, pa.float64()).to_numpy(zero_copy_only=False)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return np.array(pc.fill_null(column, "").to_pylist(), dtype=object)
+
+
+def _iter_python_csv(path: str, chunk_rows: int, csv_args: dict) -> Iterator[dict]:
+    with open(path, newline="", encoding="utf-8") as f:
+        csv_args = dict(csv_args)
+        fieldnames = csv_args.pop("fieldnames", None)
+        reader = csv.reader(f, **csv_args)
+        if fieldnames is None:
+            fieldnames = next(reader, None)
+            if fieldnames is None:
+                return
+        while rows := list(islice(reader, chunk_rows)):
+            cells = zip(*(row + [""] * (len(fieldnames) - len(row)) for row in rows))
+            yield {name: _as_column(values) for name, values in zip(fieldnames, cells)}
+
+
+def iter_csv_columns(path: str, chunk_rows: int = 10000, csv_args: dict = None) -> Iterator[dict]:
+    """
+    Streams a CSV file in chunks of chunk_rows rows, each chunk a
+    {column: numpy array} dict. Numeric columns become float64 arrays with NaN
+    for empty cells. Uses pyarrow's streaming reader when it is installed.
+
+    Parameters:
+        path (str): Path to the CSV file.
+        chunk_rows (int): Rows per chunk.
+        csv_args (dict): CSVLoader-style arguments (delimiter, quotechar, fieldnames, ...).
+    """
+    csv_args = csv_args or {}
+    if arrow_available() and set(csv_args) <= set(_ARROW_CSV_ARGS) | {"fieldnames"}:
+        yield from _iter_arrow_csv(path, chunk_rows, csv_args)
+    else:
+        yield from _iter_python_csv(path, chunk_rows, csv_args)
+
+
+def iter_excel_columns(path: str, chunk_rows: int = 10000, sheet_name: str = None, max_rows: int = None) -> Iterator[tuple]:
+    """
+    Streams the sheets of an .xlsx workbook in chunks of chunk_rows rows,
+    reading it with openpyxl in read-only mode. The first row of each sheet is
+    its header.
+
+    Parameters:
+        path (str): Path to the Excel file.
+        chunk_rows (int): Rows per chunk.
+        sheet_name (str): Only read this sheet; defaults to all sheets.
+        max_rows (int): Stop reading a sheet after the chunk that reaches this many rows.
+
+    Yields:
+        tuple: (sheet name, {column: numpy array}) per chunk.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheets = [workbook[sheet_name]] if sheet_name else workbook.worksheets
+        for sheet in sheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            fieldnames = [str(h) if h is not None else f"column_{i}" for i, h in enumerate(header)]
+            read = 0
+            while (max_rows is None or read < max_rows) and (chunk := list(islice(rows, chunk_rows))):
+                read += len(chunk)
+                cells = zip(*(row + (None,) * (len(fieldnames) - len(row)) for row in chunk))
+                yield sheet.title, {name: _as_column(values) for name, values in zip(fieldnames, cells)}
+    finally:
+        workbook.close()
+
+
+def _format_cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if np.isnan(value):
+            return ""
+        if value.is_integer():
+            return str(int(value))
+    return str(value)
+
+
+def columns_to_documents(columns: dict, metadata: dict, row_offset: int = 0, rows_per_document: int = 100) -> list:
+    """
+    Renders a columnar chunk as Documents of rows_per_document rows each, written
+    as CSV with a header line, instead of one Document per row.
+
+    Parameters:
+        columns (dict): {column: numpy array} chunk.
+        metadata (dict): Metadata shared by every Document, e.g. the source.
+        row_offset (int): Index of the chunk's first row in the file.
+        rows_per_document (int): Rows grouped into one Document.
+    """
+    names = list(columns)
+    n_rows = len(next(iter(columns.values()))) if columns else 0
+    documents = []
+    for start in range(0, n_rows, rows_per_document):
+        stop = min(start + rows_per_document, n_rows)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(names)
+        block = [columns[name][start:stop].tolist() for name in names]
+        writer.writerows([_format_cell(v) for v in row] for row in zip(*block))
+        documents.append(Document(
+            page_content=buffer.getvalue(),
+            metadata={**metadata, "row_start": row_offset + start, "row_end": row_offset + stop},
+        ))
+    return documents
+
+
+def summarize_columns(columns: dict, top_values: int = 5) -> str:
+    """
+    Describes a columnar chunk: range, mean and missing count of numeric
+    columns, distinct and most frequent values of the others.
+    """
+    lines = []
+    for name, values in columns.items():
+        if values.dtype == np.float64:
+            present = values[~np.isnan(values)]
+            if len(present):
+                lines.append(
+                    f"{name} (numeric): min {_format_cell(present.min())}, max {_format_cell(present.max())}, "
+                    f"mean {present.mean():.4g}, missing {len(values) - len(present)}"
+                )
+            else:
+                lines.append(f"{name}: all {len(values)} values missing")
+        else:
+            text = np.array([_format_cell(v) for v in values], dtype=object)
+            present = text[text != ""]
+            distinct, counts = np.unique(present.astype(str), return_counts=True)
+            order = np.argsort(-counts, kind="stable")[:top_values]
+            top = ", ".join(f"{distinct[i]} ({counts[i]})" for i in order)
+            lines.append(
+                f"{name} (text): {len(distinct)} distinct, missing {len(values) - len(present)}, top: {top}"
+            )
+    return "\n".join(lines)
+
+
+def iter_table_documents(path: str, rows_per_document: int = 100, chunk_rows: int = 10000, summarize: bool = False, csv_args: dict = None, sheet_name: str = None, max_rows: int = None) -> Iterator[Document]:
+    """
+    Streams a CSV or .xlsx file as grouped Documents, holding one chunk of
+    chunk_rows rows in memory at a time.
+
+    Parameters:
+        path (str): Path to a .csv, .tsv or .xlsx file.
+        rows_per_document (int): Rows grouped into one Document.
+        chunk_rows (int): Rows read per chunk.
+        summarize (bool): Emit one summary Document per chunk instead of the rows.
+        csv_args (dict): CSVLoader-style arguments for CSV files.
+        sheet_name (str): Only read this sheet of an Excel file.
+        max_rows (int): Stop reading each sheet of an Excel file after the chunk that reaches this many rows.
+
+    Yields:
+        Document: Row groups or chunk summaries with source and row range metadata.
+    """
+    if os.path.splitext(path)[1].lower() in (".xlsx", ".xlsm"):
+        chunks = iter_excel_columns(path, chunk_rows=chunk_rows, sheet_name=sheet_name, max_rows=max_rows)
+    else:
+        chunks = ((None, columns) for columns in iter_csv_columns(path, chunk_rows=chunk_rows, csv_args=csv_args))
+
+    row_offsets = {}
+    for sheet, columns in chunks:
+        metadata = {"source": path} if sheet is None else {"source": path, "sheet": sheet}
+        row_offset = row_offsets.get(sheet, 0)
+        n_rows = len(next(iter(columns.values())))
+        if summarize:
+            yield Document(
+                page_content=summarize_columns(columns),
+                metadata={**metadata, "row_start": row_offset, "row_end": row_offset + n_rows},
+            )
+        else:
+            yield from columns_to_documents(columns, metadata, row_offset=row_offset, rows_per_document=rows_per_document)
+        row_offsets[sheet] = row_offset + n_rows
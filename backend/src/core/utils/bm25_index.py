@@ -0,0 +1,330 @@
+import json
+import math
+import os
+import re
+import shutil
+from array import array
+from collections import Counter
+
+import numpy as np
+
+BM25_FORMAT_VERSION = 1
+
+# keeps identifiers such as "I-9", "1040-ES", "12.3.4" or "2016/679" in one
+# token; their alphanumeric parts are indexed as well
+_TOKEN_PATTERN = re.compile(r"\w+(?:[./\-]\w+)*", re.UNICODE)
+_PART_PATTERN = re.compile(r"[./\-]")
+
+
+def tokenize(text: str) -> list:
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        if _PART_PATTERN.search(token):
+            tokens.extend(part for part in _PART_PATTERN.split(token) if part)
+    return tokens
+
+
+def encode_varints(values: np.ndarray) -> np.ndarray:
+    """
+    LEB128-encodes non-negative integers below 2**35 into a uint8 array.
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    n_bytes = np.ones(len(values), dtype=np.int64)
+    for shift in (7, 14, 21, 28):
+        n_bytes += values >= (1 << shift)
+    ends = np.cumsum(n_bytes)
+    starts = ends - n_bytes
+    out = np.empty(int(ends[-1]) if len(values) else 0, dtype=np.uint8)
+    for j in range(5):
+        has = n_bytes > j
+        byte = (values[has] >> np.uint64(7 * j)) & np.uint64(0x7F)
+        more = np.where(n_bytes[has] > j + 1, 0x80, 0).astype(np.uint64)
+        out[starts[has] + j] = (byte | more).astype(np.uint8)
+    return out
+
+
+def decode_varints(data: np.ndarray) -> np.ndarray:
+    """
+    Decodes an array produced by encode_varints.
+    """
+    data = np.asarray(data, dtype=np.uint8)
+    if not len(data):
+        return np.empty(0, dtype=np.int64)
+    last = data < 0x80
+    group = np.concatenate(([0], np.cumsum(last[:-1])))
+    group_starts = np.flatnonzero(np.concatenate(([True], last[:-1])))
+    shift = np.arange(len(data)) - group_starts[group]
+    weights = (data & 0x7F).astype(np.float64) * np.exp2(7 * shift)
+    return np.bincount(group, weights=weights).astype(np.int64)
+
+
+def _encode_postings(docs: np.ndarray, tfs: np.ndarray, previous_doc: int = -1) -> np.ndarray:
+    # interleaved (doc gap - 1, term frequency) pairs; gaps start after previous_doc
+    gaps = np.diff(np.asarray(docs, dtype=np.int64), prepend=previous_doc) - 1
+    pairs = np.empty(2 * len(docs), dtype=np.int64)
+    pairs[0::2] = gaps
+    pairs[1::2] = tfs
+    return encode_varints(pairs)
+
+
+def _decode_postings(data: np.ndarray) -> tuple:
+    pairs = decode_varints(data)
+    docs = np.cumsum(pairs[0::2] + 1) - 1
+    return docs, pairs[1::2]
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = 60, weights: list = None) -> list:
+    """
+    Fuses ranked lists of ids: each id scores sum(weight / (k + rank)) over the
+    lists it appears in, rank starting at 1.
+
+    Returns:
+        list: (id, fused score) pairs by descending score.
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, id_ in enumerate(ranking, start=1):
+            scores[id_] = scores.get(id_, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """
+    Okapi BM25 keyword index over chunks identified by string ids.
+
+    Posting lists are delta-encoded varint (doc gap, term frequency) pairs, all
+    stored in one uint8 array addressed by a term table, so memory stays close
+    to the compressed size and a saved index is memory-mapped on load. New
+    documents go to an uncompressed pending segment that is sealed into the
+    compressed postings every seal_every documents. Deleted documents are
+    tombstoned until compact().
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, seal_every: int = 50000):
+        """
+        Parameters:
+            k1 (float): Term frequency saturation.
+            b (float): Document length normalization.
+            seal_every (int): Pending documents kept uncompressed before sealing.
+        """
+        self.k1 = k1
+        self.b = b
+        self.seal_every = seal_every
+        self._postings = np.empty(0, dtype=np.uint8)
+        # term -> [byte offset, byte length, document frequency, last doc]
+        self._terms = {}
+        self._pending = {}
+        self._pending_docs = 0
+        self._lengths = array("I")
+        self._ids = []
+        self._doc_of = None
+        self._tombstones = set()
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._ids) - len(self._tombstones)
+
+    @property
+    def deleted_ratio(self) -> float:
+        return len(self._tombstones) / len(self._ids) if self._ids else 0.0
+
+    @property
+    def _doc_index(self) -> dict:
+        if self._doc_of is None:
+            self._doc_of = {id_: doc for doc, id_ in enumerate(self._ids) if doc not in self._tombstones}
+        return self._doc_of
+
+    def add(self, ids: list, texts: list) -> None:
+        """
+        Indexes texts under the given ids.
+
+        Raises:
+            ValueError: On an id that is already indexed.
+        """
+        doc_index = self._doc_index
+        for id_, text in zip(ids, texts):
+            if id_ in doc_index:
+                raise ValueError(f"Document id {id_} is already indexed")
+            doc = len(self._ids)
+            counts = Counter(tokenize(text))
+            for term, tf in counts.items():
+                docs_tfs = self._pending.get(term)
+                if docs_tfs is None:
+                    docs_tfs = self._pending[term] = (array("I"), array("I"))
+                docs_tfs[0].append(doc)
+                docs_tfs[1].append(tf)
+            length = sum(counts.values())
+            self._lengths.append(length)
+            self._total_length += length
+            self._ids.append(id_)
+            doc_index[id_] = doc
+            self._pending_docs += 1
+        if self._pending_docs >= self.seal_every:
+            self.seal()
+
+    def delete(self, ids: list) -> bool:
+        doc_index = self._doc_index
+        docs = [doc_index.pop(id_) for id_ in ids if id_ in doc_index]
+        for doc in docs:
+            self._tombstones.add(doc)
+            self._total_length -= self._lengths[doc]
+        return bool(docs)
+
+    def seal(self) -> None:
+        """
+        Moves the pending segment into the compressed postings.
+        """
+        if not self._pending:
+            return
+        parts = []
+        offset = 0
+        terms = {}
+        for term in self._terms.keys() | self._pending.keys():
+            entry = self._terms.get(term)
+            pending = self._pending.get(term)
+            start, nbytes, df, last_doc = entry if entry else (0, 0, 0, -1)
+            if nbytes:
+                parts.append(self._postings[start:start + nbytes])
+            if pending:
+                docs = np.frombuffer(pending[0], dtype=np.uint32)
+                tail = _encode_postings(docs, np.frombuffer(pending[1], dtype=np.uint32), last_doc)
+                parts.append(tail)
+                nbytes += len(tail)
+                df += len(docs)
+                last_doc = int(docs[-1])
+            terms[term] = [offset, nbytes, df, last_doc]
+            offset += nbytes
+        self._postings = np.concatenate(parts) if parts else np.empty(0, dtype=np.uint8)
+        self._terms = terms
+        self._pending = {}
+        self._pending_docs = 0
+
+    def _term_postings(self, term: str) -> tuple:
+        docs_parts, tf_parts = [], []
+        entry = self._terms.get(term)
+        if entry and entry[1]:
+            docs, tfs = _decode_postings(self._postings[entry[0]:entry[0] + entry[1]])
+            docs_parts.append(docs)
+            tf_parts.append(tfs)
+        pending = self._pending.get(term)
+        if pending:
+            docs_parts.append(np.frombuffer(pending[0], dtype=np.uint32).astype(np.int64))
+            tf_parts.append(np.frombuffer(pending[1], dtype=np.uint32).astype(np.int64))
+        if not docs_parts:
+            return None, None
+        return np.concatenate(docs_parts), np.concatenate(tf_parts)
+
+    def search(self, query: str, k: int = 10) -> list:
+        """
+        Returns the k best matching (id, BM25 score) pairs by descending score.
+        """
+        n_docs = len(self)
+        if not n_docs or k <= 0:
+            return []
+        lengths = np.frombuffer(self._lengths, dtype=np.uint32) if self._lengths else np.empty(0, dtype=np.uint32)
+        avg_length = self._total_length / n_docs or 1.0
+        doc_parts, score_parts = [], []
+        for term, query_tf in Counter(tokenize(query)).items():
+            docs, tfs = self._term_postings(term)
+            if docs is None:
+                continue
+            idf = math.log(1.0 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * lengths[docs] / avg_length)
+            doc_parts.append(docs)
+            score_parts.append(query_tf * idf * tfs * (self.k1 + 1.0) / (tfs + norm))
+        if not doc_parts:
+            return []
+        docs, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        if self._tombstones:
+            live = ~np.isin(docs, np.fromiter(self._tombstones, dtype=np.int64, count=len(self._tombstones)))
+            docs, scores = docs[live], scores[live]
+        kk = min(k, len(docs))
+        if not kk:
+            return []
+        top = np.argpartition(-scores, kk - 1)[:kk]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self._ids[docs[i]], float(scores[i])) for i in top]
+
+    def compact(self) -> int:
+        """
+        Rewrites the postings without tombstoned documents and renumbers the rest.
+
+        Returns:
+            int: Number of documents removed.
+        """
+        removed = len(self._tombstones)
+        if not removed:
+            return 0
+        self.seal()
+        live = np.ones(len(self._ids), dtype=bool)
+        live[np.fromiter(self._tombstones, dtype=np.int64, count=removed)] = False
+        renumber = np.cumsum(live) - 1
+        parts = []
+        offset = 0
+        terms = {}
+        for term, (start, nbytes, _, _) in self._terms.items():
+            docs, tfs = _decode_postings(self._postings[start:start + nbytes])
+            keep = live[docs]
+            if not keep.any():
+                continue
+            docs = renumber[docs[keep]]
+            encoded = _encode_postings(docs, tfs[keep])
+            parts.append(encoded)
+            terms[term] = [offset, len(encoded), len(docs), int(docs[-1])]
+            offset += len(encoded)
+        self._postings = np.concatenate(parts) if parts else np.empty(0, dtype=np.uint8)
+        self._terms = terms
+        lengths = np.frombuffer(self._lengths, dtype=np.uint32)[live]
+        self._lengths = array("I", lengths.tobytes())
+        self._ids = [id_ for id_, keep in zip(self._ids, live) if keep]
+        self._doc_of = None
+        self._tombstones = set()
+        return removed
+
+    def save(self, path: str) -> None:
+        """
+        Seals pending documents and writes the index to a directory; the postings
+        are stored as a raw uint8 .npy file so load() can memory-map them.
+        """
+        self.seal()
+        tmp_path = f"{path}.tmp"
+        os.makedirs(tmp_path, exist_ok=True)
+        np.save(os.path.join(tmp_path, "postings.npy"), np.asarray(self._postings))
+        np.save(os.path.join(tmp_path, "lengths.npy"), np.frombuffer(self._lengths, dtype=np.uint32))
+        np.save(os.path.join(tmp_path, "tombstones.npy"), np.array(sorted(self._tombstones), dtype=np.int64))
+        with open(os.path.join(tmp_path, "terms.json"), "w", encoding="utf-8") as f:
+            json.dump(self._terms, f, ensure_ascii=False)
+        with open(os.path.join(tmp_path, "ids.json"), "w", encoding="utf-8") as f:
+            json.dump(self._ids, f, ensure_ascii=False)
+        with open(os.path.join(tmp_path, "bm25.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": BM25_FORMAT_VERSION, "k1": self.k1, "b": self.b}, f)
+
+        os.makedirs(path, exist_ok=True)
+        for name in ("postings.npy", "lengths.npy", "tombstones.npy", "terms.json", "ids.json", "bm25.json"):
+            os.replace(os.path.join(tmp_path, name), os.path.join(path, name))
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True, **kwargs) -> "BM25Index":
+        """
+        Opens an index written by save(). Sealing new documents later reads the
+        mapped postings into memory.
+        """
+        with open(os.path.join(path, "bm25.json"), "r", encoding="utf-8") as f:
+            config = json.load(f)
+        if config.get("version") != BM25_FORMAT_VERSION:
+            raise ValueError(f"Unsupported BM25 index format: {config.get('version')}")
+        index = cls(k1=config["k1"], b=config["b"], **kwargs)
+        index._postings = np.load(os.path.join(path, "postings.npy"), mmap_mode="r" if mmap else None)
+        index._lengths = array("I", np.load(os.path.join(path, "lengths.npy")).tobytes())
+        index._tombstones = set(np.load(os.path.join(path, "tombstones.npy")).tolist())
+        with open(os.path.join(path, "terms.json"), "r", encoding="utf-8") as f:
+            index._terms = json.load(f)
+        with open(os.path.join(path, "ids.json"), "r", encoding="utf-8") as f:
+            index._ids = json.load(f)
+        lengths = np.frombuffer(index._lengths, dtype=np.uint32)
+        index._total_length = int(lengths.sum()) - sum(int(lengths[doc]) for doc in index._tombstones)
+        return index
@@ -0,0 +1,394 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver):
+    """
+    LangGraph checkpointer persisted in SQLite, with bounded storage.
+
+    Only the newest max_checkpoints_per_thread checkpoints of every thread are
+    kept, together with their pending writes. Threads idle for longer than ttl
+    seconds, and the least recently used threads beyond max_threads, are deleted
+    by evict(), which runs every evict_every checkpoints and then returns the
+    freed pages to the file system. The latest checkpoint of up to
+    memory_threads hot threads is kept in an LRU so resuming a conversation does
+    not hit the database; that cache is per process, so set memory_threads=0
+    when several workers write the same threads.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_checkpoints_per_thread: int = 20,
+        max_threads: int = None,
+        ttl: float = None,
+        memory_threads: int = 256,
+        evict_every: int = 500,
+        serde=None,
+    ):
+        """
+        Parameters:
+            path (str): Path to the SQLite database file.
+            max_checkpoints_per_thread (int): Checkpoints kept per thread and namespace.
+            max_threads (int): Most threads kept on disk.
+            ttl (float): Seconds of inactivity after which a thread is deleted.
+            memory_threads (int): Threads whose latest checkpoint is cached in memory.
+            evict_every (int): Run evict() after this many checkpoints.
+        """
+        super().__init__(serde=serde)
+        self.path = path
+        self.max_checkpoints_per_thread = max_checkpoints_per_thread
+        self.max_threads = max_threads
+        self.ttl = ttl
+        self.memory_threads = memory_threads
+        self.evict_every = evict_every
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # (thread_id, checkpoint_ns) -> latest checkpoint row
+        self._hot = OrderedDict()
+        self._puts = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " thread_id TEXT NOT NULL,"
+                " checkpoint_ns TEXT NOT NULL DEFAULT '',"
+                " checkpoint_id TEXT NOT NULL,"
+                " parent_checkpoint_id TEXT,"
+                " type TEXT,"
+                " checkpoint BLOB,"
+                " metadata_type TEXT,"
+                " metadata BLOB,"
+                " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS writes ("
+                " thread_id TEXT NOT NULL,"
+                " checkpoint_ns TEXT NOT NULL DEFAULT '',"
+                " checkpoint_id TEXT NOT NULL,"
+                " task_id TEXT NOT NULL,"
+                " idx INTEGER NOT NULL,"
+                " channel TEXT NOT NULL,"
+                " type TEXT,"
+                " value BLOB,"
+                " task_path TEXT NOT NULL DEFAULT '',"
+                " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS threads ("
+                " thread_id TEXT PRIMARY KEY,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS threads_last_access ON threads (last_access)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            # must be set before the first table is created to take effect
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: tuple, row: tuple) -> None:
+        with self._lock:
+            self._hot[key] = row
+            self._hot.move_to_end(key)
+            while len(self._hot) > self.memory_threads:
+                self._hot.popitem(last=False)
+
+    def _forget(self, thread_id: str) -> None:
+        with self._lock:
+            for key in [key for key in self._hot if key[0] == thread_id]:
+                del self._hot[key]
+
+    def _writes(self, conn, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list:
+        rows = conn.execute(
+            "SELECT task_id, idx, channel, type, value, task_path FROM writes"
+            " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        rows.sort(key=lambda row: writes_sort_key(row[5], row[0], row[1]))
+        return [(task_id, channel, self.serde.loads_typed((type_, value))) for task_id, _, channel, type_, value, _ in rows]
+
+    def _tuple(self, conn, thread_id: str, checkpoint_ns: str, row: tuple) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata_type, metadata = row
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_checkpoint_id}}
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=self._writes(conn, thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        conn = self._connection()
+        row = None
+        if checkpoint_id is None:
+            with self._lock:
+                row = self._hot.get((thread_id, checkpoint_ns))
+                if row is not None:
+                    self._hot.move_to_end((thread_id, checkpoint_ns))
+        if row is None:
+            query = (
+                "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+                " FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+            )
+            if checkpoint_id is not None:
+                row = conn.execute(query + " AND checkpoint_id = ?", (thread_id, checkpoint_ns, checkpoint_id)).fetchone()
+            else:
+                row = conn.execute(query + " ORDER BY checkpoint_id DESC LIMIT 1", (thread_id, checkpoint_ns)).fetchone()
+                if row is not None:
+                    self._remember((thread_id, checkpoint_ns), row)
+        if row is None:
+            return None
+        return self._tuple(conn, thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+            " FROM checkpoints"
+        )
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        conn = self._connection()
+        for thread_id, checkpoint_ns, *row in conn.execute(query, params).fetchall():
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self.serde.loads_typed((row[4], row[5]))
+                if not all(metadata.get(key) == value for key, value in filter.items()):
+                    continue
+            if limit is not None:
+                limit -= 1
+            yield self._tuple(conn, thread_id, checkpoint_ns, tuple(row))
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, serialized = self.serde.dumps_typed(checkpoint)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        row = (checkpoint["id"], config["configurable"].get("checkpoint_id"), type_, serialized, metadata_type, serialized_metadata)
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints"
+                " (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, *row),
+            )
+            self._prune(conn, thread_id, checkpoint_ns)
+            conn.execute(
+                "INSERT OR REPLACE INTO threads (thread_id, last_access) VALUES (?, ?)", (thread_id, time.time())
+            )
+        self._remember((thread_id, checkpoint_ns), row)
+        self._puts += 1
+        if self._puts % self.evict_every == 0:
+            self.evict()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # special writes (errors, interrupts) are overwritten, regular ones only written once
+        rows = {"INSERT OR REPLACE": [], "INSERT OR IGNORE": []}
+        for idx, (channel, value) in enumerate(writes):
+            type_, serialized = self.serde.dumps_typed(value)
+            statement = "INSERT OR REPLACE" if channel in WRITES_IDX_MAP else "INSERT OR IGNORE"
+            rows[statement].append(
+                (thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx), channel, type_, serialized, task_path)
+            )
+        with self._connection() as conn:
+            for statement, params in rows.items():
+                conn.executemany(
+                    f"{statement} INTO writes"
+                    " (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    params,
+                )
+
+    def _prune(self, conn, thread_id: str, checkpoint_ns: str) -> None:
+        if self.max_checkpoints_per_thread is None:
+            return
+        stale = conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+            " ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.max_checkpoints_per_thread),
+        ).fetchall()
+        if not stale:
+            return
+        params = [(thread_id, checkpoint_ns, checkpoint_id) for (checkpoint_id,) in stale]
+        conn.executemany("DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", params)
+        conn.executemany("DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", params)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._connection() as conn:
+            self._delete_threads(conn, [thread_id])
+
+    def _delete_threads(self, conn, thread_ids: list) -> None:
+        params = [(thread_id,) for thread_id in thread_ids]
+        conn.executemany("DELETE FROM checkpoints WHERE thread_id = ?", params)
+        conn.executemany("DELETE FROM writes WHERE thread_id = ?", params)
+        conn.executemany("DELETE FROM threads WHERE thread_id = ?", params)
+        for thread_id in thread_ids:
+            self._forget(thread_id)
+
+    def evict(self) -> int:
+        """
+        Deletes expired threads and trims the store to max_threads, least recently
+        used first, then compacts the database.
+
+        Returns:
+            int: Number of threads removed.
+        """
+        conn = self._connection()
+        expired = []
+        if self.ttl is not None:
+            expired += [row[0] for row in conn.execute(
+                "SELECT thread_id FROM threads WHERE last_access < ?", (time.time() - self.ttl,)
+            )]
+        if self.max_threads is not None:
+            expired += [row[0] for row in conn.execute(
+                "SELECT thread_id FROM threads ORDER BY last_access DESC LIMIT -1 OFFSET ?", (self.max_threads,)
+            )]
+        expired = list(dict.fromkeys(expired))
+        if expired:
+            with conn:
+                self._delete_threads(conn, expired)
+        self.compact()
+        return len(expired)
+
+    def compact(self) -> None:
+        """
+        Returns pages freed by pruning and eviction to the file system and
+        truncates the write-ahead log.
+        """
+        conn = self._connection()
+        conn.execute("PRAGMA incremental_vacuum")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def thread_count(self) -> int:
+        # not __len__: langgraph tests checkpointers for truthiness
+        return self._connection().execute("SELECT COUNT(*) FROM threads").fetchone()[0]
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+_shared_checkpointer = None
+_shared_checkpointer_lock = threading.Lock()
+
+
+def get_shared_checkpointer():
+    """
+    Returns the process-wide checkpointer configured through the environment:
+    CHECKPOINT_DB_PATH (default checkpoints.db), CHECKPOINTS_PER_THREAD (20),
+    CHECKPOINT_MAX_THREADS (10000), CHECKPOINT_TTL_SECONDS (7 days) and
+    CHECKPOINT_MEMORY_THREADS (256).
+    """
+    global _shared_checkpointer
+    if _shared_checkpointer is None:
+        with _shared_checkpointer_lock:
+            if _shared_checkpointer is None:
+                _shared_checkpointer = SQLiteCheckpointSaver(
+                    os.getenv("CHECKPOINT_DB_PATH", "checkpoints.db"),
+                    max_checkpoints_per_thread=int(os.getenv("CHECKPOINTS_PER_THREAD", "20")),
+                    max_threads=int(os.getenv("CHECKPOINT_MAX_THREADS", "10000")),
+                    ttl=float(os.getenv("CHECKPOINT_TTL_SECONDS", str(7 * 86400))),
+                    memory_threads=int(os.getenv("CHECKPOINT_MEMORY_THREADS", "256")),
+                )
+    return _shared_checkpointer
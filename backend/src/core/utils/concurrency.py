@@ -0,0 +1,99 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class CapacityExceeded(Exception):
+    """
+    Raised when a ConcurrencyLimiter cannot admit a caller.
+    """
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    Caps the number of in-flight operations and the number of callers waiting
+    for a slot. Callers beyond the wait queue are rejected immediately instead
+    of piling up on the event loop.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float = None):
+        """
+        Parameters:
+            max_in_flight (int): Maximum number of operations running at once.
+            max_queue (int): Maximum number of callers waiting for a slot.
+            queue_timeout (float): Seconds a caller may wait before being rejected.
+                                   None waits indefinitely.
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.max_in_flight = max_in_flight
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def acquire(self) -> None:
+        """
+        Takes a slot, waiting in the bounded queue if none is free.
+
+        Raises:
+            CapacityExceeded: If the wait queue is full or the queue timeout expires.
+        """
+        if not self._semaphore.locked():
+            # a free slot is taken without suspending
+            await self._semaphore.acquire()
+        else:
+            if self.waiting >= self.max_queue:
+                raise CapacityExceeded("Too many requests in progress, try again later.")
+            self.waiting += 1
+            try:
+                if self.queue_timeout is None:
+                    await self._semaphore.acquire()
+                else:
+                    await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise CapacityExceeded(
+                    "Timed out waiting for a free slot, try again later.",
+                    retry_after=self.queue_timeout,
+                )
+            finally:
+                self.waiting -= 1
+        self.in_flight += 1
+
+    def release(self) -> None:
+        """
+        Returns a slot taken with acquire().
+        """
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def releaser(self):
+        """
+        Returns a callable that releases a slot taken with acquire() on its
+        first call and does nothing after, for slots whose holder may end in
+        more than one place.
+        """
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self.release()
+
+        return release
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Async context manager that holds one slot for the duration of the block.
+        """
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
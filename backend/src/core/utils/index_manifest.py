@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+from typing import Iterable
+
+
+def hash_file(path: str, block_size: int = 1 << 20) -> str:
+    """
+    sha256 of a file's bytes, read in blocks so large files are never held in memory.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_documents(documents: Iterable) -> str:
+    """
+    sha256 over the text and metadata of a source's documents, in order.
+    """
+    digest = hashlib.sha256()
+    for doc in documents:
+        digest.update(doc.page_content.encode("utf-8"))
+        digest.update(json.dumps(doc.metadata, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class IndexManifest:
+    """
+    Records, for every indexed source, the content hash it was indexed at and
+    the ids of the chunks it produced, so a refresh can tell unchanged,
+    changed and removed sources apart and delete exactly the stale chunks.
+    """
+
+    def __init__(self, entries: dict = None):
+        # source -> {"hash": content hash, "chunk_ids": [...]}
+        self.entries = entries or {}
+
+    def __contains__(self, source: str) -> bool:
+        return source in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def sources(self) -> list:
+        return list(self.entries)
+
+    def is_current(self, source: str, content_hash: str) -> bool:
+        entry = self.entries.get(source)
+        return entry is not None and entry["hash"] == content_hash
+
+    def chunk_ids(self, source: str) -> list:
+        entry = self.entries.get(source)
+        return list(entry["chunk_ids"]) if entry else []
+
+    def set(self, source: str, content_hash: str, chunk_ids: list) -> None:
+        self.entries[source] = {"hash": content_hash, "chunk_ids": list(chunk_ids)}
+
+    def remove(self, source: str) -> list:
+        """
+        Forgets a source and returns the ids of its chunks.
+        """
+        entry = self.entries.pop(source, None)
+        return entry["chunk_ids"] if entry else []
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IndexManifest":
+        """
+        Reads a manifest written by save(); a missing file gives an empty manifest.
+        """
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
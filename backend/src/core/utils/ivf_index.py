@@ -0,0 +1,328 @@
+import argparse
+import json
+import time
+
+import numpy as np
+
+
+def kmeans(vectors: np.ndarray, n_clusters: int, n_iter: int = 20, spherical: bool = False, seed: int = 0, chunk_size: int = 65536) -> np.ndarray:
+    """
+    Lloyd's k-means over float32 vectors.
+
+    Parameters:
+        vectors (np.ndarray): Training matrix of shape (n, dim).
+        n_clusters (int): Number of centroids.
+        n_iter (int): Number of assignment/update rounds.
+        spherical (bool): Assign by inner product and keep centroids unit length,
+                          for vectors compared by cosine similarity.
+        seed (int): Seed for centroid initialization.
+        chunk_size (int): Rows assigned per matrix product, bounding peak memory.
+
+    Returns:
+        np.ndarray: Centroids of shape (n_clusters, dim).
+    """
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    n = len(vectors)
+    if n < n_clusters:
+        raise ValueError(f"Need at least {n_clusters} training vectors, got {n}")
+    centroids = vectors[rng.choice(n, n_clusters, replace=False)].copy()
+
+    for _ in range(n_iter):
+        assignments = assign(vectors, centroids, spherical=spherical, chunk_size=chunk_size)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        empty = counts == 0
+        # sum members per cluster with one reduceat over the rows sorted by cluster
+        order = np.argsort(assignments, kind="stable")
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        sums = np.add.reduceat(vectors[order], starts[~empty], axis=0)
+        centroids = np.empty_like(centroids)
+        centroids[~empty] = sums / counts[~empty, None]
+        # re-seed empty clusters from random training points
+        if empty.any():
+            centroids[empty] = vectors[rng.choice(n, int(empty.sum()), replace=False)]
+        if spherical:
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids /= norms
+    return centroids.astype(np.float32)
+
+
+def assign(vectors: np.ndarray, centroids: np.ndarray, spherical: bool = False, chunk_size: int = 65536) -> np.ndarray:
+    """
+    Returns the index of the nearest centroid for every vector.
+    """
+    half_norms = None if spherical else 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    out = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        scores = vectors[start:start + chunk_size] @ centroids.T
+        if half_norms is not None:
+            # argmin ||x - c||^2 == argmax x.c - ||c||^2 / 2
+            scores -= half_norms
+        out[start:start + chunk_size] = scores.argmax(axis=1)
+    return out
+
+
+class IVFIndex:
+    """
+    Inverted-file index for approximate inner-product search.
+
+    A coarse k-means quantizer splits the vectors into n_lists inverted lists;
+    a query is only compared with the vectors of its nprobe closest lists. With
+    pq_subvectors set, each vector's residual to its list centroid is stored as
+    product-quantized uint8 codes, and scores are computed from per-query lookup
+    tables, which cuts memory per vector from 4 * dim bytes to pq_subvectors bytes.
+
+    Vectors are expected to be L2-normalized, so inner product is cosine similarity.
+    """
+
+    def __init__(self, dim: int, n_lists: int = 1024, nprobe: int = 8, pq_subvectors: int = None, pq_bits: int = 8, seed: int = 0):
+        """
+        Parameters:
+            dim (int): Vector dimension.
+            n_lists (int): Number of coarse clusters (inverted lists).
+            nprobe (int): Lists scanned per query; higher is slower but more accurate.
+            pq_subvectors (int): Number of PQ sub-spaces; None stores raw float32 vectors.
+            pq_bits (int): Bits per PQ code, at most 8.
+            seed (int): Seed for k-means initialization.
+        """
+        if pq_subvectors is not None and dim % pq_subvectors:
+            raise ValueError(f"dim {dim} is not divisible by pq_subvectors {pq_subvectors}")
+        if not 1 <= pq_bits <= 8:
+            raise ValueError("pq_bits must be between 1 and 8")
+        self.dim = dim
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.pq_subvectors = pq_subvectors
+        self.pq_bits = pq_bits
+        self.seed = seed
+        self.centroids = None
+        self.codebooks = None
+        self._lists_ids = [[] for _ in range(n_lists)]
+        self._lists_data = [[] for _ in range(n_lists)]
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def __len__(self) -> int:
+        return sum(sum(len(ids) for ids in chunks) for chunks in self._lists_ids)
+
+    def train(self, vectors: np.ndarray, n_iter: int = 20, max_samples: int = None) -> None:
+        """
+        Learns the coarse centroids and, with PQ enabled, the sub-space codebooks.
+
+        Parameters:
+            vectors (np.ndarray): Representative training vectors.
+            n_iter (int): k-means iterations.
+            max_samples (int): Random subsample size; defaults to 256 per list.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        rng = np.random.default_rng(self.seed)
+        max_samples = max_samples or 256 * self.n_lists
+        if len(vectors) > max_samples:
+            vectors = vectors[rng.choice(len(vectors), max_samples, replace=False)]
+
+        self.centroids = kmeans(vectors, self.n_lists, n_iter=n_iter, spherical=True, seed=self.seed)
+        if self.pq_subvectors:
+            residuals = vectors - self.centroids[assign(vectors, self.centroids, spherical=True)]
+            ksub = 2 ** self.pq_bits
+            sub_dim = self.dim // self.pq_subvectors
+            self.codebooks = np.stack([
+                kmeans(residuals[:, j * sub_dim:(j + 1) * sub_dim], ksub, n_iter=n_iter, seed=self.seed + j)
+                for j in range(self.pq_subvectors)
+            ])
+
+    def _encode(self, residuals: np.ndarray) -> np.ndarray:
+        sub_dim = self.dim // self.pq_subvectors
+        codes = np.empty((len(residuals), self.pq_subvectors), dtype=np.uint8)
+        for j in range(self.pq_subvectors):
+            codes[:, j] = assign(residuals[:, j * sub_dim:(j + 1) * sub_dim], self.codebooks[j])
+        return codes
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        """
+        Adds vectors under the given integer ids.
+        """
+        if not self.is_trained:
+            raise RuntimeError("IVFIndex must be trained before vectors are added")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        ids = np.asarray(ids, dtype=np.int64)
+        lists = assign(vectors, self.centroids, spherical=True)
+        data = self._encode(vectors - self.centroids[lists]) if self.pq_subvectors else vectors
+
+        order = np.argsort(lists, kind="stable")
+        boundaries = np.flatnonzero(np.diff(lists[order])) + 1
+        for group in np.split(order, boundaries):
+            if len(group):
+                list_no = lists[group[0]]
+                self._lists_ids[list_no].append(ids[group])
+                self._lists_data[list_no].append(data[group])
+
+    def _list(self, list_no: int):
+        # appended chunks are merged on first use so scans touch one array
+        ids_chunks = self._lists_ids[list_no]
+        if len(ids_chunks) > 1:
+            self._lists_ids[list_no] = [np.concatenate(ids_chunks)]
+            self._lists_data[list_no] = [np.concatenate(self._lists_data[list_no])]
+        if not self._lists_ids[list_no]:
+            return None, None
+        return self._lists_ids[list_no][0], self._lists_data[list_no][0]
+
+    def search(self, queries: np.ndarray, k: int, nprobe: int = None, mask: np.ndarray = None) -> list:
+        """
+        Approximate top-k inner-product search.
+
+        Parameters:
+            queries (np.ndarray): Normalized query matrix of shape (m, dim).
+            k (int): Results per query.
+            nprobe (int): Lists to scan per query; defaults to self.nprobe.
+            mask (np.ndarray): Optional boolean array indexed by id; False ids are skipped.
+
+        Returns:
+            list: For each query, a tuple (ids, scores) sorted by descending score.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        coarse = queries @ self.centroids.T
+        probes = np.argpartition(-coarse, nprobe - 1, axis=1)[:, :nprobe]
+
+        if self.pq_subvectors:
+            sub_dim = self.dim // self.pq_subvectors
+            # tables[q, j, c] = <query sub-vector j, codeword c of sub-space j>
+            tables = np.einsum("qjd,jcd->qjc", queries.reshape(len(queries), self.pq_subvectors, sub_dim), self.codebooks)
+            sub_index = np.arange(self.pq_subvectors)
+
+        # scan each probed list once for all queries that probe it
+        candidates = [([], []) for _ in range(len(queries))]
+        for list_no in np.unique(probes):
+            ids, data = self._list(list_no)
+            if ids is None:
+                continue
+            query_nos = np.flatnonzero((probes == list_no).any(axis=1))
+            if self.pq_subvectors:
+                scores = coarse[query_nos, list_no][:, None] + tables[query_nos][:, sub_index, data].sum(axis=-1)
+            else:
+                scores = queries[query_nos] @ data.T
+            if mask is not None:
+                scores[:, ~mask[ids]] = -np.inf
+            for row, q in enumerate(query_nos):
+                candidates[q][0].append(ids)
+                candidates[q][1].append(scores[row])
+
+        results = []
+        for ids_parts, score_parts in candidates:
+            if not ids_parts:
+                results.append((np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)))
+                continue
+            ids = np.concatenate(ids_parts)
+            scores = np.concatenate(score_parts)
+            kk = min(k, len(ids))
+            top = np.argpartition(-scores, kk - 1)[:kk]
+            top = top[np.argsort(-scores[top])]
+            top = top[scores[top] != -np.inf]
+            results.append((ids[top], scores[top]))
+        return results
+
+    def save(self, path: str) -> None:
+        """
+        Writes the trained state and all inverted lists to an .npz file.
+        """
+        ids, data, offsets = [], [], [0]
+        for list_no in range(self.n_lists):
+            list_ids, list_data = self._list(list_no)
+            if list_ids is not None:
+                ids.append(list_ids)
+                data.append(list_data)
+            offsets.append(offsets[-1] + (0 if list_ids is None else len(list_ids)))
+        data_width = self.pq_subvectors or self.dim
+        data_dtype = np.uint8 if self.pq_subvectors else np.float32
+        config = {
+            "dim": self.dim, "n_lists": self.n_lists, "nprobe": self.nprobe,
+            "pq_subvectors": self.pq_subvectors, "pq_bits": self.pq_bits, "seed": self.seed,
+        }
+        np.savez(
+            path,
+            config=np.array(json.dumps(config)),
+            centroids=self.centroids,
+            codebooks=self.codebooks if self.codebooks is not None else np.empty(0, dtype=np.float32),
+            ids=np.concatenate(ids) if ids else np.empty(0, dtype=np.int64),
+            data=np.concatenate(data) if data else np.empty((0, data_width), dtype=data_dtype),
+            offsets=np.asarray(offsets, dtype=np.int64),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """
+        Restores an index written by save().
+        """
+        with np.load(path) as f:
+            index = cls(**json.loads(str(f["config"])))
+            index.centroids = f["centroids"]
+            index.codebooks = f["codebooks"] if f["codebooks"].size else None
+            ids, data, offsets = f["ids"], f["data"], f["offsets"]
+        for list_no in range(index.n_lists):
+            start, end = offsets[list_no], offsets[list_no + 1]
+            if end > start:
+                index._lists_ids[list_no] = [ids[start:end]]
+                index._lists_data[list_no] = [data[start:end]]
+        return index
+
+
+def benchmark(n: int = 200000, dim: int = 128, n_queries: int = 200, k: int = 10, n_lists: int = 512, pq_subvectors: int = None, refine: int = 10, nprobes=(1, 2, 4, 8, 16, 32, 64), seed: int = 0) -> list:
+    """
+    Compares recall@k and latency of IVFIndex against exact search on synthetic,
+    clustered data. With PQ, refine * k candidates are re-scored exactly, the way
+    NumpyVectorStore uses the index.
+
+    Returns:
+        list: One dict per nprobe with recall and milliseconds per query.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_lists, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, n_lists, n)] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.choice(n, n_queries, replace=False)] + 0.1 * rng.standard_normal((n_queries, dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    start = time.perf_counter()
+    exact_scores = queries @ vectors.T
+    exact = np.argpartition(-exact_scores, k - 1, axis=1)[:, :k]
+    exact_ms = 1000 * (time.perf_counter() - start) / n_queries
+
+    index = IVFIndex(dim, n_lists=n_lists, pq_subvectors=pq_subvectors, seed=seed)
+    start = time.perf_counter()
+    index.train(vectors)
+    index.add(vectors, np.arange(n))
+    build_s = time.perf_counter() - start
+    print(f"n={n} dim={dim} lists={n_lists} pq={pq_subvectors} build={build_s:.1f}s exact={exact_ms:.3f}ms/query")
+
+    rows = []
+    for nprobe in nprobes:
+        start = time.perf_counter()
+        results = index.search(queries, k * refine if pq_subvectors else k, nprobe=nprobe)
+        if pq_subvectors:
+            refined = []
+            for q, (ids, _) in zip(queries, results):
+                scores = vectors[ids] @ q
+                top = np.argsort(-scores)[:k]
+                refined.append((ids[top], scores[top]))
+            results = refined
+        ms = 1000 * (time.perf_counter() - start) / n_queries
+        recall = np.mean([len(np.intersect1d(ids, truth)) / k for (ids, _), truth in zip(results, exact)])
+        rows.append({"nprobe": nprobe, "recall": float(recall), "ms_per_query": ms})
+        print(f"nprobe={nprobe:4d} recall@{k}={recall:.3f} {ms:.3f}ms/query")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="IVF recall-vs-latency benchmark against exact search")
+    parser.add_argument("--n", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--lists", type=int, default=512)
+    parser.add_argument("--pq", type=int, default=None, help="number of PQ sub-vectors")
+    parser.add_argument("--refine", type=int, default=10, help="PQ candidates re-scored per result")
+    args = parser.parse_args()
+    benchmark(n=args.n, dim=args.dim, n_queries=args.queries, k=args.k, n_lists=args.lists, pq_subvectors=args.pq, refine=args.refine)
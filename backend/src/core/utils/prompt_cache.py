@@ -0,0 +1,96 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# providers only cache prompts of at least this many tokens
+MIN_CACHEABLE_TOKENS = 1024
+
+
+def prefix_hash(messages: list) -> str:
+    """
+    Hash of the static leading messages of a request, used as the
+    prompt_cache_key and to group requests by shared prefix.
+    """
+    payload = json.dumps(messages, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def cached_tokens(usage) -> int:
+    """
+    Prompt tokens the provider served from its prompt cache, from a response's usage.
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    return (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+
+
+class PromptCacheTracker:
+    """
+    Tracks requests by static prompt prefix and how many of their prompt
+    tokens the provider served from its prompt cache.
+
+    A prefix seen within ttl seconds is expected to be warm on the provider,
+    so the stats also show how often that expectation held, which tells
+    whether requests of a prefix are spread too thin to stay cached.
+    """
+
+    def __init__(self, ttl: float = 600, max_prefixes: int = 10000):
+        """
+        Parameters:
+            ttl (float): Seconds a prefix is expected to stay cached by the provider.
+            max_prefixes (int): Most prefixes tracked; least recently seen are dropped.
+        """
+        self.ttl = ttl
+        self.max_prefixes = max_prefixes
+        self._lock = threading.Lock()
+        self._prefixes = OrderedDict()
+        self.totals = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0}
+
+    def record(self, provider: str, model: str, key: str, prompt_tokens: int, cached: int) -> None:
+        now = time.time()
+        with self._lock:
+            entry = self._prefixes.get(key)
+            if entry is None:
+                entry = self._prefixes[key] = {
+                    "provider": provider,
+                    "model": model,
+                    "requests": 0,
+                    "prompt_tokens": 0,
+                    "cached_tokens": 0,
+                    "expected_hits": 0,
+                    "hits": 0,
+                    "last_seen": 0.0,
+                }
+            else:
+                self._prefixes.move_to_end(key)
+            expected = now - entry["last_seen"] < self.ttl and prompt_tokens >= MIN_CACHEABLE_TOKENS
+            entry["requests"] += 1
+            entry["prompt_tokens"] += prompt_tokens
+            entry["cached_tokens"] += cached
+            entry["expected_hits"] += expected
+            entry["hits"] += cached > 0
+            entry["last_seen"] = now
+            self.totals["requests"] += 1
+            self.totals["prompt_tokens"] += prompt_tokens
+            self.totals["cached_tokens"] += cached
+            while len(self._prefixes) > self.max_prefixes:
+                self._prefixes.popitem(last=False)
+
+    def stats(self, top: int = 20) -> dict:
+        """
+        Returns cached and uncached prompt token totals and the top prefixes by request count.
+        """
+        with self._lock:
+            totals = dict(self.totals)
+            prefixes = sorted(
+                ({"prefix": key, **entry} for key, entry in self._prefixes.items()),
+                key=lambda entry: entry["requests"],
+                reverse=True,
+            )[:top]
+        totals["uncached_tokens"] = totals["prompt_tokens"] - totals["cached_tokens"]
+        totals["cached_ratio"] = totals["cached_tokens"] / totals["prompt_tokens"] if totals["prompt_tokens"] else 0.0
+        return {**totals, "prefixes": prefixes}
+
+
+prompt_cache_tracker = PromptCacheTracker()
@@ -0,0 +1,253 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import deque
+
+from langchain_core.rate_limiters import BaseRateLimiter
+
+# tokens assumed for a completion when the caller sets no max_tokens
+DEFAULT_COMPLETION_TOKENS = 256
+
+
+def estimate_tokens(messages: list, max_tokens: int = None) -> int:
+    """
+    Rough token count of a chat request: four characters per prompt token plus
+    the completion budget. Used to reserve TPM capacity before the call.
+    """
+    chars = sum(len(str(message.get("content", ""))) for message in messages)
+    return chars // 4 + 4 * len(messages) + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for one provider, model and key, with an adaptive
+    concurrency limit.
+
+    Two buckets refill continuously, one with rpm requests and one with tpm
+    tokens per minute; a call waits until both hold enough for it, so callers
+    are queued rather than sent into a 429. The number of calls in flight is
+    capped by a limit that grows by one per limit successful calls and is
+    halved on a rate-limit response or, with target_latency, on a slow one
+    (AIMD), so it settles at the highest concurrency the provider sustains.
+    A rate-limit response also pauses the buckets for its retry-after time.
+    """
+
+    def __init__(
+        self,
+        rpm: float = None,
+        tpm: float = None,
+        max_concurrency: int = 64,
+        min_concurrency: int = 1,
+        initial_concurrency: int = None,
+        target_latency: float = None,
+        decrease_factor: float = 0.5,
+    ):
+        """
+        Parameters:
+            rpm (float): Requests per minute; None is unlimited.
+            tpm (float): Tokens per minute; None is unlimited.
+            max_concurrency (int): Upper bound of the concurrency limit.
+            min_concurrency (int): Lower bound of the concurrency limit.
+            initial_concurrency (int): Starting limit; defaults to max_concurrency // 4.
+            target_latency (float): Seconds above which a call counts as congestion.
+            decrease_factor (float): Multiplier applied to the limit on congestion.
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.limit = float(initial_concurrency or max(min_concurrency, max_concurrency // 4))
+        self.in_flight = 0
+        self.rate_limited = 0
+        # smoothed latency of successful calls
+        self.latency = None
+        self._requests = rpm
+        self._tokens = tpm
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._async_waiters = deque()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._refilled
+        self._refilled = now
+        if self.rpm is not None:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm is not None:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def _try_acquire(self, tokens: int) -> float:
+        """
+        Takes a slot and the bucket capacity for a call if available and returns
+        0, otherwise returns the seconds to wait before trying again. Must hold
+        the lock.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.in_flight >= int(self.limit):
+            # woken by release(); the timeout only guards against missed wakeups
+            return 0.05
+        wait = 0.0
+        if self.rpm is not None and self._requests < 1:
+            wait = max(wait, (1 - self._requests) * 60 / self.rpm)
+        if self.tpm is not None:
+            # a call larger than the whole bucket waits for a full bucket
+            tokens = min(tokens, self.tpm)
+            if self._tokens < tokens:
+                wait = max(wait, (tokens - self._tokens) * 60 / self.tpm)
+        if wait:
+            return wait
+        if self.rpm is not None:
+            self._requests -= 1
+        if self.tpm is not None:
+            self._tokens -= tokens
+        self.in_flight += 1
+        return 0.0
+
+    def acquire(self, tokens: int = 0) -> None:
+        """
+        Blocks until a call of about tokens tokens may start.
+        """
+        with self._lock:
+            while wait := self._try_acquire(tokens):
+                self._released.wait(wait)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        """
+        Async counterpart of acquire(); waits without blocking the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            waiter = None
+            with self._lock:
+                wait = self._try_acquire(tokens)
+                if not wait:
+                    return
+                if self.in_flight >= int(self.limit):
+                    # parked until release() wakes it, in arrival order
+                    waiter = loop.create_future()
+                    self._async_waiters.append((loop, waiter))
+            if waiter is None:
+                await asyncio.sleep(wait)
+                continue
+            try:
+                await asyncio.wait_for(waiter, wait * 20)
+            except asyncio.TimeoutError:
+                pass
+
+    def _decrease(self, now: float) -> None:
+        # one decrease per congestion episode, not one per failed call in it;
+        # an episode lasts about one call latency
+        if now - self._last_decrease > (self.latency or 1.0):
+            self.limit = max(self.min_concurrency, self.limit * self.decrease_factor)
+            self._last_decrease = now
+
+    def release(self, latency: float = None, rate_limited: bool = False, retry_after: float = None, tokens_used: int = None, tokens_reserved: int = 0) -> None:
+        """
+        Ends a call started with acquire() and feeds its outcome back.
+
+        Parameters:
+            latency (float): Seconds the call took; None for a call that failed
+                             for another reason than rate limiting.
+            rate_limited (bool): The provider answered with a rate-limit error.
+            retry_after (float): Seconds the provider asked to wait.
+            tokens_used (int): Actual tokens of the call, to correct the reservation.
+            tokens_reserved (int): Tokens passed to acquire().
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight -= 1
+            if tokens_used is not None and self.tpm is not None:
+                self._tokens -= tokens_used - min(tokens_reserved, self.tpm)
+            if rate_limited:
+                self.rate_limited += 1
+                self._paused_until = max(self._paused_until, now + (retry_after or 1.0))
+                self._decrease(now)
+            elif self.target_latency is not None and latency is not None and latency > self.target_latency:
+                self._decrease(now)
+            elif latency is not None:
+                self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._released.notify_all()
+            while self._async_waiters:
+                loop, waiter = self._async_waiters.popleft()
+                if not waiter.done():
+                    loop.call_soon_threadsafe(_wake, waiter)
+                    break
+
+
+class LangChainRateLimiter(BaseRateLimiter):
+    """
+    Adapts a RateLimiter to the rate_limiter hook of LangChain chat models.
+
+    LangChain only gates the start of a call, so every call takes one request
+    and tokens_per_call tokens from the buckets and does not hold a
+    concurrency slot.
+    """
+
+    def __init__(self, limiter: RateLimiter, tokens_per_call: int = DEFAULT_COMPLETION_TOKENS):
+        self.limiter = limiter
+        self.tokens_per_call = tokens_per_call
+
+    def _take(self) -> float:
+        with self.limiter._lock:
+            wait = self.limiter._try_acquire(self.tokens_per_call)
+            if not wait:
+                # no release() follows, so give the slot back at once
+                self.limiter.in_flight -= 1
+        return wait
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        while wait := self._take():
+            if not blocking:
+                return False
+            time.sleep(min(wait, 0.05))
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        while wait := self._take():
+            if not blocking:
+                return False
+            await asyncio.sleep(min(wait, 0.05))
+        return True
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, model: str, api_key: str = "") -> RateLimiter:
+    """
+    Returns the process-wide limiter for a provider, model and API key, sized
+    from core.agents.vars.rate_limits. Returns None for providers and models
+    without configured limits.
+    """
+    from core.agents.vars import rate_limits
+
+    limits = rate_limits.get(provider)
+    if limits is None:
+        return None
+    limits = limits.get(model, limits.get("default"))
+    if limits is None:
+        return None
+    key = (provider, model, hashlib.sha256((api_key or "").encode("utf-8")).hexdigest())
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                limiter = RateLimiter(**limits)
+                _limiters[key] = limiter
+    return limiter
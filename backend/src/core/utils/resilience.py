@@ -0,0 +1,397 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from bisect import insort
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# attempts per model, including the first
+MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+# seconds a call may take across all its attempts and fallbacks; defaults to
+# the per-request timeout of the LLM clients, so slow models such as o1-mini
+# keep the time they had before retries were added
+CALL_DEADLINE = float(os.getenv("LLM_CALL_DEADLINE", os.getenv("LLM_REQUEST_TIMEOUT", "600")))
+# send a duplicate request once a call is slower than the p95 of its model
+HEDGE_REQUESTS = os.getenv("LLM_HEDGE_REQUESTS", "0").lower() in ("1", "true", "yes")
+CIRCUIT_FAILURES = int(os.getenv("CIRCUIT_FAILURES", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+# runs the duplicates of hedged sync calls
+_hedge_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_HEDGE_WORKERS", "16")), thread_name_prefix="hedge")
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised when a call runs out of time before any attempt succeeds.
+    """
+
+
+class CircuitOpen(RuntimeError):
+    """
+    Raised when every model of a call is behind an open circuit breaker.
+    """
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    True for errors a later attempt may not hit: timeouts, connection errors,
+    rate limits and 5xx responses. Client errors such as 400 and 401 are not.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    # SDK connection and timeout errors carry no status code and do not all
+    # derive from the builtin exceptions
+    return type(error).__name__ in (
+        "APIConnectionError", "APITimeoutError", "ConnectError", "ConnectTimeout",
+        "ReadTimeout", "Timeout", "TimeoutError", "ConnectionError",
+    )
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: the n-th retry waits a uniform
+    random time between 0 and min(max_delay, base_delay * 2**n), which spreads
+    out clients that failed together.
+    """
+
+    def __init__(self, max_attempts: int = MAX_ATTEMPTS, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, retry: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+
+class LatencyTracker:
+    """
+    Latencies of the last window successful calls, for the hedging threshold.
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._recent = deque()
+        self._sorted = []
+        self._lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._recent.append(latency)
+            insort(self._sorted, latency)
+            if len(self._recent) > self.window:
+                oldest = self._recent.popleft()
+                del self._sorted[self._sorted.index(oldest)]
+
+    def quantile(self, q: float) -> float:
+        """
+        Returns the q quantile, or None until min_samples calls are recorded.
+        """
+        with self._lock:
+            if len(self._sorted) < self.min_samples:
+                return None
+            return self._sorted[min(len(self._sorted) - 1, int(q * len(self._sorted)))]
+
+
+class CircuitBreaker:
+    """
+    Stops calling a backend after failure_threshold consecutive failures.
+
+    While open, allow() is False and callers move on to a fallback. After
+    reset_timeout seconds one trial call is let through (half-open); its
+    success closes the breaker, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURES, reset_timeout: float = CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+    def record_abandoned(self) -> None:
+        """
+        Ends a call given up on before the backend answered, e.g. a cancelled
+        one, without counting it either way; a half-open breaker lets the next
+        trial call through.
+        """
+        with self._lock:
+            self._trial = False
+
+
+_breakers = {}
+_trackers = {}
+_registry_lock = threading.Lock()
+
+
+def get_circuit_breaker(*key) -> CircuitBreaker:
+    """
+    Returns the process-wide breaker of a backend, e.g. ("openai", "gpt-4o") or ("tavily",).
+    """
+    breaker = _breakers.get(key)
+    if breaker is None:
+        with _registry_lock:
+            breaker = _breakers.setdefault(key, CircuitBreaker())
+    return breaker
+
+
+def get_latency_tracker(*key) -> LatencyTracker:
+    tracker = _trackers.get(key)
+    if tracker is None:
+        with _registry_lock:
+            tracker = _trackers.setdefault(key, LatencyTracker())
+    return tracker
+
+
+def fallback_models(provider: str, model: str) -> list:
+    """
+    Models tried, in order, when model fails or its breaker is open:
+    vars.fallback_chat_models if it lists model, otherwise the other models of
+    the provider in vars.chat_models_by_prov. Only models the provider offers
+    in vars.chat_models_by_prov are returned.
+    """
+    from core.agents.vars import chat_models_by_prov, fallback_chat_models
+
+    offered = chat_models_by_prov.get(provider, [])
+    candidates = fallback_chat_models.get(model, offered)
+    return [m for m in candidates if m != model and m in offered]
+
+
+def _remaining(deadline: float) -> float:
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded("Call deadline exceeded")
+    return remaining
+
+
+def _hedged(fn, timeout: float, hedge_after: float):
+    # the slower of the two requests is left to finish in the background
+    first = _hedge_executor.submit(fn, timeout)
+    done, _ = wait([first], timeout=hedge_after)
+    if done:
+        return first.result()
+    second = _hedge_executor.submit(fn, max(timeout - hedge_after, 0.001))
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+async def _ahedged(fn, timeout: float, hedge_after: float):
+    first = asyncio.ensure_future(fn(timeout))
+    done, _ = await asyncio.wait([first], timeout=hedge_after)
+    if done:
+        return first.result()
+    second = asyncio.ensure_future(fn(max(timeout - hedge_after, 0.001)))
+    pending = {first, second}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class ResilientCaller:
+    """
+    Runs calls to a provider with retries, a deadline, optional hedging and
+    per-model circuit breakers with fallback models.
+
+    fn(model, timeout) makes one attempt with the given per-attempt timeout.
+    Retryable errors are retried with jittered backoff up to max_attempts per
+    model; once a model's attempts are used up or its breaker is open the
+    next fallback model is tried, all within deadline seconds. With hedge, an
+    attempt slower than the hedge_quantile latency of its model gets a
+    duplicate request and the first answer wins.
+    """
+
+    def __init__(self, provider: str, policy: RetryPolicy = None, deadline: float = CALL_DEADLINE, hedge: bool = HEDGE_REQUESTS, hedge_quantile: float = 0.95, fallbacks: bool = True):
+        """
+        Parameters:
+            provider (str): Provider name, keys the breakers and latency trackers.
+            policy (RetryPolicy): Attempts and backoff per model.
+            deadline (float): Seconds for the whole call.
+            hedge (bool): Send hedged duplicate requests.
+            hedge_quantile (float): Latency quantile after which to hedge.
+            fallbacks (bool): Fall back to other models of the provider.
+        """
+        self.provider = provider
+        self.policy = policy or RetryPolicy()
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.fallbacks = fallbacks
+
+    def models(self, model: str) -> list:
+        return [model] + (fallback_models(self.provider, model) if self.fallbacks else [])
+
+    def _hedge_after(self, model: str) -> float:
+        if not self.hedge:
+            return None
+        return get_latency_tracker(self.provider, model).quantile(self.hedge_quantile)
+
+    def call(self, fn, model: str, return_model: bool = False):
+        """
+        Runs fn(model, timeout) resiliently and returns its result, or with
+        return_model the tuple (result, model that produced it), which is a
+        fallback model when model failed.
+
+        Raises:
+            DeadlineExceeded: If the deadline passes first.
+            CircuitOpen: If every model's breaker is open.
+            Exception: The last error, once attempts and fallbacks are used up,
+                       or a non-retryable error right away.
+        """
+        deadline = time.monotonic() + self.deadline
+        error = None
+        for candidate in self.models(model):
+            breaker = get_circuit_breaker(self.provider, candidate)
+            if not breaker.allow():
+                continue
+            # every exit resolves the breaker, or a half-open trial that was
+            # cancelled or ran out of time would keep it closed to all calls
+            failed = resolved = False
+            try:
+                for attempt in range(self.policy.max_attempts):
+                    if attempt:
+                        time.sleep(min(self.policy.delay(attempt - 1), _remaining(deadline)))
+                    timeout = _remaining(deadline)
+                    hedge_after = self._hedge_after(candidate)
+                    start = time.monotonic()
+                    try:
+                        if hedge_after is not None and hedge_after < timeout:
+                            result = _hedged(lambda t: fn(candidate, t), timeout, hedge_after)
+                        else:
+                            result = fn(candidate, timeout)
+                    except Exception as e:
+                        if not is_retryable(e):
+                            # the backend answered, so it is up
+                            breaker.record_success()
+                            resolved = True
+                            raise
+                        error = e
+                        failed = True
+                        continue
+                    breaker.record_success()
+                    resolved = True
+                    get_latency_tracker(self.provider, candidate).record(time.monotonic() - start)
+                    return (result, candidate) if return_model else result
+            finally:
+                if not resolved:
+                    if failed:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_abandoned()
+        if error is None:
+            raise CircuitOpen(f"Every {self.provider} model is unavailable")
+        raise error
+
+    async def acall(self, fn, model: str, return_model: bool = False):
+        """
+        Async counterpart of call(); fn(model, timeout) returns an awaitable.
+        Each attempt is also cancelled at its timeout.
+        """
+        deadline = time.monotonic() + self.deadline
+        error = None
+        for candidate in self.models(model):
+            breaker = get_circuit_breaker(self.provider, candidate)
+            if not breaker.allow():
+                continue
+            # every exit resolves the breaker, or a half-open trial that was
+            # cancelled or ran out of time would keep it closed to all calls
+            failed = resolved = False
+            try:
+                for attempt in range(self.policy.max_attempts):
+                    if attempt:
+                        await asyncio.sleep(min(self.policy.delay(attempt - 1), _remaining(deadline)))
+                    timeout = _remaining(deadline)
+                    hedge_after = self._hedge_after(candidate)
+                    start = time.monotonic()
+                    try:
+                        if hedge_after is not None and hedge_after < timeout:
+                            result = await asyncio.wait_for(_ahedged(lambda t: fn(candidate, t), timeout, hedge_after), timeout)
+                        else:
+                            result = await asyncio.wait_for(fn(candidate, timeout), timeout)
+                    except Exception as e:
+                        if not is_retryable(e):
+                            # the backend answered, so it is up
+                            breaker.record_success()
+                            resolved = True
+                            raise
+                        error = e
+                        failed = True
+                        continue
+                    breaker.record_success()
+                    resolved = True
+                    get_latency_tracker(self.provider, candidate).record(time.monotonic() - start)
+                    return (result, candidate) if return_model else result
+            finally:
+                if not resolved:
+                    if failed:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_abandoned()
+        if error is None:
+            raise CircuitOpen(f"Every {self.provider} model is unavailable")
+        raise error
+
+    def pick_model(self, model: str) -> str:
+        """
+        Returns the first model whose breaker admits a call, for streams that
+        cannot be retried once output has started.
+
+        Raises:
+            CircuitOpen: If every model's breaker is open.
+        """
+        for candidate in self.models(model):
+            if get_circuit_breaker(self.provider, candidate).allow():
+                return candidate
+        raise CircuitOpen(f"Every {self.provider} model is unavailable")
@@ -0,0 +1,246 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(model: str, messages: list, provider: str = None, **params) -> str:
+    """
+    Builds a content-addressed key for an LLM request.
+
+    Parameters:
+        model (str): Name of the model that produced the response.
+        messages (list): JSON-serializable messages sent to the model.
+        provider (str): Provider of the model, so a local model's responses are
+                        never served for a remote model of the same name.
+        **params: Sampling parameters that influence the response.
+
+    Returns:
+        str: Hex SHA-256 digest of the canonical JSON encoding of the request.
+    """
+    payload = json.dumps(
+        {"provider": provider, "model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache for LLM responses.
+
+    An in-memory LRU tier answers repeated requests without I/O, and an optional
+    SQLite tier keeps responses across restarts and processes. Values must be
+    JSON-serializable. Every entry carries an expiry time and both tiers are
+    bounded by entry count, evicting least recently used entries first.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        memory_entries: int = 1024,
+        disk_entries: int = 100000,
+        ttl: float = None,
+        evict_every: int = 100,
+    ):
+        """
+        Parameters:
+            path (str): SQLite file for the disk tier. None keeps the cache in memory only.
+            memory_entries (int): Maximum number of entries in the memory tier.
+            disk_entries (int): Maximum number of entries in the disk tier.
+            ttl (float): Default lifetime of an entry in seconds. None never expires.
+            evict_every (int): Trim the disk tier after this many puts.
+        """
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl = ttl
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._puts = 0
+        if self.path:
+            with self._connection() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    " key TEXT PRIMARY KEY,"
+                    " value TEXT NOT NULL,"
+                    " expires_at REAL,"
+                    " last_access REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)"
+                )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        """
+        Returns the cached value for key, or None on a miss.
+        """
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None:
+            return value
+        return self._disk_get(key, now)
+
+    async def aget(self, key: str):
+        """
+        Async counterpart of get(); the SQLite tier is read in a worker thread
+        so the event loop is not blocked.
+        """
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None:
+            return value
+        if not self.path:
+            return self._disk_get(key, now)
+        return await asyncio.to_thread(self._disk_get, key, now)
+
+    def _memory_get(self, key: str, now: float):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+        return None
+
+    def _disk_get(self, key: str, now: float):
+        # also counts the miss of a lookup that got past the memory tier
+        if self.path:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and (row[1] is None or row[1] > now):
+                with conn:
+                    conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                value = json.loads(row[0])
+                with self._lock:
+                    self._remember(key, value, row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value, ttl: float = None) -> None:
+        """
+        Stores value under key in both tiers.
+
+        Parameters:
+            key (str): Cache key, usually from make_cache_key().
+            value: JSON-serializable response.
+            ttl (float): Lifetime in seconds, overriding the cache default.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else time.time() + ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+        if self.path:
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at, last_access)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), expires_at, time.time()),
+                )
+            self._puts += 1
+            if self._puts % self.evict_every == 0:
+                self.evict()
+
+    async def aput(self, key: str, value, ttl: float = None) -> None:
+        """
+        Async counterpart of put(); the SQLite tier is written in a worker thread.
+        """
+        if not self.path:
+            self.put(key, value, ttl)
+        else:
+            await asyncio.to_thread(self.put, key, value, ttl)
+
+    def _remember(self, key: str, value, expires_at: float) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def evict(self) -> None:
+        """
+        Drops expired entries and trims the disk tier to disk_entries.
+        """
+        if not self.path:
+            return
+        with self._connection() as conn:
+            conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.disk_entries,),
+            )
+
+    def stats(self) -> dict:
+        """
+        Returns hit/miss counters.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_response_cache():
+    """
+    Returns the process-wide response cache, or None when caching is disabled.
+
+    Caching is opt-in: set LLM_RESPONSE_CACHE=1 to enable it.
+    LLM_RESPONSE_CACHE_PATH adds the SQLite tier, LLM_RESPONSE_CACHE_TTL sets the
+    entry lifetime in seconds and LLM_RESPONSE_CACHE_ENTRIES the memory tier size.
+    """
+    global _shared_cache
+    if os.getenv("LLM_RESPONSE_CACHE", "0").lower() not in ("1", "true", "yes"):
+        return None
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                ttl = os.getenv("LLM_RESPONSE_CACHE_TTL")
+                _shared_cache = ResponseCache(
+                    path=os.getenv("LLM_RESPONSE_CACHE_PATH"),
+                    memory_entries=int(os.getenv("LLM_RESPONSE_CACHE_ENTRIES", "1024")),
+                    ttl=float(ttl) if ttl else None,
+                )
+    return _shared_cache
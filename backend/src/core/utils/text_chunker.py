@@ -0,0 +1,244 @@
+import multiprocessing
+import os
+import threading
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from langchain_core.documents import Document
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+_worker_chunker = None
+
+
+def _init_worker(chunker) -> None:
+    global _worker_chunker
+    _worker_chunker = chunker
+
+
+def _offsets_in_worker(texts: list) -> list:
+    return [_worker_chunker.offsets(text) for text in texts]
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str):
+    """
+    Returns the tiktoken encoding, loaded once per process.
+    """
+    import tiktoken
+    return tiktoken.get_encoding(encoding_name)
+
+
+class _CharMeasure:
+    def __init__(self, text: str):
+        self.n = len(text)
+
+    def advance(self, pos: int, size: int) -> int:
+        return min(pos + size, self.n)
+
+    def back(self, pos: int, size: int) -> int:
+        return max(pos - size, 0)
+
+
+class _TokenMeasure:
+    # the text is encoded once and positions are moved by whole tokens by
+    # bisecting the token start offsets
+    def __init__(self, text: str, encoding_name: str):
+        encoding = get_encoding(encoding_name)
+        token_bytes = encoding.decode_tokens_bytes(encoding.encode(text, disallowed_special=()))
+        byte_starts = np.cumsum([0] + [len(b) for b in token_bytes[:-1]], dtype=np.int64)
+        if not text.isascii():
+            # map byte offsets to character offsets
+            encoded = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+            char_index = np.cumsum((encoded & 0xC0) != 0x80) - 1
+            byte_starts = char_index[byte_starts]
+        self.n = len(text)
+        self.starts = byte_starts.tolist()
+
+    def advance(self, pos: int, size: int) -> int:
+        i = bisect_left(self.starts, pos) + size
+        return self.starts[i] if i < len(self.starts) else self.n
+
+    def back(self, pos: int, size: int) -> int:
+        i = bisect_left(self.starts, pos) - size
+        return self.starts[i] if i > 0 else 0
+
+
+class TextChunker:
+    """
+    Separator-based splitter that works on offsets.
+
+    Chunks are cut greedily: each one ends at the last paragraph break that
+    keeps it within chunk_size, else the last line break, else the last space,
+    else at chunk_size, and the next one starts at the first boundary of the
+    same kind within chunk_overlap before that. This is the policy of
+    RecursiveCharacterTextSplitter, but each cut is a single str.rfind instead
+    of splitting the text into words and merging them back, and chunks are
+    (start, end) spans into the source text until they are materialized. Sizes
+    are counted in characters or, with length_unit="tokens", in tiktoken tokens
+    from a single encode per text.
+
+    With token sizes, split_documents fans large batches out over a process pool.
+    """
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, separators: list = None, length_unit: str = "chars", encoding_name: str = "cl100k_base", strip_whitespace: bool = True, add_start_index: bool = False, n_workers: int = None, parallel_min_chars: int = 1_000_000):
+        """
+        Parameters:
+            chunk_size (int): Largest chunk, in length_unit.
+            chunk_overlap (int): Most overlap between consecutive chunks, in length_unit.
+            separators (list): Separators tried in order; "" means a hard cut.
+            length_unit (str): "chars" or "tokens".
+            encoding_name (str): tiktoken encoding used with length_unit="tokens".
+            strip_whitespace (bool): Trim whitespace from the ends of every chunk.
+            add_start_index (bool): Store each chunk's start offset in its metadata.
+            n_workers (int): Processes used for large token-sized batches; defaults to os.cpu_count().
+            parallel_min_chars (int): Batches smaller than this are split inline.
+        """
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        if length_unit not in ("chars", "tokens"):
+            raise ValueError("length_unit must be chars or tokens")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = separators or DEFAULT_SEPARATORS
+        self.length_unit = length_unit
+        self.encoding_name = encoding_name
+        self.strip_whitespace = strip_whitespace
+        self.add_start_index = add_start_index
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.parallel_min_chars = parallel_min_chars
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        del state["_pool_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._pool_lock = threading.Lock()
+
+    def _measure(self, text: str):
+        if self.length_unit == "tokens":
+            return _TokenMeasure(text, self.encoding_name)
+        return _CharMeasure(text)
+
+    def _strip(self, text: str, start: int, end: int) -> tuple:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return start, end
+
+    def _cut(self, text: str, start: int, limit: int) -> tuple:
+        """
+        Returns (end, separator) of the chunk starting at start: the last
+        occurrence before limit of the first separator that has one, or a hard
+        cut at limit.
+        """
+        for sep in self.separators:
+            if not sep:
+                break
+            # the separator stays at the start of the chunk that follows it
+            cut = text.rfind(sep, start + 1, limit + len(sep))
+            if cut > start:
+                return cut, sep
+        return limit, ""
+
+    def offsets(self, text: str) -> list:
+        """
+        Returns the chunks of text as (start, end) offsets into it.
+        """
+        if not text:
+            return []
+        measure = self._measure(text)
+        n = len(text)
+        spans = []
+        start = 0
+        while start < n:
+            limit = measure.advance(start, self.chunk_size)
+            if limit >= n:
+                spans.append((start, n))
+                break
+            end, sep = self._cut(text, start, limit)
+            spans.append((start, end))
+            # the next chunk starts at the first boundary of the same kind
+            # within chunk_overlap before end
+            next_start = end
+            if self.chunk_overlap:
+                overlap_start = max(start + 1, measure.back(end, self.chunk_overlap))
+                if not sep:
+                    next_start = overlap_start
+                else:
+                    boundary = text.find(sep, overlap_start, end)
+                    if boundary != -1:
+                        next_start = boundary
+            start = next_start
+
+        if self.strip_whitespace:
+            spans = [self._strip(text, start, end) for start, end in spans]
+        return [(start, end) for start, end in spans if end > start]
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn, as chunkers are called from threads and forking a
+                # process that runs threads can copy held locks
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.n_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self,),
+                )
+            return self._pool
+
+    def offsets_many(self, texts: list) -> list:
+        """
+        Offsets for many texts. With length_unit="tokens", batches of at least
+        parallel_min_chars characters are tokenized on a process pool; character
+        splitting is cheaper than shipping the texts to workers.
+        """
+        texts = list(texts)
+        total = sum(len(text) for text in texts)
+        if self.length_unit != "tokens" or self.n_workers == 1 or len(texts) < 2 or total < self.parallel_min_chars:
+            return [self.offsets(text) for text in texts]
+        # batches of roughly equal size, a few per worker
+        target = max(1, total // (4 * self.n_workers))
+        batches, batch, batch_chars = [], [], 0
+        for text in texts:
+            batch.append(text)
+            batch_chars += len(text)
+            if batch_chars >= target:
+                batches.append(batch)
+                batch, batch_chars = [], 0
+        if batch:
+            batches.append(batch)
+        results = []
+        for part in self._executor().map(_offsets_in_worker, batches):
+            results.extend(part)
+        return results
+
+    def split_text(self, text: str) -> list:
+        return [text[start:end] for start, end in self.offsets(text)]
+
+    def split_documents(self, documents) -> list:
+        documents = list(documents)
+        chunks = []
+        for doc, spans in zip(documents, self.offsets_many([doc.page_content for doc in documents])):
+            for start, end in spans:
+                metadata = dict(doc.metadata)
+                if self.add_start_index:
+                    metadata["start_index"] = start
+                chunks.append(Document(page_content=doc.page_content[start:end], metadata=metadata))
+        return chunks
+
+    def close(self) -> None:
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
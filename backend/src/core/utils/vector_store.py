@@ -0,0 +1,506 @@
+import json
+import os
+import shutil
+import uuid
+from typing import Callable, Iterable, Optional, Union
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from .ivf_index import IVFIndex
+
+MetadataFilter = Union[dict, Callable[[dict], bool], None]
+
+STORE_FORMAT_VERSION = 1
+
+
+class _RecordSidecar:
+    """
+    Read-only view of the (id, text, metadata) records saved next to a vector
+    matrix. Records are JSON lines located through a memory-mapped offsets
+    array, so opening is O(1) and a record is only parsed when it is used.
+    """
+
+    def __init__(self, path: str):
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self._fd = os.open(os.path.join(path, "records.jsonl"), os.O_RDONLY)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> tuple:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        # pread does not move a shared file position, so concurrent reads are safe
+        return tuple(json.loads(os.pread(self._fd, end - start, start)))
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    In-process vector store backed by contiguous float32 matrices.
+
+    Vectors are L2-normalized on insert, so cosine similarity is a plain matrix
+    product. Rows live in blocks: appending only ever grows or adds the last
+    block, so existing rows are never copied. Searches score up to block_size
+    rows at a time and select the top k with argpartition instead of sorting.
+
+    Metadata filters are either a dict of field/value equality constraints,
+    answered from an inverted index, or a callable taking the metadata dict.
+
+    For very large corpora build_ann_index() switches searches to an IVF index
+    (see ivf_index.IVFIndex); results from a product-quantized index are
+    re-scored against the exact rows.
+
+    save() writes the store as a raw float32/float16 matrix plus a record
+    sidecar; load() memory-maps them, so opening costs the same for any size and
+    every process serving the same files shares one copy in the page cache.
+
+    delete() only tombstones rows: they are masked out of every search until
+    compact() rewrites the store without them.
+    """
+
+    def __init__(self, embedding: Embeddings, block_size: int = 65536):
+        """
+        Parameters:
+            embedding (Embeddings): Model used to embed texts and queries.
+            block_size (int): Number of rows per in-memory block and per scoring step.
+        """
+        self.embedding = embedding
+        self.block_size = block_size
+        self.dim = None
+        self._blocks = []
+        self._block_starts = []
+        self._tail_writable = False
+        self._count = 0
+        self._base = None
+        self._base_count = 0
+        self._records = []
+        self._id_to_row = None
+        self._field_index = None
+        self._tombstones = set()
+        self._live_mask = None
+        self.ann_index = None
+        self.ann_refine = 10
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def __len__(self) -> int:
+        return self._count - len(self._tombstones)
+
+    @property
+    def deleted_ratio(self) -> float:
+        """
+        Share of stored rows that are tombstoned, i.e. what compact() would reclaim.
+        """
+        return len(self._tombstones) / self._count if self._count else 0.0
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _record(self, row: int) -> tuple:
+        if row < self._base_count:
+            return self._base[row]
+        return self._records[row - self._base_count]
+
+    def _iter_records(self):
+        if self._base is not None:
+            yield from self._base
+        yield from self._records
+
+    @property
+    def _id_index(self) -> dict:
+        # built on first use, so a loaded store does not read every record up front
+        if self._id_to_row is None:
+            self._id_to_row = {
+                record[0]: row for row, record in enumerate(self._iter_records()) if row not in self._tombstones
+            }
+        return self._id_to_row
+
+    def _metadata_index(self) -> dict:
+        if self._field_index is None:
+            self._field_index = {}
+            for row, record in enumerate(self._iter_records()):
+                self._index_metadata(row, record[2])
+        return self._field_index
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[list] = None, *, ids: Optional[list] = None, **kwargs) -> list:
+        texts = list(texts)
+        if not texts:
+            return []
+        vectors = self.embedding.embed_documents(texts)
+        return self.add_vectors(vectors, texts, metadatas=metadatas, ids=ids)
+
+    def add_vectors(self, vectors, texts: list, metadatas: Optional[list] = None, ids: Optional[list] = None) -> list:
+        """
+        Appends precomputed embeddings with their texts.
+
+        Parameters:
+            vectors (array-like): Matrix of shape (len(texts), dim).
+            texts (list): Texts the vectors were computed from.
+            metadatas (list): Optional metadata dict per text.
+            ids (list): Optional id per text; random UUIDs are generated otherwise.
+
+        Returns:
+            list: The ids of the added rows.
+
+        Raises:
+            ValueError: On a dimension mismatch or an id that is already stored.
+        """
+        vectors = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1))
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dimension {self.dim}, got {vectors.shape[1]}")
+        id_index = self._id_index
+        for id_ in ids:
+            if id_ in id_index:
+                raise ValueError(f"Document id {id_} is already stored")
+
+        first_row = self._count
+        self._write_rows(vectors)
+        self._live_mask = None
+        if self.ann_index is not None:
+            self.ann_index.add(vectors, np.arange(first_row, self._count))
+        for row, (id_, text, metadata) in enumerate(zip(ids, texts, metadatas), start=first_row):
+            self._records.append((id_, text, metadata))
+            id_index[id_] = row
+            if self._field_index is not None:
+                self._index_metadata(row, metadata)
+        return list(ids)
+
+    def _write_rows(self, vectors: np.ndarray) -> None:
+        written = 0
+        while written < len(vectors):
+            if not self._tail_writable or self._count - self._block_starts[-1] == self.block_size:
+                self._blocks.append(np.empty((0, self.dim), dtype=np.float32))
+                self._block_starts.append(self._count)
+                self._tail_writable = True
+            block = self._blocks[-1]
+            offset = self._count - self._block_starts[-1]
+            take = min(len(vectors) - written, self.block_size - offset)
+            if offset + take > len(block):
+                # grow the tail block geometrically, capped at block_size
+                capacity = min(self.block_size, max(offset + take, 2 * len(block), 1024))
+                grown = np.empty((capacity, self.dim), dtype=np.float32)
+                grown[:offset] = block[:offset]
+                self._blocks[-1] = block = grown
+            block[offset:offset + take] = vectors[written:written + take]
+            self._count += take
+            written += take
+
+    def _segments(self):
+        """
+        Yields (start row, rows) views of at most block_size rows over all blocks.
+        """
+        ends = self._block_starts[1:] + [self._count]
+        for block, start, end in zip(self._blocks, self._block_starts, ends):
+            for offset in range(0, end - start, self.block_size):
+                n = min(self.block_size, end - start - offset)
+                yield start + offset, block[offset:offset + n]
+
+    def _vectors(self, rows: np.ndarray) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.int64)
+        out = np.empty((len(rows), self.dim), dtype=np.float32)
+        blocks = np.searchsorted(self._block_starts, rows, side="right") - 1
+        for b in np.unique(blocks):
+            selected = blocks == b
+            out[selected] = self._blocks[b][rows[selected] - self._block_starts[b]]
+        return out
+
+    def build_ann_index(self, n_lists: int = None, nprobe: int = 8, pq_subvectors: int = None, refine: int = 10, max_train_samples: int = None) -> IVFIndex:
+        """
+        Trains an IVF index over the stored vectors and routes searches through it.
+
+        Parameters:
+            n_lists (int): Number of inverted lists; defaults to about 4 * sqrt(len(self)).
+            nprobe (int): Lists scanned per query.
+            pq_subvectors (int): Enables product quantization with this many sub-spaces.
+            refine (int): With PQ, k * refine candidates are re-scored exactly.
+            max_train_samples (int): Cap on the k-means training sample.
+
+        Returns:
+            IVFIndex: The trained index, also stored as self.ann_index.
+        """
+        n_lists = n_lists or max(1, int(4 * np.sqrt(self._count)))
+        index = IVFIndex(self.dim, n_lists=n_lists, nprobe=nprobe, pq_subvectors=pq_subvectors)
+        sample_size = min(self._count, max_train_samples or 256 * n_lists)
+        sample = np.random.default_rng(0).choice(self._count, sample_size, replace=False)
+        index.train(self._vectors(np.sort(sample)))
+        for start, segment in self._segments():
+            index.add(segment, np.arange(start, start + len(segment)))
+        self.use_ann_index(index, refine=refine)
+        return index
+
+    def use_ann_index(self, index: IVFIndex, refine: int = 10) -> None:
+        """
+        Routes searches through a prebuilt index, e.g. one restored with IVFIndex.load().
+        Pass None to go back to exact search.
+        """
+        self.ann_index = index
+        self.ann_refine = refine
+
+    def _index_metadata(self, row: int, metadata: dict) -> None:
+        for key, value in metadata.items():
+            try:
+                self._field_index.setdefault(key, {}).setdefault(value, []).append(row)
+            except TypeError:
+                # unhashable values can only be matched by callable filters
+                pass
+
+    def _tombstone_mask(self) -> Optional[np.ndarray]:
+        if not self._tombstones:
+            return None
+        if self._live_mask is None:
+            self._live_mask = np.ones(self._count, dtype=bool)
+            self._live_mask[np.fromiter(self._tombstones, dtype=np.int64, count=len(self._tombstones))] = False
+        return self._live_mask
+
+    def _filter_mask(self, filter: MetadataFilter) -> Optional[np.ndarray]:
+        live = self._tombstone_mask()
+        if filter is None:
+            return live
+        if callable(filter):
+            mask = np.fromiter((filter(r[2]) for r in self._iter_records()), dtype=bool, count=self._count)
+            return mask if live is None else mask & live
+        field_index = self._metadata_index()
+        mask = np.ones(self._count, dtype=bool) if live is None else live.copy()
+        for key, value in filter.items():
+            field_mask = np.zeros(self._count, dtype=bool)
+            field_mask[field_index.get(key, {}).get(value, [])] = True
+            mask &= field_mask
+        return mask
+
+    def _search(self, query_vectors: np.ndarray, k: int, filter: MetadataFilter = None) -> list:
+        """
+        Returns, per query, a list of (row, score) pairs sorted by descending score.
+        """
+        if self._count == 0 or k <= 0:
+            return [[] for _ in range(len(query_vectors))]
+        queries = self._normalize(np.asarray(query_vectors, dtype=np.float32))
+        mask = self._filter_mask(filter)
+        if self.ann_index is not None:
+            return self._ann_search(queries, k, mask)
+
+        candidate_rows, candidate_scores = [], []
+        for start, segment in self._segments():
+            n = len(segment)
+            scores = queries @ segment.T
+            if mask is not None:
+                scores[:, ~mask[start:start + n]] = -np.inf
+            kk = min(k, n)
+            top = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+            candidate_rows.append(top + start)
+            candidate_scores.append(np.take_along_axis(scores, top, axis=1))
+
+        rows = np.concatenate(candidate_rows, axis=1)
+        scores = np.concatenate(candidate_scores, axis=1)
+        kk = min(k, rows.shape[1])
+        if rows.shape[1] > kk:
+            top = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+            rows = np.take_along_axis(rows, top, axis=1)
+            scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-scores, axis=1)
+        rows = np.take_along_axis(rows, order, axis=1)
+        scores = np.take_along_axis(scores, order, axis=1)
+
+        return [
+            [(int(r), float(s)) for r, s in zip(row_list, score_list) if s != -np.inf]
+            for row_list, score_list in zip(rows, scores)
+        ]
+
+    def _ann_search(self, queries: np.ndarray, k: int, mask: Optional[np.ndarray]) -> list:
+        quantized = self.ann_index.pq_subvectors is not None
+        fetch = k * self.ann_refine if quantized else k
+        results = []
+        for query, (rows, scores) in zip(queries, self.ann_index.search(queries, fetch, mask=mask)):
+            if quantized and len(rows):
+                scores = self._vectors(rows) @ query
+                top = np.argsort(-scores)[:k]
+                rows, scores = rows[top], scores[top]
+            results.append([(int(r), float(s)) for r, s in zip(rows, scores)])
+        return results
+
+    def _document(self, row: int) -> Document:
+        id_, text, metadata = self._record(row)
+        return Document(id=id_, page_content=text, metadata=metadata)
+
+    def similarity_search_by_vectors(self, embeddings, k: int = 4, filter: MetadataFilter = None) -> list:
+        """
+        Batched search: scores every query against the store in one matrix product.
+
+        Returns:
+            list: For each query, a list of (Document, cosine similarity) pairs.
+        """
+        results = self._search(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)), k, filter)
+        return [[(self._document(row), score) for row, score in hits] for hits in results]
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4, filter: MetadataFilter = None, **kwargs) -> list:
+        return self.similarity_search_by_vectors([embedding], k=k, filter=filter)[0]
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, filter: MetadataFilter = None, **kwargs) -> list:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k=k, filter=filter)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: MetadataFilter = None, **kwargs) -> list:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k=k, filter=filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: MetadataFilter = None, **kwargs) -> list:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # map cosine similarity from [-1, 1] onto [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    def get_by_ids(self, ids, /) -> list:
+        id_index = self._id_index
+        return [self._document(id_index[id_]) for id_ in ids if id_ in id_index]
+
+    def delete(self, ids: Optional[list] = None, **kwargs) -> Optional[bool]:
+        """
+        Tombstones the rows with the given ids; unknown ids are ignored.
+        The ids can be added again right away.
+
+        Returns:
+            bool: True if any row was deleted.
+        """
+        if ids is None:
+            raise ValueError("ids must be given")
+        id_index = self._id_index
+        rows = [id_index.pop(id_) for id_ in ids if id_ in id_index]
+        if not rows:
+            return False
+        self._tombstones.update(rows)
+        self._live_mask = None
+        return True
+
+    def compact(self) -> int:
+        """
+        Rewrites the store without tombstoned rows. Remaining rows are renumbered,
+        so an ANN index is rebuilt with its previous settings. A memory-mapped
+        store is read into memory; save() it again to persist the result.
+
+        Returns:
+            int: Number of rows removed.
+        """
+        removed = len(self._tombstones)
+        if not removed:
+            return 0
+        live_rows = np.flatnonzero(self._tombstone_mask())
+        vectors = self._vectors(live_rows) if len(live_rows) else np.empty((0, self.dim), dtype=np.float32)
+        records = [self._record(int(row)) for row in live_rows]
+        old_index = self.ann_index
+
+        if self._base is not None:
+            self._base.close()
+        self._blocks, self._block_starts, self._tail_writable = [], [], False
+        self._count = self._base_count = 0
+        self._base = None
+        self._records = []
+        self._id_to_row = None
+        self._field_index = None
+        self._tombstones = set()
+        self._live_mask = None
+        self.ann_index = None
+
+        self._write_rows(vectors)
+        self._records = records
+        if old_index is not None and self._count:
+            self.build_ann_index(
+                n_lists=min(old_index.n_lists, self._count), nprobe=old_index.nprobe,
+                pq_subvectors=old_index.pq_subvectors, refine=self.ann_refine,
+            )
+        return removed
+
+    def save(self, path: str, dtype: str = "float32") -> None:
+        """
+        Writes the store to a directory: vectors.npy holds the raw matrix,
+        records.jsonl and offsets.npy the ids, texts and metadata, and
+        tombstones.npy the deleted rows.
+
+        Parameters:
+            path (str): Target directory; replaced atomically file by file.
+            dtype (str): "float32" or "float16"; float16 halves disk and page-cache use.
+        """
+        if dtype not in ("float32", "float16"):
+            raise ValueError("dtype must be float32 or float16")
+        tmp_path = f"{path}.tmp"
+        os.makedirs(tmp_path, exist_ok=True)
+
+        matrix = np.lib.format.open_memmap(
+            os.path.join(tmp_path, "vectors.npy"), mode="w+", dtype=dtype, shape=(self._count, self.dim or 0)
+        )
+        for start, segment in self._segments():
+            matrix[start:start + len(segment)] = segment
+        matrix.flush()
+        del matrix
+
+        offsets = np.empty(self._count + 1, dtype=np.int64)
+        offsets[0] = 0
+        with open(os.path.join(tmp_path, "records.jsonl"), "wb") as f:
+            for row, record in enumerate(self._iter_records()):
+                line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+                f.write(line)
+                offsets[row + 1] = offsets[row] + len(line)
+        np.save(os.path.join(tmp_path, "offsets.npy"), offsets)
+        np.save(os.path.join(tmp_path, "tombstones.npy"), np.array(sorted(self._tombstones), dtype=np.int64))
+
+        with open(os.path.join(tmp_path, "store.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": STORE_FORMAT_VERSION, "dim": self.dim, "count": self._count, "dtype": dtype}, f)
+
+        # readers that already mapped the old files keep them until they close
+        os.makedirs(path, exist_ok=True)
+        for name in ("vectors.npy", "records.jsonl", "offsets.npy", "tombstones.npy", "store.json"):
+            os.replace(os.path.join(tmp_path, name), os.path.join(path, name))
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: str, embedding: Embeddings, mmap: bool = True, **kwargs) -> "NumpyVectorStore":
+        """
+        Opens a store written by save().
+
+        Parameters:
+            path (str): Directory written by save().
+            embedding (Embeddings): Model used for queries and new texts.
+            mmap (bool): Map the matrix read-only instead of reading it into memory.
+
+        Returns:
+            NumpyVectorStore: Store whose saved rows are served from the files;
+                              rows added afterwards are kept in memory.
+        """
+        with open(os.path.join(path, "store.json"), "r", encoding="utf-8") as f:
+            config = json.load(f)
+        if config.get("version") != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector store format: {config.get('version')}")
+
+        store = cls(embedding, **kwargs)
+        matrix = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r" if mmap else None)
+        store.dim = config["dim"]
+        store._count = store._base_count = config["count"]
+        store._base = _RecordSidecar(path)
+        tombstones_path = os.path.join(path, "tombstones.npy")
+        if os.path.exists(tombstones_path):
+            store._tombstones = set(np.load(tombstones_path).tolist())
+        if store._count:
+            store._blocks.append(matrix)
+            store._block_starts.append(0)
+        return store
+
+    @classmethod
+    def from_texts(cls, texts: list, embedding: Embeddings, metadatas: Optional[list] = None, *, ids: Optional[list] = None, **kwargs) -> "NumpyVectorStore":
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -1,31 +1,221 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from typing import Literal
+
 from dotenv import load_dotenv
+from pydantic import BaseModel, Field
 from core.agents.agent import Agent
 
+# (response key, agent name) in conversation order; every turn answers the previous one
+CONVERSATION = [
+    ("Analytica", "Analytica"),
+    ("Creativa", "Creativa"),
+    ("Pragmatica", "Pragmatica"),
+    ("Final_Analytica", "Analytica"),
+]
+
+PERSPECTIVES = ["Analytica", "Creativa", "Pragmatica"]
+
+TOPOLOGIES = ("chain", "fanout", "fanout_aggregate", "broadcast")
+
+# most agent calls of one simulation running at once
+MAX_CONCURRENCY = int(os.getenv("MULTI_AGENT_CONCURRENCY", "3"))
+# most broadcast rounds a request may ask for; each round is three more agent calls
+MAX_ROUNDS = int(os.getenv("MULTI_AGENT_MAX_ROUNDS", "5"))
+
+
+class Multimodal_Agent_Parameter(BaseModel):
+    system_prompt_analytica: str = "you are intelligent and be concise in 100 words"
+    system_prompt_creativa: str ="you are creative  and be concise in 100 words"
+    system_prompt_pragmatica: str="you are practical and and be concise in 100 words"
+    user_prompt: str=""
+    # how the agents are connected, see _plan
+    topology: Literal["chain", "fanout", "fanout_aggregate", "broadcast"] = "chain"
+    rounds: int = Field(2, ge=1, le=MAX_ROUNDS)
+
+
+def _create_agents(response) -> dict:
+    """
+    Instantiates the three simulation agents with the provided system prompts.
+    """
+    # Load environment variables
+    load_dotenv()
+
+    return {
+        "Analytica": Agent(name="Analytica", system_prompt=response.system_prompt_analytica),
+        "Creativa": Agent(name="Creativa", system_prompt=response.system_prompt_creativa),
+        "Pragmatica": Agent(name="Pragmatica", system_prompt=response.system_prompt_pragmatica),
+    }
+
+
+def _perspectives(responses: dict, keys: list) -> str:
+    return "\n\n".join(f"{key}: {responses[key]}" for key in keys)
+
+
+def _plan(response) -> list:
+    """
+    Returns the simulation as stages of turns, where a turn is
+    (response key, agent name, prompt builder) and the prompt builder maps the
+    responses so far to the agent's prompt. Turns within a stage do not depend
+    on each other and run concurrently.
+
+    Topologies:
+        chain: every turn answers the previous one (the original conversation).
+        fanout: every agent answers the user prompt independently.
+        fanout_aggregate: fanout, then Analytica combines the answers.
+        broadcast: fanout, then response.rounds - 1 rounds in which every agent
+                   sees all answers of the previous round.
+
+    Raises:
+        ValueError: If the topology is unknown.
+    """
+    topology = getattr(response, "topology", "chain")
+    user_prompt = response.user_prompt
+
+    if topology == "chain":
+        stages = []
+        previous = None
+        for key, agent_name in CONVERSATION:
+            stages.append([(key, agent_name, lambda r, previous=previous: r[previous] if previous else user_prompt)])
+            previous = key
+        return stages
+
+    fanout = [(name, name, lambda r: user_prompt) for name in PERSPECTIVES]
+    if topology == "fanout":
+        return [fanout]
+    if topology == "fanout_aggregate":
+        aggregate = lambda r: (
+            f"Question: {user_prompt}\n\nAnswers from three perspectives:\n\n"
+            f"{_perspectives(r, PERSPECTIVES)}\n\nCombine them into one answer."
+        )
+        return [fanout, [("Final_Analytica", "Analytica", aggregate)]]
+    if topology == "broadcast":
+        stages = [fanout]
+        previous_keys = PERSPECTIVES
+        for round_ in range(2, getattr(response, "rounds", 2) + 1):
+            keys = [f"{name}_{round_}" for name in PERSPECTIVES]
+            prompt = lambda r, previous_keys=previous_keys: (
+                f"Question: {user_prompt}\n\nAnswers of the previous round:\n\n"
+                f"{_perspectives(r, previous_keys)}\n\nRespond to the other answers and refine yours."
+            )
+            stages.append([(key, name, prompt) for key, name in zip(keys, PERSPECTIVES)])
+            previous_keys = keys
+        return stages
+    raise ValueError(f"Unknown topology: {topology}, expected one of {', '.join(TOPOLOGIES)}")
+
+
 def simulate_consciousness(response) -> dict:
     """
     Simulates a conversation among three agents and returns a structured dictionary.
 
     Parameters:
-        response (Multimodal_Agent_Parameter): Object containing system prompts and user prompt.
+        response (Multimodal_Agent_Parameter): Object containing system prompts, user prompt and topology.
 
     Returns:
         dict: A dictionary where keys are agent names and values are their responses.
     """
-    # Load environment variables
-    load_dotenv()
-
-    # Instantiate agents with provided system prompts
-    analytica = Agent(name="Analytica", system_prompt=response.system_prompt_analytica)
-    creativa = Agent(name="Creativa", system_prompt=response.system_prompt_creativa)
-    pragmatica = Agent(name="Pragmatica", system_prompt=response.system_prompt_pragmatica)
+    agents = _create_agents(response)
+    stages = _plan(response)
 
     # Store responses in a dictionary
     responses = {}
 
-    # Agent interaction flow
-    responses["Analytica"] = analytica.execute_task(response.user_prompt)
-    responses["Creativa"] = creativa.execute_task(responses["Analytica"])
-    responses["Pragmatica"] = pragmatica.execute_task(responses["Creativa"])
-    responses["Final_Analytica"] = analytica.execute_task(responses["Pragmatica"])
+    width = min(MAX_CONCURRENCY, max(len(stage) for stage in stages))
+    with ThreadPoolExecutor(max_workers=max(1, width)) as executor:
+        for stage in stages:
+            prompts = [build(responses) for _, _, build in stage]
+            results = executor.map(
+                lambda turn, prompt: agents[turn[1]].execute_task(prompt), stage, prompts
+            )
+            for (key, _, _), result in zip(stage, results):
+                responses[key] = result
 
     return responses
+
+
+async def asimulate_consciousness(response, semaphore: asyncio.Semaphore = None) -> dict:
+    """
+    Async variant of simulate_consciousness that awaits each agent turn instead
+    of blocking the event loop.
+
+    Parameters:
+        response (Multimodal_Agent_Parameter): Object containing system prompts, user prompt and topology.
+        semaphore (asyncio.Semaphore): Limits concurrent agent calls; pass a shared one
+                                       to schedule the turns of many simulations together.
+
+    Returns:
+        dict: A dictionary where keys are agent names and values are their responses.
+    """
+    agents = _create_agents(response)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    async def turn(agent_name: str, prompt: str) -> str:
+        async with semaphore:
+            return await agents[agent_name].aexecute_task(prompt)
+
+    responses = {}
+
+    for stage in _plan(response):
+        prompts = [build(responses) for _, _, build in stage]
+        results = await asyncio.gather(*(turn(agent_name, prompt) for (_, agent_name, _), prompt in zip(stage, prompts)))
+        for (key, _, _), result in zip(stage, results):
+            responses[key] = result
+
+    return responses
+
+
+async def astream_consciousness(response):
+    """
+    Streams the simulation, yielding events as soon as they are produced.
+    Turns that run concurrently interleave their deltas.
+
+    Parameters:
+        response (Multimodal_Agent_Parameter): Object containing system prompts, user prompt and topology.
+
+    Yields:
+        dict: {"event": "delta", "agent": key, "delta": text} for every generated
+              fragment, then {"event": "turn", "agent": key, "content": text} once
+              the agent's turn is complete.
+    """
+    agents = _create_agents(response)
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    events = asyncio.Queue()
+
+    async def turn(key: str, agent_name: str, prompt: str) -> str:
+        try:
+            async with semaphore:
+                parts = []
+                async for delta in agents[agent_name].astream_task(prompt):
+                    parts.append(delta)
+                    events.put_nowait({"event": "delta", "agent": key, "delta": delta})
+                content = "".join(parts)
+                events.put_nowait({"event": "turn", "agent": key, "content": content})
+                return content
+        finally:
+            # marks the end of this turn, successful or not
+            events.put_nowait(None)
+
+    responses = {}
+
+    for stage in _plan(response):
+        prompts = [build(responses) for _, _, build in stage]
+        tasks = [
+            asyncio.create_task(turn(key, agent_name, prompt))
+            for (key, agent_name, _), prompt in zip(stage, prompts)
+        ]
+        try:
+            running = len(tasks)
+            while running:
+                event = await events.get()
+                if event is None:
+                    running -= 1
+                else:
+                    yield event
+            for (key, _, _), task in zip(stage, tasks):
+                responses[key] = await task
+        finally:
+            for task in tasks:
+                task.cancel()
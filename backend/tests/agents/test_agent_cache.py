@@ -0,0 +1,36 @@
+from core.agents.agent import Agent
+from core.utils.response_cache import ResponseCache
+
+
+class _FallbackClient:
+    """Fails every o1-mini request so the call falls back to another model."""
+
+    def complete(self, model, messages, timeout=None, **kwargs):
+        if model == "o1-mini":
+            raise ConnectionError("o1-mini unavailable")
+        return f"answer from {model}"
+
+
+def test_cached_responses_are_keyed_by_provider():
+    cache = ResponseCache()
+    local = Agent(name="Analytica", system_prompt="be brief", provider="local", response_cache=cache)
+    reply = local._o1_mini_llm("hello")
+
+    assert cache.get(local._cache_key(local._build_messages("hello"))) == reply
+    remote = Agent(name="Analytica", system_prompt="be brief", provider="local", response_cache=cache)
+    remote.provider = "openai"
+    assert cache.get(remote._cache_key(remote._build_messages("hello"))) is None
+
+
+def test_fallback_answers_are_keyed_by_the_model_that_gave_them():
+    cache = ResponseCache()
+    agent = Agent(name="Creativa", system_prompt="be brief", provider="openai", response_cache=cache)
+    agent.llm_client = _FallbackClient()
+    agent.resilience.policy.max_attempts = 1
+    messages = agent._build_messages("hello")
+
+    reply = agent._o1_mini_llm("hello")
+
+    assert reply == "answer from gpt-4o"
+    assert cache.get(agent._cache_key(messages)) is None
+    assert cache.get(agent._cache_key(messages, "gpt-4o")) == reply
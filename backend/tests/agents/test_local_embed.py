@@ -0,0 +1,47 @@
+import numpy as np
+
+from core.agents.embed.batch_embedder import BatchingEmbedder, EmbeddingCache
+from core.agents.embed.local_embed import _HASH_MULTIPLIERS, HASHING_VERSION, HashingEmbeddings
+
+
+def test_multipliers_are_odd():
+    assert all(int(m) % 2 == 1 for m in _HASH_MULTIPLIERS)
+
+
+def test_hashes_of_one_feature_are_independent():
+    encoder = HashingEmbeddings(dim=384, n_hashes=8, executor="none")
+    features = np.unique(np.concatenate([encoder._features(f"word{i} text{i * 7}") for i in range(3000)]))
+    buckets, signs = encoder._buckets(features)
+    for a in range(8):
+        for b in range(a + 1, 8):
+            # independent hashes agree on about 1 / dim of the features
+            assert (buckets[:, a] == buckets[:, b]).mean() < 3 / encoder.dim
+    assert abs(signs.mean()) < 0.05
+    assert np.bincount(buckets.ravel(), minlength=encoder.dim).min() > 0
+
+
+def test_process_pool_matches_inline_encoding():
+    texts = [f"document number {i} about topic {i % 7}" for i in range(300)]
+    inline = HashingEmbeddings(executor="none").fit(texts).encode(texts)
+    encoder = HashingEmbeddings(batch_size=100, n_workers=2).fit(texts)
+    try:
+        pooled = encoder.encode(texts)
+        assert encoder._executor()._mp_context.get_start_method() == "spawn"
+    finally:
+        encoder.close()
+    np.testing.assert_allclose(pooled, inline, rtol=1e-6)
+
+
+def test_cache_keys_follow_the_hashing_version_and_idf(tmp_path):
+    encoder = HashingEmbeddings(executor="none")
+    embedder = BatchingEmbedder(encoder, model_name="local/hashing-ngram-384", cache=EmbeddingCache(str(tmp_path / "embeddings.db")))
+    texts = ["the cat sat on the mat", "the dog sat on the log"]
+    before = embedder.embed_documents(texts)
+    assert f"@v{HASHING_VERSION}-" in embedder.cache_model
+
+    encoder.fit(texts + ["a third document"])
+    after = embedder.embed_documents(texts)
+
+    assert "-idf" in embedder.cache_model
+    np.testing.assert_allclose(after, encoder.encode(texts), rtol=1e-6)
+    assert not np.allclose(before, after)
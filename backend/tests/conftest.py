@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the backend is imported from its src root, as the app and CLI are run from there
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
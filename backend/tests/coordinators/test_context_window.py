@@ -0,0 +1,39 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from core.coordinators.context_window import ContextWindow
+
+
+def test_large_tool_result_keeps_its_tool_call():
+    window = ContextWindow(max_tokens=200)
+    messages = [
+        SystemMessage("be brief", id="0"),
+        HumanMessage("summarize the archive", id="1"),
+        AIMessage("", tool_calls=[{"name": "load_pdf", "args": {"path": "a.pdf"}, "id": "call-1"}], id="2"),
+        ToolMessage(" ".join(f"word{i}" for i in range(300)), tool_call_id="call-1", id="3"),
+    ]
+
+    prompt = window({"messages": messages})["llm_input_messages"]
+
+    assert [type(m) for m in prompt] == [SystemMessage, AIMessage, ToolMessage]
+    assert prompt[1].tool_calls[0]["id"] == prompt[2].tool_call_id
+    assert window.counter.count_messages(prompt[1:]) <= window.max_tokens
+    # the graph state keeps the full result
+    assert len(messages[3].content) > len(prompt[2].content)
+
+
+def test_token_counter_loads_its_encoding_on_first_use(monkeypatch):
+    import core.coordinators.context_window as context_window
+
+    loads = []
+
+    def offline(name):
+        loads.append(name)
+        raise OSError("no network")
+
+    monkeypatch.setattr(context_window, "get_encoding", offline)
+    counter = context_window.TokenCounter()
+    assert loads == []
+
+    assert counter.count_text("x" * 40) == 10
+    assert counter.count_text("y" * 8) == 2
+    assert loads == ["cl100k_base"]
@@ -0,0 +1,55 @@
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from core.coordinators.RAG_coordinator import coordinator
+from core.utils.vector_store import NumpyVectorStore
+
+
+def _coordinator():
+    coord = coordinator()
+    coord.vector_store = NumpyVectorStore(DeterministicFakeEmbedding(size=32))
+    return coord
+
+
+def _pages(path, n, word):
+    return [Document(page_content=f"{word} page {i}", metadata={"source": path, "page": i}) for i in range(n)]
+
+
+def test_failed_refresh_leaves_no_orphans_and_can_be_retried(tmp_path):
+    path = tmp_path / "archive.pdf"
+    path.write_bytes(b"version 1")
+    coord = _coordinator()
+    coord.refresh_files([str(path)], lambda p: _pages(p, 3, "alpha"))
+
+    path.write_bytes(b"version 2")
+
+    def failing_load(p):
+        # more than one indexing batch, so some chunks are written before the failure
+        yield from _pages(p, 70, "bravo")
+        raise OSError("embedder unavailable")
+
+    with pytest.raises(OSError):
+        coord.refresh_files([str(path)], failing_load)
+
+    # only the previous version is searchable
+    assert len(coord.vector_store) == 3
+    assert coord.keyword_search("bravo", k=10) == []
+    assert {doc.page_content for doc in coord.hybrid_search("alpha", k=10)} == {f"alpha page {i}" for i in range(3)}
+
+    counts = coord.refresh_files([str(path)], lambda p: _pages(p, 70, "bravo"))
+    assert counts["updated"] == 1
+    assert len(coord.vector_store) == 70
+    assert coord.keyword_search("alpha", k=10) == []
+
+
+def test_refresh_keeps_every_chunk_of_an_interleaved_source():
+    coord = _coordinator()
+    first, second = _pages("a.pdf", 4, "alpha"), _pages("b.pdf", 2, "bravo")
+    documents = first[:2] + second + first[2:]
+
+    counts = coord.refresh(documents)
+
+    assert counts["added"] == 2
+    assert len(coord.vector_store) == 6
+    assert {doc.page_content for doc in coord.hybrid_search("alpha", k=10)} >= {f"alpha page {i}" for i in range(4)}
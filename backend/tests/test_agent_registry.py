@@ -0,0 +1,29 @@
+import pytest
+
+from core.agents.agent_registry import AgentRegistry, InMemoryAgentRegistry, SQLiteAgentRegistry
+
+
+def test_registry_interface_must_be_implemented():
+    with pytest.raises(TypeError):
+        AgentRegistry()
+
+    class Partial(AgentRegistry):
+        def put(self, agent_id, record):
+            pass
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+@pytest.mark.parametrize("make", [
+    lambda tmp_path: InMemoryAgentRegistry(max_agents=2),
+    lambda tmp_path: SQLiteAgentRegistry(str(tmp_path / "agents.db"), max_agents=2, evict_every=1),
+])
+def test_registries_store_and_evict(tmp_path, make):
+    registry = make(tmp_path)
+    for i in range(3):
+        registry.put(f"agent-{i}", {"name": str(i)})
+    assert len(registry) == 2
+    assert registry.get("agent-2") == {"name": "2"}
+    assert registry.delete("agent-2")
+    assert registry.get("agent-2") is None
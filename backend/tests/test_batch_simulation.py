@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+import batch_simulation
+from batch_simulation import BatchScheduler, BatchStore
+from core.utils.concurrency import CapacityExceeded
+
+
+@pytest.fixture
+def gate(monkeypatch):
+    gate = asyncio.Event()
+
+    async def simulate(response, semaphore=None):
+        await gate.wait()
+        return {"Analytica": response}
+
+    monkeypatch.setattr(batch_simulation, "asimulate_consciousness", simulate)
+    return gate
+
+
+def test_batches_past_the_pending_limit_are_rejected(tmp_path, gate):
+    async def scenario():
+        scheduler = BatchScheduler(BatchStore(str(tmp_path / "agents.db")), max_pending=3)
+        first = await scheduler.submit(["a", "b"])
+        with pytest.raises(CapacityExceeded):
+            await scheduler.submit(["c", "d"])
+        third = await scheduler.submit(["c"])
+        assert await scheduler.pending() == 3
+
+        gate.set()
+        await asyncio.gather(first.task, third.task)
+        await asyncio.sleep(0)
+        assert await scheduler.pending() == 0
+        second = await scheduler.submit(["d", "e"])
+        await second.task
+        assert (await scheduler.snapshot(second.id))["completed"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_batches_are_visible_to_other_workers(tmp_path, gate):
+    path = str(tmp_path / "agents.db")
+
+    async def scenario():
+        owner = BatchScheduler(BatchStore(path), heartbeat_interval=0.01)
+        other = BatchScheduler(BatchStore(path))
+        batch = await owner.submit(["a", "b"])
+        snapshot = await other.snapshot(batch.id)
+        assert snapshot["status"] == "running" and snapshot["total"] == 2
+
+        # cancelled from another worker, stopped by the owner's heartbeat
+        assert await other.cancel(batch.id)
+        with pytest.raises(asyncio.CancelledError):
+            await batch.task
+        await asyncio.sleep(0)
+        assert (await other.snapshot(batch.id))["status"] == "cancelled"
+
+        done = await owner.submit(["c"])
+        gate.set()
+        await done.task
+        await asyncio.sleep(0)
+        snapshot = await other.snapshot(done.id)
+        assert snapshot["status"] == "done"
+        assert snapshot["results"] == [{"index": 0, "message": {"Analytica": "c"}}]
+        assert await other.snapshot("unknown") is None
+
+    asyncio.run(scenario())
+
+
+def test_batches_of_a_dead_worker_are_interrupted(tmp_path):
+    store = BatchStore(str(tmp_path / "agents.db"), stale_after=0)
+    assert store.admit("job", 5, max_pending=5)
+    assert store.snapshot("job")["status"] == "interrupted"
+    # and no longer hold admission capacity
+    assert store.pending() == 0
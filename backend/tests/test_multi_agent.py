@@ -0,0 +1,12 @@
+import pytest
+from pydantic import ValidationError
+
+from multi_agent import MAX_ROUNDS, Multimodal_Agent_Parameter, _plan
+
+
+def test_rounds_are_bounded():
+    for rounds in (0, MAX_ROUNDS + 1):
+        with pytest.raises(ValidationError):
+            Multimodal_Agent_Parameter(topology="broadcast", rounds=rounds)
+    params = Multimodal_Agent_Parameter(topology="broadcast", rounds=MAX_ROUNDS)
+    assert len(_plan(params)) == MAX_ROUNDS
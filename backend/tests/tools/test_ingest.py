@@ -0,0 +1,66 @@
+import pytest
+
+from core.tools.ingest import IngestionEngine
+
+
+def _csv(tmp_path, name, rows):
+    path = tmp_path / name
+    path.write_text("name,value\n" + "\n".join(f"row{i},{'x' * 50}" for i in range(rows)) + "\n")
+    return str(path)
+
+
+def test_callers_get_copies_of_cached_documents(tmp_path):
+    engine = IngestionEngine(max_workers=1)
+    path = _csv(tmp_path, "a.csv", 3)
+    first = engine.load("csv", path)
+    first[0].metadata["chunk_id"] = "mutated"
+    first[0].page_content = "mutated"
+
+    second = engine.load("csv", path)
+    assert "chunk_id" not in second[0].metadata
+    assert second[0].page_content != "mutated"
+
+
+def test_memory_tier_is_bounded_by_size(tmp_path):
+    small = _csv(tmp_path, "small.csv", 10)
+    large = _csv(tmp_path, "large.csv", 100)
+    engine = IngestionEngine(max_workers=1)
+    budget = sum(len(d.page_content) + len(str(d.metadata)) for d in engine.load("csv", large))
+    engine = IngestionEngine(max_workers=1, cache_bytes=budget)
+    engine.load("csv", small)
+    engine.load("csv", large)
+    # the large file fills the budget alone, so the small one is evicted
+    assert engine._memory_bytes <= budget
+    assert len(engine._memory) == 1
+
+
+def test_pool_parses_uncached_files(tmp_path):
+    paths = [_csv(tmp_path, f"{i}.csv", 5) for i in range(3)]
+    engine = IngestionEngine(max_workers=2)
+    try:
+        docs = engine.load_many("csv", paths)
+        assert engine._executor()._mp_context.get_start_method() == "spawn"
+    finally:
+        engine.close()
+    assert len(docs) == 15
+    assert [d.metadata["source"] for d in docs[::5]] == paths
+
+
+def test_a_bad_file_does_not_discard_the_others(tmp_path):
+    good = [_csv(tmp_path, f"{i}.csv", 5) for i in range(3)]
+    bad = tmp_path / "bad.csv"
+    bad.mkdir()
+    paths = good[:1] + [str(bad)] + good[1:]
+    engine = IngestionEngine(max_workers=2)
+    errors = {}
+    try:
+        docs = engine.load_many("csv", paths, errors=errors)
+    finally:
+        engine.close()
+
+    assert list(errors) == [str(bad)]
+    assert [d.metadata["source"] for d in docs[::5]] == good
+    # the parsed files were cached, so a rerun only retries the bad one
+    assert len(engine._memory) == 3
+    with pytest.raises(RuntimeError):
+        engine.load("csv", str(bad))
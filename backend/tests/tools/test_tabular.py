@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from core.tools.csv_loader import load_csv_chunked
+from core.tools.tabular import iter_csv_columns, iter_excel_columns
+
+
+def test_csv_column_turning_non_numeric_late_is_typed_per_chunk(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "ids.csv"
+    rows = [f"{i},{i * 2}" for i in range(50000)] + ["AB-12,7", ",8"]
+    path.write_text("id,value\n" + "\n".join(rows) + "\n")
+
+    chunks = list(iter_csv_columns(str(path), chunk_rows=10000))
+
+    assert sum(len(chunk["id"]) for chunk in chunks) == 50002
+    assert chunks[0]["id"].dtype == np.float64
+    assert chunks[-1]["id"].dtype == object
+    assert list(chunks[-1]["id"][-2:]) == ["AB-12", ""]
+    assert load_csv_chunked.func(str(path), rows_per_document=1000)
+
+
+def test_excel_max_rows_stops_reading_the_sheet(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    path = tmp_path / "book.xlsx"
+    workbook = openpyxl.Workbook()
+    for title in ("first", "second"):
+        sheet = workbook.create_sheet(title)
+        sheet.append(["n"])
+        for i in range(250):
+            sheet.append([i])
+    workbook.remove(workbook.worksheets[0])
+    workbook.save(path)
+
+    chunks = list(iter_excel_columns(str(path), chunk_rows=100, max_rows=150))
+
+    assert [(sheet, len(columns["n"])) for sheet, columns in chunks] == [
+        ("first", 100), ("first", 100), ("second", 100), ("second", 100),
+    ]
+
+
+def test_csv_with_multiline_cells_past_the_first_block(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "notes.csv"
+    rows = [f'{i},"line one of {i}\nline two of {i}"' for i in range(300000)]
+    path.write_text("id,note\n" + "\n".join(rows) + "\n")
+
+    chunks = list(iter_csv_columns(str(path), chunk_rows=100000))
+
+    assert sum(len(chunk["id"]) for chunk in chunks) == 300000
+    assert chunks[-1]["note"][-1] == "line one of 299999\nline two of 299999"
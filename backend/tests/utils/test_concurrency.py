@@ -0,0 +1,42 @@
+import asyncio
+
+from starlette.background import BackgroundTask
+from starlette.responses import StreamingResponse
+
+from core.utils.concurrency import ConcurrencyLimiter
+
+
+def test_releaser_frees_the_slot_once():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=0)
+        await limiter.acquire()
+        release = limiter.releaser()
+        release()
+        release()
+        assert limiter.in_flight == 0
+        await limiter.acquire()
+        # a second release of the first slot would have left a spare one
+        assert limiter._semaphore.locked()
+
+    asyncio.run(scenario())
+
+
+def test_stream_that_never_starts_releases_its_slot():
+    async def scenario():
+        limiter = ConcurrencyLimiter(max_in_flight=1, max_queue=0)
+        await limiter.acquire()
+        release = limiter.releaser()
+
+        async def event_stream():
+            try:
+                yield "data: {}\n\n"
+            finally:
+                release()
+
+        response = StreamingResponse(event_stream(), background=BackgroundTask(release))
+        # the client went away before the body was sent: only the background task runs
+        await response.background()
+        assert limiter.in_flight == 0
+        assert not limiter._semaphore.locked()
+
+    asyncio.run(scenario())
@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+import pytest
+
+from core.utils.resilience import ResilientCaller, RetryPolicy, fallback_models, get_circuit_breaker
+
+
+def test_fallbacks_stay_within_the_provider():
+    assert fallback_models("openai", "o1-mini") == ["gpt-4o", "gpt-3.5-turbo"]
+    assert fallback_models("openai", "gpt-4") == ["gpt-4o", "gpt-3.5-turbo"]
+    # a configured fallback the provider does not offer is dropped
+    assert fallback_models("local", "gpt-4o") == []
+    assert fallback_models("local", "local-echo") == ["local-lorem"]
+    assert fallback_models("unknown", "gpt-4") == []
+
+
+def _half_open(provider, model):
+    breaker = get_circuit_breaker(provider, model)
+    breaker.record_failure()
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout
+    return breaker
+
+
+def test_cancelled_trial_does_not_keep_the_breaker_closed():
+    breaker = _half_open("test-cancel", "model")
+    caller = ResilientCaller("test-cancel", fallbacks=False)
+
+    async def scenario():
+        async def hang(model, timeout):
+            await asyncio.sleep(10)
+
+        task = asyncio.create_task(caller.acall(hang, "model"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert breaker.allow()
+
+
+def test_trial_out_of_time_does_not_keep_the_breaker_closed():
+    breaker = _half_open("test-deadline", "model")
+    caller = ResilientCaller("test-deadline", policy=RetryPolicy(max_attempts=3, base_delay=0, max_delay=0), deadline=0.05, fallbacks=False)
+
+    def slow_then_timeout(model, timeout):
+        time.sleep(0.06)
+        raise TimeoutError("slow")
+
+    with pytest.raises(TimeoutError):
+        caller.call(slow_then_timeout, "model")
+    # the trial failed, so the breaker is open again rather than stuck half-open
+    assert breaker.state == "open"
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout
+    assert breaker.allow()
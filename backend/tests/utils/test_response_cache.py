@@ -0,0 +1,29 @@
+import asyncio
+import threading
+
+from core.utils.response_cache import ResponseCache
+
+
+def test_async_lookups_read_sqlite_off_the_event_loop(tmp_path, monkeypatch):
+    path = str(tmp_path / "responses.db")
+    ResponseCache(path).put("warm", "from disk")
+    cache = ResponseCache(path)
+    loop_thread = threading.get_ident()
+    disk_threads = []
+    connection = cache._connection
+
+    def tracking_connection():
+        disk_threads.append(threading.get_ident())
+        return connection()
+
+    monkeypatch.setattr(cache, "_connection", tracking_connection)
+
+    async def scenario():
+        assert await cache.aget("warm") == "from disk"
+        assert await cache.aget("cold") is None
+        await cache.aput("cold", "stored")
+        assert await cache.aget("cold") == "stored"
+
+    asyncio.run(scenario())
+    assert disk_threads and loop_thread not in disk_threads
+    assert cache.stats()["memory_hits"] == 1 and cache.stats()["disk_hits"] == 1 and cache.stats()["misses"] == 1
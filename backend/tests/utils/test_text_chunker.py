@@ -0,0 +1,26 @@
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+from core.utils.text_chunker import TextChunker
+
+
+def test_one_spawned_pool_for_concurrent_callers():
+    chunker = TextChunker(n_workers=2)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as threads:
+            pools = set(map(id, threads.map(lambda _: chunker._executor(), range(32))))
+        assert len(pools) == 1
+        assert chunker._executor()._mp_context.get_start_method() == "spawn"
+    finally:
+        chunker.close()
+
+
+def test_chunker_pickles_without_its_pool():
+    chunker = TextChunker(chunk_size=50, chunk_overlap=10)
+    chunker._executor()
+    try:
+        copy = pickle.loads(pickle.dumps(chunker))
+    finally:
+        chunker.close()
+    assert copy._pool is None
+    assert copy.split_text("word " * 40) == chunker.split_text("word " * 40)